@@ -22,6 +22,25 @@ from std_msgs.msg import Header
 from random import randint
 
 
+# NumPy equivalents of the PointField datatypes
+POINTFIELD_DTYPES = {
+    PointField.INT8: np.int8,
+    PointField.UINT8: np.uint8,
+    PointField.INT16: np.int16,
+    PointField.UINT16: np.uint16,
+    PointField.INT32: np.int32,
+    PointField.UINT32: np.uint32,
+    PointField.FLOAT32: np.float32,
+    PointField.FLOAT64: np.float64,
+}
+
+# Point layout written by pcl_to_ros: x, y, z, a 1.0 pad, then b, g, r, 0 and 12 unused bytes
+ROS_XYZRGB_DTYPE = np.dtype({'names': ['x', 'y', 'z', 'w', 'rgb'],
+                             'formats': ['<f4', '<f4', '<f4', '<f4', '<u4'],
+                             'offsets': [0, 4, 8, 12, 16],
+                             'itemsize': 32})
+
+
 def random_color_gen():
     """ Generates a random color
     
@@ -36,6 +55,79 @@ def random_color_gen():
     return [r, g, b]
 
 
+def fields_to_dtype(fields, point_step, is_bigendian=False):
+    """ Builds a NumPy structured dtype matching the point layout of a PointCloud2
+
+        Args:
+            fields (list): PointField descriptions from a PointCloud2 message
+            point_step (int): Size of a single point in bytes (including padding)
+            is_bigendian (bool): Byte order of the message data
+
+        Returns:
+            numpy.dtype: Structured dtype with one named field per PointField
+    """
+    byte_order = '>' if is_bigendian else '<'
+    names = []
+    formats = []
+    offsets = []
+
+    for field in fields:
+        field_dtype = np.dtype(POINTFIELD_DTYPES[field.datatype]).newbyteorder(byte_order)
+        names.append(field.name)
+        formats.append(field_dtype if field.count == 1 else (field_dtype, field.count))
+        offsets.append(field.offset)
+
+    return np.dtype({'names': names,
+                     'formats': formats,
+                     'offsets': offsets,
+                     'itemsize': point_step})
+
+
+def ros_to_structured(ros_cloud):
+    """ Views the data of a ROS PointCloud2 message as a NumPy structured array
+
+        Args:
+            ros_cloud (PointCloud2): ROS PointCloud2 message
+
+        Returns:
+            numpy.ndarray: 1D structured array with one named field per PointField
+    """
+    dtype = fields_to_dtype(ros_cloud.fields, ros_cloud.point_step, ros_cloud.is_bigendian)
+
+    # Strip any per-row padding, then reinterpret each row as packed points
+    raw = np.frombuffer(ros_cloud.data, dtype=np.uint8)
+    raw = raw.reshape(ros_cloud.height, ros_cloud.row_step)[:, :ros_cloud.point_step * ros_cloud.width]
+    return np.ascontiguousarray(raw).view(dtype).ravel()
+
+
+def ros_to_array(ros_cloud):
+    """ Converts a ROS PointCloud2 message to an array of XYZRGB points
+
+        Points with a NaN coordinate are dropped with a single mask.
+
+        Args:
+            ros_cloud (PointCloud2): ROS PointCloud2 message
+
+        Returns:
+            numpy.ndarray: (n_points, 4) float32 array of x, y, z and packed rgb
+    """
+    points = ros_to_structured(ros_cloud)
+
+    valid = np.isfinite(points['x']) & np.isfinite(points['y']) & np.isfinite(points['z'])
+    points = points[valid]
+
+    cloud_arr = np.empty((points.shape[0], 4), dtype=np.float32)
+    cloud_arr[:, 0] = points['x']
+    cloud_arr[:, 1] = points['y']
+    cloud_arr[:, 2] = points['z']
+
+    # rgb is packed integer data stored in a float, so copy the bits, not the value
+    rgb = points['rgb']
+    cloud_arr.view(np.uint32)[:, 3] = rgb.astype(rgb.dtype.newbyteorder('=')).view(np.uint32)
+
+    return cloud_arr
+
+
 def ros_to_pcl(ros_cloud):
     """ Converts a ROS PointCloud2 message to a pcl PointXYZRGB
     
@@ -45,13 +137,8 @@ def ros_to_pcl(ros_cloud):
         Returns:
             pcl.PointCloud_PointXYZRGB: PCL XYZRGB point cloud
     """
-    points_list = []
-
-    for data in pc2.read_points(ros_cloud, skip_nans=True):
-        points_list.append([data[0], data[1], data[2], data[3]])
-
     pcl_data = pcl.PointCloud_PointXYZRGB()
-    pcl_data.from_list(points_list)
+    pcl_data.from_array(ros_to_array(ros_cloud))
 
     return pcl_data
 
@@ -60,7 +147,8 @@ def pcl_to_ros(pcl_array):
     """ Converts a pcl PointXYZRGB to a ROS PointCloud2 message
     
         Args:
-            pcl_array (PointCloud_PointXYZRGB): A PCL XYZRGB point cloud
+            pcl_array (PointCloud_PointXYZRGB): A PCL XYZRGB point cloud, or an
+                (n_points, 4) array of x, y, z and packed rgb
             
         Returns:
             PointCloud2: A ROS point cloud
@@ -70,8 +158,10 @@ def pcl_to_ros(pcl_array):
     ros_msg.header.stamp = rospy.Time.now()
     ros_msg.header.frame_id = "world"
 
+    cloud_arr = pcl_array if isinstance(pcl_array, np.ndarray) else pcl_array.to_array()
+
     ros_msg.height = 1
-    ros_msg.width = pcl_array.size
+    ros_msg.width = cloud_arr.shape[0]
 
     ros_msg.fields.append(PointField(
                             name="x",
@@ -91,29 +181,28 @@ def pcl_to_ros(pcl_array):
                             datatype=PointField.FLOAT32, count=1))
 
     ros_msg.is_bigendian = False
-    ros_msg.point_step = 32
+    ros_msg.point_step = ROS_XYZRGB_DTYPE.itemsize
     ros_msg.row_step = ros_msg.point_step * ros_msg.width * ros_msg.height
     ros_msg.is_dense = False
-    buffer = []
-
-    for data in pcl_array:
-        s = struct.pack('>f', data[3])
-        i = struct.unpack('>l', s)[0]
-        pack = ctypes.c_uint32(i).value
 
-        r = (pack & 0x00FF0000) >> 16
-        g = (pack & 0x0000FF00) >> 8
-        b = (pack & 0x000000FF)
+    points = np.zeros(cloud_arr.shape[0], dtype=ROS_XYZRGB_DTYPE)
 
-        buffer.append(struct.pack('ffffBBBBIII', data[0], data[1], data[2], 1.0, b, g, r, 0, 0, 0, 0))
+    points['x'] = cloud_arr[:, 0]
+    points['y'] = cloud_arr[:, 1]
+    points['z'] = cloud_arr[:, 2]
+    points['w'] = 1.0
+    # Keep b, g, r and clear the unused alpha byte
+    points['rgb'] = cloud_arr.view(np.uint32)[:, 3] & 0x00FFFFFF
 
-    ros_msg.data = "".join(buffer)
+    ros_msg.data = points.tobytes()
 
     return ros_msg
 
 
 def XYZRGB_to_XYZ(XYZRGB_cloud):
     """ Converts a PCL XYZRGB point cloud to an XYZ point cloud (removes color info)
+
+        The fields are projected in a single C++ pass by pcl.copy_point_cloud().
     
         Args:
             XYZRGB_cloud (PointCloud_PointXYZRGB): A PCL XYZRGB point cloud
@@ -121,21 +210,15 @@ def XYZRGB_to_XYZ(XYZRGB_cloud):
         Returns:
             PointCloud_PointXYZ: A PCL XYZ point cloud
     """
-    XYZ_cloud = pcl.PointCloud()
-    points_list = []
-
-    for data in XYZRGB_cloud:
-        points_list.append([data[0], data[1], data[2]])
-
-    XYZ_cloud.from_list(points_list)
-    return XYZ_cloud
+    return pcl.copy_point_cloud(XYZRGB_cloud, pcl.PointCloud)
 
 
 def XYZ_to_XYZRGB(XYZ_cloud, color):
     """ Converts a PCL XYZ point cloud to a PCL XYZRGB point cloud
     
         All returned points in the XYZRGB cloud will be the color indicated
-        by the color parameter.
+        by the color parameter. The color is filled in the same C++ pass
+        that copies the coordinates, see pcl.copy_point_cloud().
     
         Args:
             XYZ_cloud (PointCloud_XYZ): A PCL XYZ point cloud
@@ -144,16 +227,7 @@ def XYZ_to_XYZRGB(XYZ_cloud, color):
         Returns:
             PointCloud_PointXYZRGB: A PCL XYZRGB point cloud
     """
-    XYZRGB_cloud = pcl.PointCloud_PointXYZRGB()
-    points_list = []
-
-    float_rgb = rgb_to_float(color)
-
-    for data in XYZ_cloud:
-        points_list.append([data[0], data[1], data[2], float_rgb])
-
-    XYZRGB_cloud.from_list(points_list)
-    return XYZRGB_cloud
+    return pcl.copy_point_cloud(XYZ_cloud, pcl.PointCloud_PointXYZRGB, color)
 
 
 def rgb_to_float(color):
@@ -215,3 +289,50 @@ def get_color_list(cluster_count):
         for i in xrange(len(get_color_list.color_list), cluster_count):
             get_color_list.color_list.append(random_color_gen())
     return get_color_list.color_list
+
+
+def clusters_to_array(cloud, cluster_indices, colors):
+    """ Builds the points of a cluster-mask cloud, with every cluster in its own color
+
+        The indices of all clusters are concatenated so the XYZ rows are gathered
+        with a single fancy index, and the packed color of each cluster is
+        repeated over its points with np.repeat.
+
+        Args:
+            cloud (PointCloud or PointCloud_PointXYZRGB): The clustered PCL cloud
+            cluster_indices (list): Lists of point indices, one per cluster
+            colors (list): 3-element color lists, at least one per cluster
+
+        Returns:
+            numpy.ndarray: (n_points, 4) float32 array of x, y, z and packed rgb
+    """
+    sizes = [len(indices) for indices in cluster_indices]
+    cluster_arr = np.empty((sum(sizes), 4), dtype=np.float32)
+    if cluster_arr.shape[0] == 0:
+        return cluster_arr
+
+    indices = np.concatenate([np.asarray(indices, dtype=np.intp) for indices in cluster_indices])
+    cluster_arr[:, :3] = cloud.to_array()[indices, :3]
+
+    # Same packing as rgb_to_float(), once per cluster instead of once per point
+    colors = np.asarray(colors[:len(sizes)], dtype=np.uint32) & 0xFF
+    packed = (colors[:, 0] << 16) | (colors[:, 1] << 8) | colors[:, 2]
+    cluster_arr.view(np.uint32)[:, 3] = np.repeat(packed, sizes)
+
+    return cluster_arr
+
+
+def clusters_to_pcl(cloud, cluster_indices, colors):
+    """ Converts clusters to a PCL XYZRGB cloud with every cluster in its own color
+
+        Args:
+            cloud (PointCloud or PointCloud_PointXYZRGB): The clustered PCL cloud
+            cluster_indices (list): Lists of point indices, one per cluster
+            colors (list): 3-element color lists, at least one per cluster
+
+        Returns:
+            PointCloud_PointXYZRGB: A PCL XYZRGB point cloud of all clusters
+    """
+    cluster_cloud = pcl.PointCloud_PointXYZRGB()
+    cluster_cloud.from_array(clusters_to_array(cloud, cluster_indices, colors))
+    return cluster_cloud
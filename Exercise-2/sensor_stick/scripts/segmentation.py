@@ -113,14 +113,13 @@ def pcl_callback(pcl_msg):
     into two each time (forming a tree) using the median for each dimension, same as in the Quick Sort partion method.
     Each point is then located in a partition and the seach is focussed there instead of the whole space."""
     
-    """Convert XYZRGB point cloud to XYZ with helper function from pcl_helper, because PCL's 
-    Euclidean Clustering algorithm requires a point cloud with only spatial information."""
-    white_cloud = XYZRGB_to_XYZ(cloud_objects)
-    tree = white_cloud.make_kdtree()
+    """PCL's Euclidean Clustering algorithm only uses the spatial information of the points,
+    so it runs on the XYZRGB cloud directly instead of on a copy stripped of color."""
+    tree = cloud_objects.make_kdtree()
 
     ##### Create Cluster-Mask Point Cloud to visualize each cluster separately. #####
     # Create a cluster extraction object
-    ec = white_cloud.make_EuclideanClusterExtraction()
+    ec = cloud_objects.make_EuclideanClusterExtraction()
     # Set tolerances for distance threshold (max. Euclidean Distance b/w points)
     # as well as minimum and maximum cluster size (in points).
     # Experiment and find values that work for segmenting objects.
@@ -135,18 +134,10 @@ def pcl_callback(pcl_msg):
     # Assign a color corresponding to each segmented object in scene.
     cluster_color = get_color_list(len(cluster_indices))
 
-    color_cluster_point_list = []
-
-    for j, indices in enumerate(cluster_indices):
-        for i, indice in enumerate(indices):
-            color_cluster_point_list.append([white_cloud[indice][0],
-                                            white_cloud[indice][1],
-                                            white_cloud[indice][2],
-                                             rgb_to_float(cluster_color[j])])
-
-    # Create new cloud containing all clusters, each with unique color.
-    cluster_cloud = pcl.PointCloud_PointXYZRGB()
-    cluster_cloud.from_list(color_cluster_point_list)
+    """Create new cloud containing all clusters, each with unique color. clusters_to_array()
+    gathers the points of all clusters at once and gives every cluster its packed color,
+    so the cloud goes straight to pcl_to_ros() as an XYZRGB array."""
+    cluster_cloud = clusters_to_array(cloud_objects, cluster_indices, cluster_color)
 
     # Convert PCL data (PointXYZRGB format) to ROS msg (type PointCloud2) with helper function from pcl_helper.
     ros_cloud_objects = pcl_to_ros(cloud_objects)
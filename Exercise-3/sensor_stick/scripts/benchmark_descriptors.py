@@ -0,0 +1,52 @@
+#!/usr/bin/env python
+
+# Benchmarks the compute time of every registered descriptor per cluster size.
+# The clusters are points on the side of a soda can sized cylinder. Their
+# normals are estimated once, like in object_recognition.py, and shared by all
+# descriptors, so the normals are timed on their own.
+#
+# Usage: rosrun sensor_stick benchmark_descriptors.py [repeats] [cluster sizes...]
+
+import sys
+import timeit
+
+import numpy as np
+
+from sensor_stick.pcl_helper import *
+from sensor_stick.descriptors import DESCRIPTORS
+from sensor_stick.features import compute_normals
+
+
+def make_cluster(n_points, radius=0.033, height=0.12):
+    """ Returns an (n, 4) XYZRGB array of random points on a cylinder with random colors. """
+    angle = np.random.uniform(0, 2 * np.pi, n_points)
+    cluster_arr = np.empty((n_points, 4), dtype=np.float32)
+    cluster_arr[:, 0] = radius * np.cos(angle)
+    cluster_arr[:, 1] = radius * np.sin(angle)
+    cluster_arr[:, 2] = np.random.uniform(0, height, n_points)
+    cluster_arr.view(np.uint32)[:, 3] = np.random.randint(0, 1 << 24, n_points).astype(np.uint32)
+    return cluster_arr
+
+
+def best_ms(function, repeats):
+    return 1000.0 * min(timeit.repeat(function, number=1, repeat=repeats))
+
+
+if __name__ == '__main__':
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    sizes = [int(size) for size in sys.argv[2:]] or [250, 1000, 4000, 16000]
+
+    names = ['normals'] + list(DESCRIPTORS)
+    print('Compute time per cluster in ms (best of {}):'.format(repeats))
+    print('{:>8} '.format('points') + ' '.join('{:>12}'.format(name) for name in names))
+
+    for n_points in sizes:
+        cluster_arr = make_cluster(n_points)
+        cloud = pcl.PointCloud_PointXYZRGB()
+        cloud.from_array(cluster_arr)
+        normals = compute_normals(cloud)
+
+        times = [best_ms(lambda: compute_normals(cloud), repeats)]
+        for function, _ in DESCRIPTORS.values():
+            times.append(best_ms(lambda: function(cluster_arr, normals), repeats))
+        print('{:>8} '.format(n_points) + ' '.join('{:12.2f}'.format(ms) for ms in times))
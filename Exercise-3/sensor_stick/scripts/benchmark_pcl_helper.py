@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+
+# Benchmarks the ros_to_pcl / pcl_to_ros conversions in pcl_helper against
+# the original per-point implementations on a Kinect-sized frame.
+#
+# Usage: rosrun sensor_stick benchmark_pcl_helper.py [n_points] [repeats]
+
+import ctypes
+import struct
+import sys
+import timeit
+
+import numpy as np
+import sensor_msgs.point_cloud2 as pc2
+
+from sensor_stick.pcl_helper import *
+
+
+def legacy_ros_to_pcl(ros_cloud):
+    points_list = []
+
+    for data in pc2.read_points(ros_cloud, skip_nans=True):
+        points_list.append([data[0], data[1], data[2], data[3]])
+
+    pcl_data = pcl.PointCloud_PointXYZRGB()
+    pcl_data.from_list(points_list)
+
+    return pcl_data
+
+
+def legacy_pcl_to_ros(pcl_array):
+    # Reuse the header and field layout of an empty message
+    ros_msg = pcl_to_ros(pcl.PointCloud_PointXYZRGB())
+    ros_msg.width = pcl_array.size
+    ros_msg.row_step = ros_msg.point_step * ros_msg.width * ros_msg.height
+    buffer = []
+
+    for data in pcl_array:
+        s = struct.pack('>f', data[3])
+        i = struct.unpack('>l', s)[0]
+        pack = ctypes.c_uint32(i).value
+
+        r = (pack & 0x00FF0000) >> 16
+        g = (pack & 0x0000FF00) >> 8
+        b = (pack & 0x000000FF)
+
+        buffer.append(struct.pack('ffffBBBBIII', data[0], data[1], data[2], 1.0, b, g, r, 0, 0, 0, 0))
+
+    ros_msg.data = b"".join(buffer)
+
+    return ros_msg
+
+
+def make_cloud(n_points):
+    """ Builds a random XYZRGB cloud where roughly 5% of the points are NaN,
+        like the invalid depth returns of an RGB-D camera.
+    """
+    cloud_arr = np.random.uniform(-1.0, 1.0, (n_points, 4)).astype(np.float32)
+    colors = np.random.randint(0, 1 << 24, n_points).astype(np.uint32)
+    cloud_arr.view(np.uint32)[:, 3] = colors
+    cloud_arr[np.random.rand(n_points) < 0.05, 0] = np.nan
+
+    cloud = pcl.PointCloud_PointXYZRGB()
+    cloud.from_array(cloud_arr)
+    return cloud
+
+
+def report(name, legacy, vectorized, repeats):
+    legacy_ms = 1000.0 * min(timeit.repeat(legacy, number=1, repeat=repeats))
+    vectorized_ms = 1000.0 * min(timeit.repeat(vectorized, number=1, repeat=repeats))
+    print('{:<12} legacy {:10.1f} ms   vectorized {:8.1f} ms   speedup {:6.1f}x'.format(
+        name, legacy_ms, vectorized_ms, legacy_ms / vectorized_ms))
+
+
+if __name__ == '__main__':
+    n_points = int(sys.argv[1]) if len(sys.argv) > 1 else 300000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+
+    # Stamp messages with wall-clock time instead of starting a node
+    rospy.rostime.set_rostime_initialized(True)
+
+    cloud = make_cloud(n_points)
+    ros_cloud = pcl_to_ros(cloud)
+
+    print('Per-frame conversion time at {} points (best of {}):'.format(n_points, repeats))
+    report('ros_to_pcl', lambda: legacy_ros_to_pcl(ros_cloud), lambda: ros_to_pcl(ros_cloud), repeats)
+    report('pcl_to_ros', lambda: legacy_pcl_to_ros(cloud), lambda: pcl_to_ros(cloud), repeats)
@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+
+# Benchmarks the startup of object_recognition.py: how long importing the
+# perception modules takes, how long loading the model takes, and the
+# time-to-first-detection, from launching the interpreter until the first
+# frame has been classified. Every measurement runs in a fresh interpreter,
+# so modules imported by an earlier one do not hide their cost.
+#
+# Pass model.npy and model.sav to compare the memory-mapped NumPy predictor
+# with the pickled scikit-learn model. The frame is a .pcd file or a .npy
+# file holding an (n, 4) XYZRGB array, like replay_pipeline.py reads.
+#
+# Usage: rosrun sensor_stick benchmark_startup.py [--repeat N] FRAME MODEL...
+
+import argparse
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+
+# Prints time.time() once the statement after the imports has run.
+# The imports the statement needs are part of what it measures.
+IMPORT_PERCEPTION = '''
+import time
+from sensor_stick.perception import Perception
+print(repr(time.time()))
+'''
+
+LOAD_MODEL = '''
+import sys
+import time
+from sensor_stick.perception import Perception
+perception = Perception()
+start = time.time()
+perception.watch_model(sys.argv[1])
+print(repr(time.time() - start))
+'''
+
+FIRST_DETECTION = '''
+import sys
+import time
+from sensor_stick.pcl_helper import *
+from sensor_stick.perception import Perception
+rospy.rostime.set_rostime_initialized(True)
+frame = pcl.load_XYZRGB(sys.argv[2]) if sys.argv[2].endswith('.pcd') else np.load(sys.argv[2])
+perception = Perception()
+perception.watch_model(sys.argv[1])
+labels = perception.process(frame).detected_objects_labels
+print(repr(time.time()))
+sys.stderr.write('Detected {}\\n'.format(labels))
+'''
+
+
+def run(code, *args):
+    """ Runs code in a fresh interpreter and returns the wall-clock time it was
+        started at and the float it printed last. """
+    start = time.time()
+    output = subprocess.check_output([sys.executable, '-c', code] + list(args))
+    return start, float(output.decode().split()[-1])
+
+
+def report(name, samples):
+    samples = 1000.0 * np.asarray(samples)
+    print('{:<40} median {:8.1f} ms   min {:8.1f} ms'.format(name, np.median(samples), samples.min()))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the startup of the object recognition node.')
+    parser.add_argument('frame', help='.pcd or .npy frame to detect the objects of')
+    parser.add_argument('models', nargs='+', help='model.npy and/or model.sav files to compare')
+    parser.add_argument('--repeat', type=int, default=5, help='number of fresh interpreters per measurement')
+    args = parser.parse_args()
+
+    print('Startup times over {} fresh interpreters:'.format(args.repeat))
+
+    starts = [run(IMPORT_PERCEPTION) for _ in range(args.repeat)]
+    report('import perception', [end - start for start, end in starts])
+
+    for model in args.models:
+        report('load {}'.format(model), [run(LOAD_MODEL, model)[1] for _ in range(args.repeat)])
+
+    for model in args.models:
+        detections = [run(FIRST_DETECTION, model, args.frame) for _ in range(args.repeat)]
+        report('first detection with {}'.format(model), [end - start for start, end in detections])
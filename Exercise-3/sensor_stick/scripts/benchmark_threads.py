@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+
+# Benchmarks the throughput of the perception front end (filtering,
+# segmentation and clustering) on several clouds at once, run serially and
+# on thread pools of growing size. python-pcl releases the GIL while it
+# filters, segments, extracts and clusters, so the threads only serialize on
+# the Python glue between those calls and the speedup shows how much of the
+# front end runs in parallel on a multi-core machine.
+#
+# The clouds are synthetic tabletop scenes: a table plane inside the region of
+# interest with boxes standing on it, and floor points below it.
+#
+# Usage: rosrun sensor_stick benchmark_threads.py [--clouds N] [--points N] [--repeat N]
+#            [--fused] [WORKERS...]
+
+import argparse
+import multiprocessing
+import time
+from multiprocessing.pool import ThreadPool
+
+import numpy as np
+
+from sensor_stick.pcl_helper import *
+from sensor_stick.perception import Perception
+from sensor_stick.pipeline import Frame
+
+
+def make_scene(n_points, n_objects=5):
+    """ Returns an (n, 4) XYZRGB array of a table at 0.8m holding n_objects boxes, above a floor. """
+    n_floor = n_points // 5
+    n_object = n_points // 10 // n_objects
+    n_table = n_points - n_floor - n_object * n_objects
+
+    scene_arr = np.empty((n_points, 4), dtype=np.float32)
+    scene_arr[:n_floor, :2] = np.random.uniform(-1, 1, (n_floor, 2))
+    scene_arr[:n_floor, 2] = np.random.uniform(0, 0.02, n_floor)
+    scene_arr[n_floor:n_floor + n_table, :2] = np.random.uniform(-0.5, 0.5, (n_table, 2))
+    scene_arr[n_floor:n_floor + n_table, 2] = np.random.normal(0.8, 0.002, n_table)
+
+    start = n_floor + n_table
+    for center in np.linspace(-0.35, 0.35, n_objects):
+        box = scene_arr[start:start + n_object]
+        box[:, 0] = np.random.uniform(center - 0.03, center + 0.03, n_object)
+        box[:, 1] = np.random.uniform(-0.03, 0.03, n_object)
+        box[:, 2] = np.random.uniform(0.81, 0.95, n_object)
+        start += n_object
+
+    scene_arr.view(np.uint32)[:, 3] = np.random.randint(0, 1 << 24, n_points).astype(np.uint32)
+    return scene_arr
+
+
+def front_end(stages, scene):
+    """ Runs the stages before classification on one cloud, stopping early like process() does. """
+    frame = Frame(scene)
+    for stage in stages:
+        if stage(frame) is None:
+            break
+    return frame
+
+
+def best_rate(run, n_clouds, repeats):
+    """ Calls run repeats times and returns the clouds per second of the fastest call. """
+    elapsed = []
+    for _ in range(repeats):
+        start = time.time()
+        run()
+        elapsed.append(time.time() - start)
+    return n_clouds / min(elapsed)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the perception front end on several threads.')
+    parser.add_argument('workers', nargs='*', type=int, help='thread pool sizes to compare with the serial run')
+    parser.add_argument('--clouds', type=int, default=16, help='number of clouds processed per pass')
+    parser.add_argument('--points', type=int, default=300000, help='points per cloud')
+    parser.add_argument('--repeat', type=int, default=3, help='number of passes per pool size, the best is kept')
+    parser.add_argument('--fused', action='store_true', help='crop, downsample and segment in one native call')
+    args = parser.parse_args()
+
+    cpus = multiprocessing.cpu_count()
+    workers = args.workers or sorted(set([2, 4, cpus]))
+
+    # pcl clouds are built once, so converting the arrays is not timed
+    scenes = []
+    for _ in range(args.clouds):
+        scene = pcl.PointCloud_PointXYZRGB()
+        scene.from_array(make_scene(args.points))
+        scenes.append(scene)
+
+    perception = Perception(fused_front_end=args.fused)
+    stages = [stage for name, stage in perception.stages() if name != 'classification']
+
+    print('Front end throughput on {} clouds of {} points, {} CPUs (best of {}):'.format(
+        args.clouds, args.points, cpus, args.repeat))
+    print('{:>8} {:>12} {:>9}'.format('threads', 'clouds/s', 'speedup'))
+
+    serial = best_rate(lambda: [front_end(stages, scene) for scene in scenes], args.clouds, args.repeat)
+    print('{:>8} {:12.2f} {:9.2f}'.format('serial', serial, 1.0))
+
+    for n_workers in workers:
+        pool = ThreadPool(n_workers)
+        rate = best_rate(lambda: pool.map(lambda scene: front_end(stages, scene), scenes), args.clouds, args.repeat)
+        pool.close()
+        pool.join()
+        print('{:>8} {:12.2f} {:9.2f}'.format(n_workers, rate, rate / serial))
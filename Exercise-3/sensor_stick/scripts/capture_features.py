@@ -1,15 +1,13 @@
 #!/usr/bin/env python
-import numpy as np
-import pickle
+import multiprocessing
 import rospy
+from multiprocessing.pool import ThreadPool
 
 from sensor_stick.pcl_helper import *
-from sensor_stick.training_helper import spawn_model
-from sensor_stick.training_helper import delete_model
-from sensor_stick.training_helper import initial_setup
-from sensor_stick.training_helper import capture_sample
-from sensor_stick.features import compute_color_histograms
-from sensor_stick.features import compute_normal_histograms
+from sensor_stick.training_helper import TrainingSession
+from sensor_stick.training_store import TrainingSet
+from sensor_stick.descriptors import DescriptorSet
+from sensor_stick.features import compute_normals
 from sensor_stick.srv import GetNormals
 from geometry_msgs.msg import Pose
 from sensor_msgs.msg import PointCloud2
@@ -20,9 +18,42 @@ def get_normals(cloud):
     return get_normals_prox(cloud).cluster
 
 
+def extract_features(sample):
+    """Feature vector of one captured sample, a (PointCloud2, XYZRGB array) pair.
+    Runs on the worker pool while the main loop sets the next pose."""
+    sample_cloud, sample_arr = sample
+    if use_normals_service:
+        normals = get_normals(sample_cloud)
+    else:
+        sample_pcl_cloud = pcl.PointCloud_PointXYZRGB()
+        sample_pcl_cloud.from_array(sample_arr)
+        normals = compute_normals(sample_pcl_cloud)
+    return describe((sample_arr, normals))
+
+
 if __name__ == '__main__':
     rospy.init_node('capture_node')
 
+    # Fall back to the /feature_extractor/get_normals service instead of in-process normals.
+    use_normals_service = rospy.get_param('~use_normals_service', False)
+    samples_per_model = rospy.get_param('~samples_per_model', 20)
+
+    """Samples are appended to the columnar training set in ~training_dir as soon as their
+    features are ready, and committed once all samples of a model are in. Complete models
+    are skipped, so an interrupted capture resumes from the last complete model when started again."""
+    # ~descriptors names the descriptors of every sample, all computed from the same normals.
+    # It defaults to those of the training set being resumed, or to color and normal histograms.
+    store = TrainingSet(rospy.get_param('~training_dir', 'training_set'), rospy.get_param('~descriptors', None))
+    describe = DescriptorSet(store.descriptors)
+
+    """Features are extracted on a worker pool, so the next pose is set in Gazebo and
+    captured while the last sample is still being processed."""
+    feature_workers = rospy.get_param('~feature_workers', multiprocessing.cpu_count())
+    if rospy.get_param('~feature_pool', 'thread') == 'process':
+        feature_pool = multiprocessing.Pool(feature_workers)
+    else:
+        feature_pool = ThreadPool(feature_workers)
+
     models = [\
        'beer',
        'bowl',
@@ -32,37 +63,49 @@ if __name__ == '__main__':
        'plastic_cup',
        'soda_can']
 
+    # Service connections to Gazebo and the camera subscriber stay open for the whole capture.
+    session = TrainingSession()
+
     # Disable gravity and delete the ground plane
-    initial_setup()
-    labeled_features = []
+    session.initial_setup()
 
     for model_name in models:
-        spawn_model(model_name)
+        if store.is_complete(model_name):
+            print('Skipping {}, already captured'.format(model_name))
+            continue
 
-        for i in range(20):
+        session.spawn_model(model_name)
+        pending = []
+
+        for i in range(samples_per_model):
             # make five attempts to get a valid a point cloud then give up
             sample_was_good = False
             try_count = 0
             while not sample_was_good and try_count < 5:
-                sample_cloud = capture_sample()
-                sample_cloud_arr = ros_to_pcl(sample_cloud).to_array()
+                sample_cloud = session.capture_sample()
+                sample_arr = ros_to_array(sample_cloud)
 
                 # Check for invalid clouds.
-                if sample_cloud_arr.shape[0] == 0:
+                if len(sample_arr) == 0:
                     print('Invalid cloud detected')
                     try_count += 1
                 else:
                     sample_was_good = True
 
-            # Extract histogram features
-            chists = compute_color_histograms(sample_cloud, using_hsv=True)
-            normals = get_normals(sample_cloud)
-            nhists = compute_normal_histograms(normals)
-            feature = np.concatenate((chists, nhists))
-            labeled_features.append([feature, model_name])
+            if not sample_was_good:
+                continue
+
+            # Extract histogram features in the background
+            pending.append(feature_pool.apply_async(extract_features, ((sample_cloud, sample_arr),)))
 
-        delete_model()
+            # Store the samples whose features are ready, in capture order
+            while pending and pending[0].ready():
+                store.append(pending.pop(0).get(), model_name)
 
+        for result in pending:
+            store.append(result.get(), model_name)
+        store.commit(model_name)
 
-    pickle.dump(labeled_features, open('training_set.sav', 'wb'))
+        session.delete_model()
 
+    session.close()
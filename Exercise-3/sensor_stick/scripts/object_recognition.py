@@ -1,181 +1,56 @@
 #!/usr/bin/env python
 
+# Taken before the imports, so the time to the first detection includes them
+import time
+start_time = time.time()
+
+import os
 import numpy as np
-import sklearn
-from sklearn.preprocessing import LabelEncoder
 
-import pickle
+import multiprocessing
+from multiprocessing.pool import ThreadPool
 
 from sensor_stick.srv import GetNormals
-from sensor_stick.features import compute_color_histograms
-from sensor_stick.features import compute_normal_histograms
 from visualization_msgs.msg import Marker
 
 from sensor_stick.marker_tools import *
 from sensor_stick.msg import DetectedObjectsArray
 from sensor_stick.msg import DetectedObject
 from sensor_stick.pcl_helper import *
+from sensor_stick.perception import Perception
+from sensor_stick.feature_cache import FeatureCache
+from sensor_stick.pipeline import Frame
+from sensor_stick.pipeline import PipelineExecutor
+from sensor_stick.timing import StageTimer
+from sensor_stick.timing import make_diagnostics
+from diagnostic_msgs.msg import DiagnosticArray
 
 def get_normals(cloud):
     get_normals_prox = rospy.ServiceProxy('/feature_extractor/get_normals', GetNormals)
     return get_normals_prox(cloud).cluster
 
-# Callback function for your Point Cloud Subscriber
-def pcl_callback(pcl_msg):
-
-# Exercise-2 Code (from segmentation.py in Exercise 2) marked by #####:
-
-    ##### Convert ROS msg to PCL data #####
-
-    """Convert ROS msg (type PointCloud2) to PCL data (PointXYZRGB format)
-    with helper function from pcl_helper."""
-    cloud = ros_to_pcl(pcl_msg)
-
-    ##### Voxel Grid Downsampling #####
-
-    """The point clouds from RGB-D cameras are too dense, hence computationally expensive. Downsampling 
-    the point cloud data to reduce density but preserve important information is ideal.
-
-    Using a Voxel Grid Filter where a grid of volumetric elements (voxels; as pixel is to picture element)
-    is made and each voxel is averaged to a point cloud element; downsampled."""
-
-    # Create a VoxelGrid filter object for our input point cloud
-    vox = cloud.make_voxel_grid_filter()
-
-    """Choose a voxel (also known as leaf) size (units in meters).
-    Should start small and keep going large till loss of important information starts."""
-
-    """A good way to choose leaf size is knowing the important information data forehand 
-    such as smallest (or target) object size."""
-    LEAF_SIZE = 0.01
-    """A voxel (leaf) size of 0.01 results in a voxel of 1e-6 cubic meters that retains
-    most of the important information, while significantly reducing the number of points in the cloud."""  
-
-    # Set the voxel (or leaf) size. 
-    vox.set_leaf_size(LEAF_SIZE, LEAF_SIZE, LEAF_SIZE)
-
-    # Call the filter function to obtain the resultant downsampled point cloud.
-    cloud_filtered = vox.filter()
-
-    ##### PassThrough filter #####
-
-    """More points in cloud = more coumputation; so if the target object location is known,
-    the rest of the point cloud is not needed."""
-
-    """A pass through filter is like a cropping tool. We specify an axis along which we know the limits
-    within which the target objects lie, known as the region of interest. The pass through filter passes 
-    through the cloud leaving only the region of interest."""
-
-    # Create a PassThrough filter object.
-    passthrough = cloud_filtered.make_passthrough_filter()
-
-    # Assign axis and range to the passthrough filter object.
-    # Applying the filter along z axis (the height with respect to the ground) to our tabletop scene.
-    filter_axis = 'z'
-    passthrough.set_filter_field_name (filter_axis)
-    axis_min = 0.77
-    axis_max = 1.1
-    # The axis min and max sets the region of interest that the filter leaves out as a window as it passes.
-    passthrough.set_filter_limits (axis_min, axis_max)
-
-    # Finally use the filter function to obtain the resultant point cloud. 
-    cloud_filtered = passthrough.filter()
-
-    ##### RANSAC plane segmentation #####
-
-    """RANSAC (Random Sample Consensus) is a two step (hypothesis and verification) iterative method
-    which identifies data points belonging to a mathematical model (inliners) and those that dont (outliners)."""
-
-    """First, the model is constructed using a min. no. of data pts. (eg. two for a line) and then the rest of
-    pts. are verfied against its parameters (eg. slope and y-cutoff for a line) with certain error thresholds.
-    The set of inliers obtained for that fitting model (random sample) is called a consensus set.
-    The two steps are repeated until the obtained consensus set in certain iteration has enough inliers
-    and that sample (mathematical model parameters) forms the solution as it had the most inliners in consensus."""
-
-    # The points chosen are random so the solution is probalistic, increasing with the number of iterations.
-
-    # Create the segmentation object
-    seg = cloud_filtered.make_segmenter()
-
-    # Set the model you wish to fit.
-    # RANSAC plane fitting algorithm (calculate plane parameters and verfiy) already exists in the PCL library.
-    seg.set_model_type(pcl.SACMODEL_PLANE)
-    seg.set_method_type(pcl.SAC_RANSAC)
-
-    # Max distance for a point to be considered fitting the model.
-    # This is the error threshold for the model fit and influences (increases) the consensus set.
-    max_distance = 0.01
-    seg.set_distance_threshold(max_distance)
-
-    # Call the segment function to obtain set of inliner indices and model coefficients
-    inliers, coefficients = seg.segment()
-
-    ##### Extract inliers and outliers #####
-
-    # Extract inliers
-    extracted_inliers = cloud_filtered.extract(inliers, negative=False)
-    cloud_table = extracted_inliers
+def get_cluster_normals(cloud_objects, cluster_indices):
+    """Stand-in for compute_cluster_normals() that asks the feature_extractor node
+    for the normals of every cluster instead."""
+    return [get_normals(pcl_to_ros(cloud_objects.extract(pts_list))) for pts_list in cluster_indices]
 
-    # Extract outliers using the negative flag to True.
-    extracted_outliers = cloud_filtered.extract(inliers, negative=True)
-    cloud_objects = extracted_outliers
+"""The filtering, segmentation, clustering and classification stages live in
+sensor_stick.perception, so they can be replayed offline with replay_pipeline.py.
+The node adds a publishing stage at the end of the chain. The PipelineExecutor runs
+every stage on its own worker thread, so consecutive frames overlap across the stages."""
 
-    ##### Euclidean Clustering #####
+def publishing_stage(frame):
 
-    """Euclidean Clustering is the DBSCAN algorithm as it uses the Euclidean Distance to identfy nearest neighbours, 
-    if the distance b/w is < min. distance specified, then point is added to the cluster (inliners), else outliner.
-    If the point has > (min. members of a cluster - 1) neigbours, it becomes a core member, else an edge member.
-    Each point that can be in a cluster is identified and then the algorithm moves to the next random point."""
-
-    """Using k-d trees for nearest neighbor search for PCL's Euclidian Clustering (DBSCAN)
-    algorithm to decrease the computational burden.
-    k-d trees segment the Euclidian Space into partitions by divinding each dimension sequentially (at each root)
-    into two each time (forming a tree) using the median for each dimension, same as in the Quick Sort partion method.
-    Each point is then located in a partition and the seach is focussed there instead of the whole space."""
-    
-    """Convert XYZRGB point cloud to XYZ with helper function from pcl_helper, because PCL's 
-    Euclidean Clustering algorithm requires a point cloud with only spatial information."""
-    white_cloud = XYZRGB_to_XYZ(cloud_objects)
-    tree = white_cloud.make_kdtree()
-
-    ##### Create Cluster-Mask Point Cloud to visualize each cluster separately. #####
-
-    # Create a cluster extraction object
-    ec = white_cloud.make_EuclideanClusterExtraction()
-    # Set tolerances for distance threshold (max. Euclidean Distance b/w points)
-    # as well as minimum and maximum cluster size (in points).
-    # Experiment and find values that work for segmenting objects.
-    ec.set_ClusterTolerance(0.02)
-    ec.set_MinClusterSize(10)
-    ec.set_MaxClusterSize(2000)
-    # Search the k-d tree for clusters
-    ec.set_SearchMethod(tree)
-    # Extract indices for each of the discovered clusters
-    cluster_indices = ec.Extract()
-
-    # Assign a color corresponding to each segmented object in scene.
-    cluster_color = get_color_list(len(cluster_indices))
-
-    color_cluster_point_list = []
-
-    for j, indices in enumerate(cluster_indices):
-        for i, indice in enumerate(indices):
-            color_cluster_point_list.append([white_cloud[indice][0],
-                                            white_cloud[indice][1],
-                                            white_cloud[indice][2],
-                                             rgb_to_float(cluster_color[j])])
-
-    # Create new cloud containing all clusters, each with unique color.
-    cluster_cloud = pcl.PointCloud_PointXYZRGB()
-    cluster_cloud.from_list(color_cluster_point_list)
+    ##### Convert the clusters from pcl to ROS using helper function. #####
+    ros_clusters = [pcl_to_ros(frame.cloud_objects.extract(pts_list)) for pts_list in frame.cluster_indices]
 
     ##### Convert PCL data to ROS messages #####
 
     """Convert PCL data (PointXYZRGB format) to ROS msg (type PointCloud2)
     with helper function from pcl_helper."""
-    ros_cloud_objects = pcl_to_ros(cloud_objects)
-    ros_cloud_table = pcl_to_ros(cloud_table)
-    ros_cluster_cloud = pcl_to_ros(cluster_cloud)
+    ros_cloud_objects = pcl_to_ros(frame.cloud_objects)
+    ros_cloud_table = pcl_to_ros(frame.cloud_table)
+    ros_cluster_cloud = pcl_to_ros(frame.cluster_cloud)
 
     ##### Publish ROS messages #####
 
@@ -183,52 +58,65 @@ def pcl_callback(pcl_msg):
     pcl_table_pub.publish(ros_cloud_table)
     pcl_cluster_pub.publish(ros_cluster_cloud)
 
-# Exercise-3 Code (from capture_features.py and features.py) marked by #####: 
-
-    # Classify the clusters! (loop through each detected cluster one at a time)
-    detected_objects_labels = []
     detected_objects = []
-    for index, pts_list in enumerate(cluster_indices):
-        # Grab the points for the cluster from the extracted outliers (cloud_objects)
-        pcl_cluster = cloud_objects.extract(pts_list)
-
-        ##### Convert the cluster from pcl to ROS using helper function. #####
-        ros_cluster = pcl_to_ros(pcl_cluster)
-
-        ##### Extract histogram features as in capture_features.py #####
-
-        """The functions compute_color_histograms() and compute_normal_histograms() 
-        are from features.py and are explained there. The rest are in capture_features.py"""
-
-        chists = compute_color_histograms(ros_cluster, using_hsv=True)
-        normals = get_normals(ros_cluster)
-        nhists = compute_normal_histograms(normals)
-
-        ##### Compute the associated feature vector #####
-        feature = np.concatenate((chists, nhists))
-
-        # Make the prediction, retrieve the label for the result
-        # and add it to detected_objects_labels list
-        prediction = clf.predict(scaler.transform(feature.reshape(1,-1)))
-        label = encoder.inverse_transform(prediction)[0]
-        detected_objects_labels.append(label)
+    for index, pts_list in enumerate(frame.cluster_indices):
+        label = frame.detected_objects_labels[index]
 
         # Publish a label into RViz
-        label_pos = list(white_cloud[pts_list[0]])
+        label_pos = list(frame.cloud_objects[pts_list[0]][:3])
         label_pos[2] += .4
         object_markers_pub.publish(make_label(label,label_pos, index))
 
         # Add the detected object to the list of detected objects.
         do = DetectedObject()
         do.label = label
-        do.cloud = ros_cluster
+        do.cloud = ros_clusters[index]
         detected_objects.append(do)
 
-    rospy.loginfo('Detected {} objects: {}'.format(len(detected_objects_labels), detected_objects_labels))
+    rospy.loginfo('Detected {} objects: {}'.format(len(frame.detected_objects_labels), frame.detected_objects_labels))
+
+    # Startup latency: from launching the node until the first frame made it through the pipeline
+    if not publishing_stage.first_detection:
+        publishing_stage.first_detection = time.time() - start_time
+        rospy.loginfo('First detection {:.3f}s after startup'.format(publishing_stage.first_detection))
+        rospy.set_param('~time_to_first_detection', publishing_stage.first_detection)
 
     # Publish the list of detected objects
     # This is the output needed to complete the next project.
     detected_objects_pub.publish(detected_objects)
+    return frame
+
+publishing_stage.first_detection = None
+
+# Callback function for your Point Cloud Subscriber
+def pcl_callback(pcl_msg):
+    # Only hand the newest frame to the pipeline, the executor drops frames it cannot keep up with.
+    pipeline.submit(Frame(pcl_msg))
+
+def report_stats(event):
+    rospy.loginfo('Pipeline frames: {}'.format(pipeline.stats()))
+    if perception.plane_tracker is not None:
+        rospy.loginfo('Plane tracker: {}'.format(perception.plane_tracker.stats()))
+    if perception.region_clusterer is not None:
+        rospy.loginfo('Region clusterer: {}'.format(perception.region_clusterer.stats()))
+    if perception.cluster_cache is not None:
+        rospy.loginfo('Cluster cache: {}'.format(perception.cluster_cache.stats()))
+    if perception.feature_cache is not None:
+        rospy.loginfo('Feature cache: {}'.format(perception.feature_cache.stats()))
+
+    ##### Publish the stage latency percentiles #####
+    diagnostics_pub.publish(make_diagnostics(stage_timer, rospy.Time.now()))
+    if timing_csv:
+        stage_timer.write_csv(timing_csv)
+
+    """Setting the ~profile param to true (e.g. with rosparam set) profiles every stage
+    for one stats period and writes a <stage>.prof file per stage to ~profile_dir."""
+    if stage_timer.profiling:
+        paths = stage_timer.stop_profiling(profile_dir)
+        rospy.set_param('~profile', False)
+        rospy.loginfo('Wrote stage profiles: {}'.format(', '.join(paths)))
+    elif rospy.get_param('~profile', False):
+        stage_timer.start_profiling()
 
 if __name__ == '__main__':
 
@@ -237,6 +125,70 @@ if __name__ == '__main__':
     # Initializing a new node.
     rospy.init_node('object_reco', anonymous=True)
 
+    # Fall back to the /feature_extractor/get_normals service instead of in-process normals.
+    use_normals_service = rospy.get_param('~use_normals_service', False)
+
+    ##### Create the feature extraction worker pool #####
+
+    """Feature extraction runs per cluster on either a thread pool, which shares memory with
+    the node, or a process pool, which sidesteps the GIL for the Python parts of the work."""
+    feature_workers = rospy.get_param('~feature_workers', multiprocessing.cpu_count())
+    if rospy.get_param('~feature_pool', 'thread') == 'process':
+        feature_pool = multiprocessing.Pool(feature_workers)
+    else:
+        feature_pool = ThreadPool(feature_workers)
+
+    ##### Create the stage timer #####
+
+    """Latency percentiles over the last ~timing_window samples of every stage are published
+    on /diagnostics and, if ~timing_csv is set, appended to that CSV file."""
+    stage_timer = StageTimer(window=rospy.get_param('~timing_window', 500))
+    timing_csv = rospy.get_param('~timing_csv', '')
+    profile_dir = rospy.get_param('~profile_dir', 'profiles')
+
+    # Initialize color_list
+    get_color_list.color_list = []
+
+    # A ~cluster_color_tolerance of 0 or more also splits clusters whose colors differ by more than it.
+    # ~fused_front_end crops, downsamples and segments the cloud in a single python-pcl call.
+    # ~track_plane reuses the table plane of the previous frame while it still fits.
+    # ~incremental tracks the objects in an octree of ~change_resolution voxels, clusters again only the
+    # points around voxels that changed by ~change_min_points or more and classifies only changed clusters.
+    # Clusters seen again are looked up in a cache of ~feature_cache_size entries (0 disables it)
+    # that live for ~feature_cache_ttl seconds.
+    # ~descriptors must name the descriptors the model was trained on, which are used when it is unset.
+    feature_cache_size = rospy.get_param('~feature_cache_size', 64)
+    feature_cache = None
+    if feature_cache_size > 0:
+        feature_cache = FeatureCache(feature_cache_size, rospy.get_param('~feature_cache_ttl', 5.0))
+    perception = Perception(normals=get_cluster_normals if use_normals_service else None,
+                            feature_pool=feature_pool,
+                            timer=stage_timer,
+                            color_tolerance=rospy.get_param('~cluster_color_tolerance', -1.0),
+                            fused_front_end=rospy.get_param('~fused_front_end', False),
+                            track_plane=rospy.get_param('~track_plane', False),
+                            incremental=rospy.get_param('~incremental', False),
+                            change_resolution=rospy.get_param('~change_resolution', 0.02),
+                            change_min_points=rospy.get_param('~change_min_points', 3),
+                            feature_cache=feature_cache,
+                            descriptors=rospy.get_param('~descriptors', None))
+
+    ##### Load Model From disk #####
+
+    """train_svm.py exports linear models to model.npy, which is memory-mapped and predicted with
+    NumPy alone, so scikit-learn is only imported to unpickle model.sav for other kernels or when
+    ~model names it.
+    The model is reloaded, and the feature cache cleared, whenever the file is rewritten."""
+    perception.watch_model(rospy.get_param('~model', 'model.npy' if os.path.exists('model.npy') else 'model.sav'))
+
+    ##### Create the perception pipeline #####
+
+    """The subscriber callback only queues the newest frame. queue_size bounds how many frames
+    may wait in front of each stage; older frames are dropped instead of piling up."""
+    stages = perception.stages() + [('publishing', publishing_stage)]
+    pipeline = PipelineExecutor([(name, stage_timer.timed(name)(stage)) for name, stage in stages],
+                                queue_size=rospy.get_param('~pipeline_queue_size', 1))
+
     ##### Create Subscribers #####
 
     """Subscribing our node to the "sensor_stick/point_cloud" topic so that anytime a message arrives,
@@ -259,16 +211,11 @@ if __name__ == '__main__':
     Message Types "Marker" and "DetectedObjectsArray", respectively."""
     object_markers_pub = rospy.Publisher("/object_markers", Marker, queue_size=1)
     detected_objects_pub = rospy.Publisher("/detected_objects", DetectedObjectsArray, queue_size=1)
+    diagnostics_pub = rospy.Publisher("/diagnostics", DiagnosticArray, queue_size=1)
 
-    ##### Load Model From disk #####
-    model = pickle.load(open('model.sav', 'rb'))
-    clf = model['classifier']
-    encoder = LabelEncoder()
-    encoder.classes_ = model['classes']
-    scaler = model['scaler']
-
-    # Initialize color_list
-    get_color_list.color_list = []
+    # Start the pipeline workers and report the frame counters and stage latencies periodically.
+    pipeline.start()
+    rospy.Timer(rospy.Duration(rospy.get_param('~stats_period', 10.0)), report_stats)
 
     ##### Spin while node is not shutdown #####
     while not rospy.is_shutdown():
@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+
+# Replays recorded point clouds through the perception stages of
+# object_recognition.py without Gazebo or a running ROS graph, and reports
+# the throughput, the per-stage latency and the memory use.
+#
+# Frames are read from .pcd files (e.g. Exercise-1/tabletop.pcd), .npy files
+# holding an (n, 4) XYZRGB array, or the PointCloud2 messages of a .bag file.
+# Normals are estimated in-process, standing in for the GetNormals service.
+#
+# Usage: rosrun sensor_stick replay_pipeline.py [--model model.sav] [--repeat N]
+#            [--workers N] [--topic /sensor_stick/point_cloud] [--csv path] [--fused]
+#            [--track-plane] [--incremental] [--change-min-points N] [--feature-cache N]
+#            [--descriptors NAME...] FILE...
+
+import argparse
+import resource
+import time
+from multiprocessing.pool import ThreadPool
+
+import numpy as np
+
+from sensor_stick.pcl_helper import *
+from sensor_stick.perception import Perception
+from sensor_stick.feature_cache import FeatureCache
+from sensor_stick.timing import StageTimer
+
+
+def load_frames(paths, topic):
+    """ Reads every frame of the given files into memory, so disk access is not timed. """
+    frames = []
+    for path in paths:
+        if path.endswith('.pcd'):
+            frames.append(pcl.load_XYZRGB(path))
+        elif path.endswith('.npy'):
+            frames.append(np.load(path))
+        elif path.endswith('.bag'):
+            import rosbag
+            with rosbag.Bag(path) as bag:
+                for _, msg, _ in bag.read_messages(topics=[topic]):
+                    frames.append(msg)
+        else:
+            raise ValueError('Unsupported frame file: {}'.format(path))
+    return frames
+
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Replay point clouds through the perception pipeline.')
+    parser.add_argument('frames', nargs='+', help='.pcd, .npy or .bag files to replay')
+    parser.add_argument('--model', help='model.sav to classify the clusters with')
+    parser.add_argument('--repeat', type=int, default=10, help='number of passes over the frames')
+    parser.add_argument('--workers', type=int, default=0, help='feature extraction threads, 0 for in-line')
+    parser.add_argument('--topic', default='/sensor_stick/point_cloud', help='point cloud topic of .bag files')
+    parser.add_argument('--csv', help='append the stage latency percentiles to this CSV file')
+    parser.add_argument('--fused', action='store_true', help='crop, downsample and segment in one native call')
+    parser.add_argument('--track-plane', action='store_true', help='reuse the table plane while it still fits')
+    parser.add_argument('--incremental', action='store_true',
+                        help='only cluster again the points around changed voxels and classify changed clusters')
+    parser.add_argument('--change-min-points', type=int, default=3,
+                        help='voxels with fewer new or vacated points are not changes')
+    parser.add_argument('--feature-cache', type=int, default=0, help='size of the cluster feature cache, 0 for none')
+    parser.add_argument('--descriptors', nargs='+', help='descriptors to extract, those of the model by default')
+    args = parser.parse_args()
+
+    # Stamp messages with wall-clock time instead of starting a node
+    rospy.rostime.set_rostime_initialized(True)
+
+    frames = load_frames(args.frames, args.topic)
+    feature_pool = ThreadPool(args.workers) if args.workers > 0 else None
+
+    timer = StageTimer(window=len(frames) * args.repeat)
+    feature_cache = FeatureCache(args.feature_cache) if args.feature_cache > 0 else None
+    perception = Perception(feature_pool=feature_pool, timer=timer, fused_front_end=args.fused,
+                            track_plane=args.track_plane, incremental=args.incremental,
+                            change_min_points=args.change_min_points,
+                            feature_cache=feature_cache, descriptors=args.descriptors)
+    if args.model:
+        perception.watch_model(args.model)
+
+    rss_before = peak_rss_mb()
+    labels = []
+    start = time.time()
+    for _ in range(args.repeat):
+        for frame in frames:
+            labels.append(perception.process(frame).detected_objects_labels)
+    elapsed = time.time() - start
+
+    n_frames = len(frames) * args.repeat
+    print('Replayed {} frames in {:.2f} s: {:.2f} frames/sec'.format(n_frames, elapsed, n_frames / elapsed))
+    print('Peak RSS {:.1f} MB ({:.1f} MB before replaying)'.format(peak_rss_mb(), rss_before))
+    print('{:<22} {:>8} {:>10} {:>10} {:>10}'.format('stage', 'samples', 'p50 ms', 'p95 ms', 'p99 ms'))
+    for name, (count, p50, p95, p99) in timer.percentiles().items():
+        print('{:<22} {:>8} {:>10.2f} {:>10.2f} {:>10.2f}'.format(name, count, p50, p95, p99))
+    if perception.plane_tracker is not None:
+        print('Plane tracker: {}'.format(perception.plane_tracker.stats()))
+    if perception.region_clusterer is not None:
+        print('Region clusterer: {}'.format(perception.region_clusterer.stats()))
+    if perception.cluster_cache is not None:
+        print('Cluster cache: {}'.format(perception.cluster_cache.stats()))
+    if feature_cache is not None:
+        print('Feature cache: {}'.format(feature_cache.stats()))
+    if args.model:
+        print('Labels of the last pass: {}'.format(labels[-len(frames):]))
+
+    if args.csv:
+        timer.write_csv(args.csv)
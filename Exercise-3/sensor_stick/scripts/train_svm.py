@@ -1,21 +1,60 @@
 #!/usr/bin/env python
+
+# Trains the SVM classifier of object_recognition.py on the captured training set.
+#
+# A grid (or random) search over the kernel, C, gamma and the histogram bin
+# counts is cross-validated on n_jobs processes. Every fold of every candidate
+# is fit once, and the scores and confusion matrix of the saved model come
+# from the out-of-fold predictions of that same pass.
+#
+# The candidates that reach --target accuracy are then fit on the whole
+# training set one after the other, and each one is timed alone predicting a
+# batch of --latency-batch samples, the few clusters of a frame, as
+# object_recognition.py would: linear models through the exported
+# LinearSVMPredictor, the others through scikit-learn. The model saved is the
+# fastest of them, or the most accurate candidate if none reaches the target.
+#
+# Usage: rosrun sensor_stick train_svm.py [--target 0.9] [--n-jobs -1] [--search random --n-iter 20]
+#            [--kernels linear rbf] [--C 0.1 1 10] [--gamma auto 0.01 0.1]
+#            [--color-bins 32 16 8] [--normal-bins 20 10 5] [--folds 5] [--no-plot]
+#            [--latency-batch 5] [--latency-repeat 50]
+#            [--descriptors color-hist normal-hist vfh fpfh-mean]
+
+import argparse
+import os
 import pickle
 import itertools
+import time
 import numpy as np
-import matplotlib.pyplot as plt
 from sklearn import svm
+from sklearn.base import clone
+from sklearn.pipeline import Pipeline
 from sklearn.preprocessing import LabelEncoder, StandardScaler
-from sklearn import cross_validation
+from sklearn.model_selection import ParameterGrid
+from sklearn.model_selection import ParameterSampler
+from sklearn.model_selection import StratifiedKFold
 from sklearn import metrics
+try:
+    from joblib import Parallel, delayed
+except ImportError:
+    from sklearn.externals.joblib import Parallel, delayed
+from sensor_stick.classifier import HistogramRebinner
+from sensor_stick.descriptors import DescriptorSet
+from sensor_stick.svm_predictor import LinearSVMPredictor
+from sensor_stick.training_store import TrainingSet
 
 def plot_confusion_matrix(cm, classes,
                           normalize=False,
                           title='Confusion matrix',
-                          cmap=plt.cm.Blues):
+                          cmap=None):
     """
     This function prints and plots the confusion matrix.
     Normalization can be applied by setting `normalize=True`.
     """
+    import matplotlib.pyplot as plt
+
+    if cmap is None:
+        cmap = plt.cm.Blues
     if normalize:
         cm = cm.astype('float') / cm.sum(axis=1)[:, np.newaxis]
     plt.imshow(cm, interpolation='nearest', cmap=cmap)
@@ -35,58 +74,188 @@ def plot_confusion_matrix(cm, classes,
     plt.ylabel('True label')
     plt.xlabel('Predicted label')
 
-# Load training data from disk
-training_set = pickle.load(open('training_set.sav', 'rb'))
 
-# Format the features and labels for use with scikit learn
-feature_list = []
-label_list = []
+def gamma_value(value):
+    return value if value == 'auto' else float(value)
+
+
+def param_grid(args, descriptors):
+    """ Search space of the pipeline steps, without gammas for the linear kernel
+        and without bin counts for the histograms that are not among the descriptors. """
+    bins = {'svc__C': args.C}
+    if 'color-hist' in descriptors:
+        bins['rebin__color_bins'] = args.color_bins
+    if 'normal-hist' in descriptors:
+        bins['rebin__normal_bins'] = args.normal_bins
+    grid = []
+    for kernel in args.kernels:
+        params = dict(bins, svc__kernel=[kernel])
+        if kernel != 'linear':
+            params['svc__gamma'] = args.gamma
+        grid.append(params)
+    return grid
+
+
+def fit_and_predict(pipeline, params, X, y, train, test):
+    """ Fits one candidate on one training fold.
+
+        Returns:
+            tuple: The accuracy on the test fold and the predictions, so the
+                out-of-fold predictions of the chosen candidate need no
+                second fit.
+    """
+    estimator = clone(pipeline).set_params(**params)
+    estimator.fit(X[train], y[train])
+    predictions = estimator.predict(X[test])
+    return metrics.accuracy_score(y[test], predictions), predictions
+
+
+def prediction_latency(predict, batch, repeats):
+    """ Returns the fastest of repeats calls of predict on the batch, in microseconds. """
+    elapsed = []
+    for _ in range(repeats):
+        start = time.time()
+        predict(batch)
+        elapsed.append(time.time() - start)
+    return min(elapsed) * 1e6
+
+
+def deployed_predict(estimator, classes, n_features, descriptors):
+    """ Returns the predict function object_recognition.py would use for a fitted pipeline. """
+    if estimator.named_steps['svc'].kernel == 'linear':
+        return LinearSVMPredictor.from_sklearn(estimator.named_steps['svc'], Pipeline(estimator.steps[:2]),
+                                               classes, n_features, descriptors).predict
+    return estimator.predict
+
+
+def report(cv_results):
+    """ Prints the cross-validated accuracy of every candidate, the most accurate first. """
+    accuracy = np.asarray(cv_results['mean_test_score'])
+    print('{:>8} {:>8}  {}'.format('accuracy', '+/-', 'parameters'))
+    for index in np.argsort(-accuracy):
+        print('{:8.3f} {:8.3f}  {}'.format(accuracy[index], 2*cv_results['std_test_score'][index],
+                                          cv_results['params'][index]))
+
+
+parser = argparse.ArgumentParser(description='Train the object recognition SVM.')
+parser.add_argument('--training-dir', default='training_set', help='training set written by capture_features.py')
+parser.add_argument('--model', default='model.sav', help='where to save the model')
+parser.add_argument('--export', default='model.npy', help='where to save the NumPy predictor of a linear model')
+parser.add_argument('--kernels', nargs='+', default=['linear', 'rbf'])
+parser.add_argument('--C', nargs='+', type=float, default=[0.1, 1.0, 10.0])
+parser.add_argument('--gamma', nargs='+', type=gamma_value, default=['auto', 0.01, 0.1])
+parser.add_argument('--color-bins', nargs='+', type=int, default=[32, 16, 8])
+parser.add_argument('--normal-bins', nargs='+', type=int, default=[20, 10, 5])
+parser.add_argument('--search', choices=['grid', 'random'], default='grid')
+parser.add_argument('--n-iter', type=int, default=20, help='candidates tried by the random search')
+parser.add_argument('--folds', type=int, default=5)
+parser.add_argument('--n-jobs', type=int, default=-1, help='parallel fits, -1 for one per core')
+parser.add_argument('--target', type=float, default=0.9, help='accuracy the saved model must reach')
+parser.add_argument('--latency-batch', type=int, default=5, help='samples per timed prediction, about one frame')
+parser.add_argument('--latency-repeat', type=int, default=50, help='timed predictions per model, the best is kept')
+parser.add_argument('--no-plot', action='store_true', help='do not plot the confusion matrices')
+parser.add_argument('--descriptors', nargs='+', help='train on these of the captured descriptors, all by default')
+args = parser.parse_args()
 
-for item in training_set:
-    if np.isnan(item[0]).sum() < 1:
-        feature_list.append(item[0])
-        label_list.append(item[1])
+# Convert a training set pickled by an older capture_features.py once
+if not os.path.isdir(args.training_dir) and os.path.exists('training_set.sav'):
+    labeled_features = pickle.load(open('training_set.sav', 'rb'))
+    converted = TrainingSet(args.training_dir)
+    converted.extend([item[0] for item in labeled_features], [item[1] for item in labeled_features])
+    converted.commit()
 
-print('Features in Training Set: {}'.format(len(training_set)))
-print('Invalid Features in Training set: {}'.format(len(training_set)-len(feature_list)))
+# Load training data from disk, memory-mapped straight into a float64 matrix
+training_set = TrainingSet(args.training_dir)
+features, labels = training_set.load()
 
-X = np.array(feature_list)
-# Fit a per-column scaler
-X_scaler = StandardScaler().fit(X)
-# Apply the scaler to X
-X_train = X_scaler.transform(X)
-y_train = np.array(label_list)
+# Keep the columns of the selected descriptors, in the order they were named
+captured = DescriptorSet(training_set.descriptors).slices()
+descriptors = DescriptorSet(args.descriptors or training_set.descriptors).names
+missing = [name for name in descriptors if name not in captured]
+if missing:
+    parser.error('{} were not captured, the training set holds {}'.format(missing, list(captured)))
+if descriptors != tuple(captured):
+    features = np.hstack([features[:, captured[name]] for name in descriptors])
+print('Descriptors: {}'.format(', '.join(descriptors)))
+
+# Drop the samples with NaN features (e.g. clouds without valid normals)
+valid = ~np.isnan(features).any(axis=1)
+
+print('Features in Training Set: {}'.format(len(features)))
+print('Invalid Features in Training set: {}'.format(len(features)-valid.sum()))
+
+X_train = features if valid.all() else features[valid]
+y_train = np.array(labels[valid])
 
 # Convert label strings to numerical encoding
 encoder = LabelEncoder()
 y_train = encoder.fit_transform(y_train)
 
-# Create classifier
-clf = svm.SVC(kernel='linear')
-
-# Set up 5-fold cross-validation
-kf = cross_validation.KFold(len(X_train),
-                            n_folds=5,
-                            shuffle=True,
-                            random_state=1)
-
-# Perform cross-validation
-scores = cross_validation.cross_val_score(cv=kf,
-                                         estimator=clf,
-                                         X=X_train, 
-                                         y=y_train,
-                                         scoring='accuracy'
-                                        )
+# The histograms are rebinned before the per-column scaler, and both are fit on the training folds only
+pipeline = Pipeline([('rebin', HistogramRebinner(descriptors=descriptors)),
+                     ('scaler', StandardScaler()),
+                     ('svc', svm.SVC())])
+
+# Set up stratified k-fold cross-validation, shared by the search and the final predictions
+kf = StratifiedKFold(n_splits=args.folds, shuffle=True, random_state=1)
+folds = list(kf.split(X_train, y_train))
+
+##### Search the hyperparameters #####
+
+if args.search == 'grid':
+    candidates = list(ParameterGrid(param_grid(args, descriptors)))
+else:
+    distributions = param_grid(args, descriptors)[-1]
+    distributions['svc__kernel'] = args.kernels
+    distributions.setdefault('svc__gamma', args.gamma)
+    candidates = list(ParameterSampler(distributions, n_iter=args.n_iter, random_state=1))
+
+# Every (candidate, fold) pair is fit once, on n_jobs processes
+results = Parallel(n_jobs=args.n_jobs)(delayed(fit_and_predict)(pipeline, params, X_train, y_train, train, test)
+                                       for params in candidates for train, test in folds)
+fold_scores = np.array([result[0] for result in results]).reshape(len(candidates), len(folds))
+cv_results = {'params': candidates,
+              'mean_test_score': fold_scores.mean(axis=1),
+              'std_test_score': fold_scores.std(axis=1)}
+report(cv_results)
+
+##### Time the candidates that reach the target #####
+
+"""The search runs many fits at once, so its timings say little about the latency of one model.
+The candidates are fit on the whole training set and timed one at a time instead, on the same
+small batch and as they would be deployed."""
+accuracy = cv_results['mean_test_score']
+meets_target = np.flatnonzero(accuracy >= args.target)
+batch = X_train[np.random.RandomState(1).choice(len(X_train), min(args.latency_batch, len(X_train)), replace=False)]
+fitted = {}
+if len(meets_target) == 0:
+    best = int(np.argmax(accuracy))
+    fitted[best] = clone(pipeline).set_params(**candidates[best]).fit(X_train, y_train)
+    print('No model reaches {:.3f} accuracy, keeping the most accurate one'.format(args.target))
+else:
+    latency = {}
+    print('{:>8} {:>12}  {}'.format('accuracy', 'us/batch', 'parameters'))
+    for index in meets_target:
+        fitted[index] = clone(pipeline).set_params(**candidates[index]).fit(X_train, y_train)
+        predict = deployed_predict(fitted[index], encoder.classes_, X_train.shape[1], descriptors)
+        latency[index] = prediction_latency(predict, batch, args.latency_repeat)
+        print('{:8.3f} {:12.2f}  {}'.format(accuracy[index], latency[index], candidates[index]))
+    best = int(min(latency, key=latency.get))
+    print('Fastest model with at least {:.3f} accuracy, predicting {} samples in {:.2f} us:'.format(
+        args.target, len(batch), latency[best]))
+print('  {} (accuracy {:.3f})'.format(candidates[best], accuracy[best]))
+pipeline = fitted[best]
+
+##### Cross-validate the chosen model #####
+
+# The out-of-fold predictions of the chosen candidate were made by the search
+predictions = np.empty_like(y_train)
+for (_, test), result in zip(folds, results[best * len(folds):(best + 1) * len(folds)]):
+    predictions[test] = result[1]
+scores = fold_scores[best]
 print('Scores: ' + str(scores))
 print('Accuracy: %0.2f (+/- %0.2f)' % (scores.mean(), 2*scores.std()))
 
-# Gather predictions
-predictions = cross_validation.cross_val_predict(cv=kf,
-                                          estimator=clf,
-                                          X=X_train, 
-                                          y=y_train
-                                         )
-
 accuracy_score = metrics.accuracy_score(y_train, predictions)
 print('accuracy score: '+str(accuracy_score))
 
@@ -95,22 +264,42 @@ confusion_matrix = metrics.confusion_matrix(y_train, predictions)
 class_names = encoder.classes_.tolist()
 
 
-#Train the classifier
-clf.fit(X=X_train, y=y_train)
-
-model = {'classifier': clf, 'classes': encoder.classes_, 'scaler': X_scaler}
+# The chosen candidate was already fit on the whole training set above
+# The rebinning and scaling steps stand in for the scaler, so the classifier still sees scaled features
+model = {'classifier': pipeline.named_steps['svc'], 'classes': encoder.classes_,
+         'scaler': Pipeline(pipeline.steps[:2]), 'descriptors': descriptors}
 
 # Save classifier to disk
-pickle.dump(model, open('model.sav', 'wb'))
+pickle.dump(model, open(args.model, 'wb'))
+
+##### Export a NumPy predictor #####
+
+"""A linear model is also exported with the rebinning and scaling folded into its weights,
+so object_recognition.py predicts with a single matrix product and without scikit-learn."""
+if model['classifier'].kernel == 'linear':
+    predictor = LinearSVMPredictor.from_sklearn(model['classifier'], model['scaler'], encoder.classes_,
+                                                X_train.shape[1], descriptors)
+    agreement = np.mean(predictor.predict(X_train) == encoder.inverse_transform(pipeline.predict(X_train)))
+    predictor.save(args.export)
+    print('Exported {} ({:.2%} agreement with the scikit-learn model)'.format(args.export, agreement))
+else:
+    # A stale export of an earlier linear model would be loaded instead of this one
+    for path in (args.export, os.path.splitext(args.export)[0] + '.json'):
+        if os.path.exists(path):
+            os.remove(path)
+
+if not args.no_plot:
+    # matplotlib is only imported when the confusion matrices are plotted
+    import matplotlib.pyplot as plt
 
-# Plot non-normalized confusion matrix
-plt.figure()
-plot_confusion_matrix(confusion_matrix, classes=encoder.classes_,
-                      title='Confusion matrix, without normalization')
+    # Plot non-normalized confusion matrix
+    plt.figure()
+    plot_confusion_matrix(confusion_matrix, classes=encoder.classes_,
+                          title='Confusion matrix, without normalization')
 
-# Plot normalized confusion matrix
-plt.figure()
-plot_confusion_matrix(confusion_matrix, classes=encoder.classes_, normalize=True,
-                      title='Normalized confusion matrix')
+    # Plot normalized confusion matrix
+    plt.figure()
+    plot_confusion_matrix(confusion_matrix, classes=encoder.classes_, normalize=True,
+                          title='Normalized confusion matrix')
 
-plt.show()
+    plt.show()
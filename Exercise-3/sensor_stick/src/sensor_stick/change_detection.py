@@ -0,0 +1,202 @@
+import threading
+
+import numpy as np
+import pcl
+
+
+VOXEL_MASK = 0x1fffff
+
+
+def voxel_keys(points, resolution):
+    """ Packs the voxel coordinates of every point into one int64 key per point. """
+    voxels = np.floor(points[:, :3] / resolution).astype(np.int64) & VOXEL_MASK
+    return (voxels[:, 0] << 42) | (voxels[:, 1] << 21) | voxels[:, 2]
+
+
+def contains(sorted_keys, keys):
+    """ Returns a mask of the keys that are in sorted_keys, a sorted array of unique keys. """
+    positions = np.searchsorted(sorted_keys, keys).clip(0, max(len(sorted_keys) - 1, 0))
+    return sorted_keys[positions] == keys if len(sorted_keys) else np.zeros(len(keys), dtype=bool)
+
+
+def dilate_voxels(keys, radius):
+    """ Returns the unique keys of the voxels within radius voxels (per axis) of the given ones. """
+    keys = np.unique(keys)
+    if radius <= 0 or len(keys) == 0:
+        return keys
+    voxels = np.column_stack(((keys >> 42) & VOXEL_MASK, (keys >> 21) & VOXEL_MASK, keys & VOXEL_MASK))
+    steps = np.arange(-radius, radius + 1)
+    offsets = np.stack(np.meshgrid(steps, steps, steps, indexing='ij'), axis=-1).reshape(-1, 3)
+    neighbors = (voxels[:, np.newaxis, :] + offsets) & VOXEL_MASK
+    return np.unique((neighbors[..., 0] << 42) | (neighbors[..., 1] << 21) | neighbors[..., 2])
+
+
+class ChangeDetector(object):
+    """ Finds the points of the object cloud that lie in newly occupied voxels.
+
+        Keeps a double-buffered octree (OctreePointCloudChangeDetector) of the
+        object cloud: every update() moves the octree of the last cloud to the
+        previous buffer, adds the new cloud to the current buffer and returns
+        the indices of its points in voxels the previous cloud did not occupy.
+        The first cloud is new everywhere. The octree only reports voxels that
+        appeared, so the voxels that were vacated (e.g. by an object that was
+        picked up) are found from the voxel keys of both clouds.
+
+        Args:
+            resolution (float): Edge length of the octree voxels in meters
+            min_points_per_leaf (int): Voxels that appear or are vacated with
+                fewer points are treated as sensor noise and ignored, e.g. the
+                points near the table plane that RANSAC keeps in one frame and
+                not in the next
+    """
+    def __init__(self, resolution=0.02, min_points_per_leaf=0):
+        self.resolution = resolution
+        self.min_points_per_leaf = min_points_per_leaf
+        self.octree = pcl.OctreePointCloudChangeDetector_PointXYZRGB(resolution)
+        self.voxels = np.empty(0, dtype=np.int64)
+        self.voxel_points = np.empty(0, dtype=np.int64)
+
+    def update(self, cloud):
+        """ Adds the next cloud.
+
+            Returns:
+                tuple: The indices of the points of cloud in voxels that were
+                    empty in the previous cloud, and the keys (see voxel_keys())
+                    of the voxels of the previous cloud that are empty now
+        """
+        self.octree.switchBuffers()
+        self.octree.set_input_cloud(cloud)
+        self.octree.add_points_from_input_cloud()
+        changed = np.asarray(self.octree.get_PointIndicesFromNewVoxels(self.min_points_per_leaf), dtype=np.int64)
+
+        voxels, voxel_points = np.unique(voxel_keys(cloud.to_array(), self.resolution), return_counts=True)
+        vacated = np.setdiff1d(self.voxels[self.voxel_points >= self.min_points_per_leaf], voxels, assume_unique=True)
+        self.voxels = voxels
+        self.voxel_points = voxel_points
+        return changed, vacated
+
+
+class RegionClusterer(object):
+    """ Clusters again only the part of the object cloud around changed voxels.
+
+        The changed voxels, new and vacated ones, are grown by the cluster
+        tolerance. The clusters of the last frame that reach into that region
+        are clustered again together with the points in it, since a change
+        may have split, grown or merged them. Every other cluster of the last
+        frame occupies the same voxels as before, so it keeps the points of
+        the new cloud in those voxels without being clustered again.
+
+        Args:
+            resolution (float): Voxel size of the ChangeDetector in meters
+            tolerance (float): Cluster tolerance of the Euclidean clustering
+    """
+    def __init__(self, resolution=0.02, tolerance=0.02):
+        self.resolution = resolution
+        self.margin = int(np.ceil(tolerance / resolution))
+        self.cluster_voxels = None
+        self.counters = {'kept': 0, 'clustered_points': 0, 'total_points': 0}
+
+    def update(self, points, changed, vacated, cluster):
+        """ Returns the clusters of the next cloud.
+
+            Args:
+                points (ndarray): (n, 4) XYZRGB array of the object cloud
+                changed (ndarray): Indices of its points in new voxels
+                vacated (ndarray): Keys of the voxels that are empty now
+                cluster (function): Takes an array of indices of points and
+                    returns the clusters among those points, as index lists
+
+            Returns:
+                list: Lists of point indices, one per cluster. The clusters
+                    that were kept come first.
+        """
+        keys = voxel_keys(points, self.resolution)
+        if self.cluster_voxels is None:
+            region = np.arange(len(points))
+            kept = []
+        else:
+            dirty = dilate_voxels(np.concatenate((keys[changed], vacated)), self.margin)
+            kept = []
+            region_voxels = [dirty]
+            for voxels in self.cluster_voxels:
+                if contains(dirty, voxels).any():
+                    region_voxels.append(voxels)
+                else:
+                    kept.append(np.flatnonzero(contains(voxels, keys)).tolist())
+            region = np.flatnonzero(contains(np.unique(np.concatenate(region_voxels)), keys))
+
+        clusters = kept + [list(indices) for indices in cluster(region)] if len(region) else kept
+        self.cluster_voxels = [np.unique(keys[np.asarray(indices, dtype=np.intp)]) for indices in clusters]
+
+        self.counters['kept'] += len(kept)
+        self.counters['clustered_points'] += len(region)
+        self.counters['total_points'] += len(points)
+        return clusters
+
+    def stats(self):
+        """ Returns the number of clusters kept and the share of the points that were clustered again. """
+        stats = dict(self.counters)
+        total = stats['total_points']
+        stats['clustered_rate'] = stats['clustered_points'] / float(total) if total else 0.0
+        return stats
+
+
+class ClusterCache(object):
+    """ Remembers the features and label of every cluster of the last classified frame.
+
+        A cluster that has no points in changed voxels is looked up by the
+        voxels it occupies. When it occupies exactly the voxels of a single
+        cluster of the last frame, that cluster's features and label are
+        reused instead of extracting and classifying them again. A cluster
+        that lost voxels, e.g. one half of an object that was split, is
+        classified again.
+
+        Args:
+            resolution (float): Voxel size the clusters are matched with,
+                normally the resolution of the ChangeDetector
+    """
+    def __init__(self, resolution=0.02):
+        self.resolution = resolution
+        self.voxel_clusters = {}
+        self.voxel_counts = []
+        self.features = []
+        self.labels = []
+        self.lock = threading.Lock()
+        self.counters = {'reused': 0, 'classified': 0}
+
+    def lookup(self, points):
+        """ Returns the (features, label) cached for a cluster, or None. """
+        keys = np.unique(voxel_keys(points, self.resolution))
+        clusters = set(self.voxel_clusters.get(key) for key in keys)
+        if len(clusters) != 1 or None in clusters:
+            return None
+        index = clusters.pop()
+        # All voxels belong to the cached cluster, so equal counts mean equal voxel sets
+        if len(keys) != self.voxel_counts[index]:
+            return None
+        return self.features[index], self.labels[index]
+
+    def store(self, cluster_points, features, labels):
+        """ Replaces the cache with the clusters of the frame that was just classified. """
+        self.voxel_clusters = {}
+        self.voxel_counts = []
+        for index, points in enumerate(cluster_points):
+            keys = np.unique(voxel_keys(points, self.resolution))
+            for key in keys:
+                self.voxel_clusters[key] = index
+            self.voxel_counts.append(len(keys))
+        self.features = list(features)
+        self.labels = list(labels)
+
+    def count(self, reused, classified):
+        with self.lock:
+            self.counters['reused'] += reused
+            self.counters['classified'] += classified
+
+    def stats(self):
+        """ Returns the reused and classified cluster counts and the reuse rate. """
+        with self.lock:
+            stats = dict(self.counters)
+        total = stats['reused'] + stats['classified']
+        stats['reuse_rate'] = stats['reused'] / float(total) if total else 0.0
+        return stats
@@ -0,0 +1,51 @@
+import numpy as np
+from sklearn.base import BaseEstimator
+from sklearn.base import TransformerMixin
+
+from features import COLOR_BINS
+from features import NORMAL_BINS
+from descriptors import DEFAULT_DESCRIPTORS
+from descriptors import DescriptorSet
+
+
+class HistogramRebinner(BaseEstimator, TransformerMixin):
+    """ Merges adjacent histogram bins of compute_features() vectors.
+
+        The captured features hold COLOR_BINS bins per color channel and
+        NORMAL_BINS bins per normal component. Summing groups of adjacent
+        bins gives exactly the features that fewer bins over the same range
+        would have produced, so coarser histograms can be tried without
+        capturing the training set again. Being an estimator, it can be a
+        step of a Pipeline and have its bin counts searched over.
+
+        Args:
+            color_bins (int): Bins per color channel, a divisor of COLOR_BINS
+            normal_bins (int): Bins per normal component, a divisor of NORMAL_BINS
+            descriptors (list): Names of the descriptors the vectors are made
+                of. Those other than color-hist and normal-hist pass unchanged.
+    """
+    # Models pickled before the descriptors could be selected hold the default ones
+    descriptors = DEFAULT_DESCRIPTORS
+
+    def __init__(self, color_bins=COLOR_BINS, normal_bins=NORMAL_BINS, descriptors=DEFAULT_DESCRIPTORS):
+        self.color_bins = color_bins
+        self.normal_bins = normal_bins
+        self.descriptors = descriptors
+
+    def fit(self, X, y=None):
+        if COLOR_BINS % self.color_bins or NORMAL_BINS % self.normal_bins:
+            raise ValueError('Bin counts must divide {} and {}, got {} and {}'.format(
+                COLOR_BINS, NORMAL_BINS, self.color_bins, self.normal_bins))
+        return self
+
+    def transform(self, X):
+        X = np.asarray(X)
+        n = len(X)
+        bins = {'color-hist': self.color_bins, 'normal-hist': self.normal_bins}
+        parts = []
+        for name, columns in DescriptorSet(self.descriptors).slices().items():
+            if name in bins:
+                parts.append(X[:, columns].reshape(n, 3, bins[name], -1).sum(axis=3).reshape(n, -1))
+            else:
+                parts.append(X[:, columns])
+        return np.hstack(parts)
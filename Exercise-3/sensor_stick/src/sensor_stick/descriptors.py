@@ -0,0 +1,115 @@
+import collections
+
+import numpy as np
+import pcl
+
+from pcl_helper import *
+from features import COLOR_BINS
+from features import NORMAL_BINS
+from features import compute_color_histograms
+from features import compute_normal_histograms
+from features import normals_to_array
+
+
+# Every descriptor is registered under its name with the function computing it
+# and the length of its output. The functions take the (n, 4) XYZRGB points of
+# one cluster and their (n, 3) normals, so the normals are estimated once and
+# shared by all descriptors of the cluster.
+DESCRIPTORS = collections.OrderedDict()
+
+# The descriptors of compute_features(), used when no others are selected
+DEFAULT_DESCRIPTORS = ('color-hist', 'normal-hist')
+
+# Neighborhood of the FPFH of every point, larger than the 3cm of the normals
+FPFH_RADIUS = 0.05
+
+
+def register_descriptor(name, length):
+    """ Decorator adding a descriptor function to DESCRIPTORS under name. """
+    def register(function):
+        DESCRIPTORS[name] = (function, length)
+        return function
+    return register
+
+
+def normalized(histogram):
+    """ Divides a histogram by its total, so clusters of any size compare, or returns zeros if it is empty. """
+    histogram = np.asarray(histogram, dtype=np.float64)
+    total = histogram.sum()
+    return histogram / total if total > 0 else histogram
+
+
+def finite_cloud(points, normals):
+    """ Returns a pcl XYZRGB cloud of the points that have a finite normal, and those normals. """
+    valid = np.isfinite(normals).all(axis=1)
+    cloud = pcl.PointCloud_PointXYZRGB()
+    cloud.from_array(np.asarray(points[valid], dtype=np.float32))
+    return cloud, normals[valid]
+
+
+@register_descriptor('color-hist', 3 * COLOR_BINS)
+def color_histogram_descriptor(points, normals):
+    """ HSV histograms of compute_color_histograms(). """
+    return compute_color_histograms(points, using_hsv=True)
+
+
+@register_descriptor('normal-hist', 3 * NORMAL_BINS)
+def normal_histogram_descriptor(points, normals):
+    """ Normal component histograms of compute_normal_histograms(). """
+    return compute_normal_histograms(normals)
+
+
+@register_descriptor('vfh', 308)
+def vfh_descriptor(points, normals):
+    """ Viewpoint Feature Histogram of the whole cluster: the angles between the
+        normals and the viewing direction and the centroid, normalized. """
+    cloud, normals = finite_cloud(points, normals)
+    if cloud.size == 0:
+        return np.zeros(308)
+    return normalized(cloud.compute_vfh(normals))
+
+
+@register_descriptor('fpfh-mean', 33)
+def fpfh_mean_descriptor(points, normals):
+    """ Fast Point Feature Histograms of all points within FPFH_RADIUS, averaged
+        over the cluster and normalized. """
+    cloud, normals = finite_cloud(points, normals)
+    if cloud.size == 0:
+        return np.zeros(33)
+    return normalized(cloud.compute_fpfh_mean(normals, FPFH_RADIUS))
+
+
+class DescriptorSet(object):
+    """ Computes the feature vector of a cluster from the descriptors selected by name.
+
+        The vector is the concatenation of the descriptors, in the order they
+        are named. The default set gives the same vectors as compute_features().
+        An instance can be mapped over a thread or process pool.
+
+        Args:
+            names (list): Names of registered DESCRIPTORS, case insensitive
+    """
+    def __init__(self, names=DEFAULT_DESCRIPTORS):
+        self.names = tuple(name.lower() for name in names)
+        unknown = [name for name in self.names if name not in DESCRIPTORS]
+        if unknown or not self.names:
+            raise ValueError('Unknown descriptors {}, choose from {}'.format(unknown, list(DESCRIPTORS)))
+
+    def __len__(self):
+        return sum(DESCRIPTORS[name][1] for name in self.names)
+
+    def slices(self):
+        """ Returns the columns of every descriptor in the feature vector, by name. """
+        slices = collections.OrderedDict()
+        start = 0
+        for name in self.names:
+            slices[name] = slice(start, start + DESCRIPTORS[name][1])
+            start = slices[name].stop
+        return slices
+
+    def __call__(self, cluster):
+        """ Feature vector of one cluster, a (points, normals) pair like compute_features() takes. """
+        points, normals = cluster
+        points = points if isinstance(points, np.ndarray) else ros_to_array(points)
+        normals = normals_to_array(normals)
+        return np.concatenate([DESCRIPTORS[name][0](points, normals) for name in self.names])
@@ -0,0 +1,89 @@
+import collections
+import threading
+import time
+
+import numpy as np
+
+
+def cluster_fingerprint(points, quantum=0.01, count_quantum=20, color_quantum=16):
+    """ Cheap key that stays the same for a cluster seen again in the next frame.
+
+        Combines the centroid and extent of the points, quantized to quantum
+        meters, the point count, quantized to count_quantum points, and the mean
+        color, quantized to color_quantum levels per channel.
+
+        Args:
+            points (ndarray): (n, 4) XYZRGB array with packed float rgb
+
+        Returns:
+            tuple: The fingerprint, usable as a dict key
+    """
+    xyz = points[:, :3]
+    centroid = np.round(xyz.mean(axis=0) / quantum).astype(int)
+    extent = np.round((xyz.max(axis=0) - xyz.min(axis=0)) / quantum).astype(int)
+
+    rgb = np.ascontiguousarray(points[:, 3], dtype=np.float32).view(np.uint32)
+    colors = np.column_stack(((rgb >> 16) & 255, (rgb >> 8) & 255, rgb & 255))
+    color = (colors.mean(axis=0) // color_quantum).astype(int)
+
+    return tuple(centroid) + tuple(extent) + (len(points) // count_quantum,) + tuple(color)
+
+
+class FeatureCache(object):
+    """ Size-bounded LRU cache of cluster features and labels with a time to live.
+
+        Entries are keyed by cluster_fingerprint(). The least recently used
+        entry is evicted when the cache is full, and entries older than ttl
+        seconds are treated as missing. Labels depend on the model, so the
+        cache must be cleared when the model changes.
+
+        Args:
+            max_size (int): Largest number of cached clusters
+            ttl (float): Seconds an entry stays valid
+    """
+    def __init__(self, max_size=64, ttl=5.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries = collections.OrderedDict()
+        self.lock = threading.Lock()
+        self.counters = {'hits': 0, 'misses': 0, 'expired': 0, 'evicted': 0}
+
+    def get(self, key):
+        """ Returns the cached (features, label) for a fingerprint, or None. """
+        now = time.time()
+        with self.lock:
+            entry = self.entries.pop(key, None)
+            if entry is None:
+                self.counters['misses'] += 1
+                return None
+            stamp, value = entry
+            if now - stamp > self.ttl:
+                self.counters['expired'] += 1
+                self.counters['misses'] += 1
+                return None
+            self.entries[key] = entry
+            self.counters['hits'] += 1
+            return value
+
+    def put(self, key, features, label):
+        """ Caches the features and label of a cluster, evicting the least recently used entry if full. """
+        with self.lock:
+            self.entries.pop(key, None)
+            self.entries[key] = (time.time(), (features, label))
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+                self.counters['evicted'] += 1
+
+    def clear(self):
+        """ Drops every entry, e.g. after the model was reloaded. """
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        """ Returns the hit, miss, expiry and eviction counts, the hit rate and the size. """
+        with self.lock:
+            stats = dict(self.counters)
+            stats['size'] = len(self.entries)
+        total = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / float(total) if total else 0.0
+        return stats
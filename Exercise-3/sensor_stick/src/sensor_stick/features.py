@@ -1,47 +1,73 @@
-import matplotlib.colors
-import matplotlib.pyplot as plt
 import numpy as np
 from pcl_helper import *
 
 
+# Bins per channel of the color histograms and per component of the normal histograms
+COLOR_BINS = 32
+NORMAL_BINS = 20
+
+
 def rgb_to_hsv(rgb_list):
-    rgb_normalized = [1.0*rgb_list[0]/255, 1.0*rgb_list[1]/255, 1.0*rgb_list[2]/255]
-    hsv_normalized = matplotlib.colors.rgb_to_hsv([[rgb_normalized]])[0][0]
+    """Accepts a single [r, g, b] color or an (n, 3) array of colors in [0-255]
+    and returns normalized HSV values in [0-1] with the same shape.
+    Same result as matplotlib.colors.rgb_to_hsv(), without importing matplotlib."""
+    rgb_normalized = np.asarray(rgb_list, dtype=np.float64) / 255
+    hsv_normalized = np.zeros_like(rgb_normalized)
+
+    value = rgb_normalized.max(-1)
+    delta = value - rgb_normalized.min(-1)
+    colored = delta > 0
+
+    # Saturation, zero for black
+    lit = value > 0
+    hsv_normalized[lit, 1] = delta[lit] / value[lit]
+
+    # Hue from the channel holding the maximum, later channels taking precedence on ties
+    red, green, blue = rgb_normalized[..., 0], rgb_normalized[..., 1], rgb_normalized[..., 2]
+    hue = np.zeros_like(value)
+    idx = (red == value) & colored
+    hue[idx] = (green[idx] - blue[idx]) / delta[idx]
+    idx = (green == value) & colored
+    hue[idx] = 2. + (blue[idx] - red[idx]) / delta[idx]
+    idx = (blue == value) & colored
+    hue[idx] = 4. + (red[idx] - green[idx]) / delta[idx]
+
+    hsv_normalized[..., 0] = (hue / 6.0) % 1.0
+    hsv_normalized[..., 2] = value
     return hsv_normalized
 
 
+def unpack_rgb(float_rgb):
+    """Vectorized float_to_rgb(): splits an array of RGB values packed as floats
+    into an (n, 3) uint8 array of [r, g, b] by reading the float bits as uint32."""
+    packed = np.ascontiguousarray(float_rgb, dtype=np.float32).view(np.uint32)
+    rgb = np.empty((packed.shape[0], 3), dtype=np.uint8)
+    rgb[:, 0] = (packed >> 16) & 0xFF
+    rgb[:, 1] = (packed >> 8) & 0xFF
+    rgb[:, 2] = packed & 0xFF
+    return rgb
+
+
 def compute_color_histograms(cloud, using_hsv=True):
 
     # Compute histograms for the clusters
-    point_colors_list = []
-
-    # Step through each point in the point cloud
-    for point in pc2.read_points(cloud, skip_nans=True):
-    	"""Using float_to_rgb() function from pcl_helper.py to convert the 
-    	RGB value packed as a float in point (X,Y,Z,RGB as float) which is point[3] 
-    	to color (list): 3-element list of integers [0-255,0-255,0-255]."""
-        rgb_list = float_to_rgb(point[3])
-        if using_hsv:
-            point_colors_list.append(rgb_to_hsv(rgb_list) * 255)
-            """ * 255 as seen in the function rgb_to_hsv() above, we get normalized values,
-            out of 1, so multiplying it to 255 to have rgb and hsv values the same range."""
-        else:
-            point_colors_list.append(rgb_list)
-
-    # Populate lists with color values
-    channel_1_vals = []
-    channel_2_vals = []
-    channel_3_vals = []
-
-    for color in point_colors_list:
-        channel_1_vals.append(color[0])
-        channel_2_vals.append(color[1])
-        channel_3_vals.append(color[2])
-    
+
+    """cloud is either a PointCloud2 or an (n, 4) XYZRGB array. A PointCloud2 is converted
+    at once with ros_to_array() from pcl_helper.py, which drops NaN points.
+    Column 3 holds the RGB value packed as a float (X,Y,Z,RGB as float)
+    and unpack_rgb() turns it into an (n, 3) array of integers [0-255,0-255,0-255]."""
+    cloud_arr = cloud if isinstance(cloud, np.ndarray) else ros_to_array(cloud)
+    point_colors = unpack_rgb(cloud_arr[:, 3])
+
+    if using_hsv:
+        point_colors = rgb_to_hsv(point_colors) * 255
+        """ * 255 as seen in the function rgb_to_hsv() above, we get normalized values,
+        out of 1, so multiplying it to 255 to have rgb and hsv values the same range."""
+
     ##### Compute histograms #####
 
-    """The bins and the range are on the x-axis and are not a necessary arguments but
-    are given to have consistency in all histograms as they will be compared accordingly.
+    """The bins and the range are on the x-axis and are given to have consistency in
+    all histograms as they will be compared accordingly.
     The chosen range is 0-256 and 32 bins so each bin has a range of 256/32 = 8.
     The first bins has a range 0-8 so if there a 'n' points in the bin, 'n' points
     in the cloud have a value [0-8].
@@ -51,17 +77,19 @@ def compute_color_histograms(cloud, using_hsv=True):
     """NOTE: If the bins are too many, the model will start overfitting.
     Meaning, the data will get too precise and will not match the actual test pieces
     as the number of poses is small that we use to collect data."""
-    
-    ch_1_hist = np.histogram(channel_1_vals, bins=32, range=(0, 256))
-    ch_2_hist = np.histogram(channel_2_vals, bins=32, range=(0, 256))
-    ch_3_hist = np.histogram(channel_3_vals, bins=32, range=(0, 256))
+
+    nbins = COLOR_BINS
+    bin_width = 256 / nbins
+
+    """Every channel value is mapped to its bin number, and channel c is shifted by
+    c * nbins so a single np.bincount() fills all three histograms back to back,
+    giving the same counts as three np.histogram() calls over (0, 256)."""
+    bin_indices = np.clip((point_colors // bin_width).astype(np.intp), 0, nbins - 1)
+    bin_indices += np.arange(3) * nbins
 
     ##### Concatenate the histograms into a single feature vector #####
 
-    """np.histogram() returns a tuple of two arrays.
-    r_hist[0] contains the counts in each of the bins and r_hist[1] contains the bin edges.
-    r_hist[0] is the feature we need, the value distribution of points in a cloud."""
-    hist_features = np.concatenate((ch_1_hist[0], ch_2_hist[0], ch_3_hist[0])).astype(np.float64)
+    hist_features = np.bincount(bin_indices.ravel(), minlength=3 * nbins).astype(np.float64)
 
     ##### Normalize the result #####
 
@@ -71,26 +99,48 @@ def compute_color_histograms(cloud, using_hsv=True):
     return normed_features 
 
 
+def compute_normals(cloud, search_radius=0.03):
+    """Estimates the normal of every point of a pcl XYZRGB cloud in-process, using
+    all neighbors in a sphere of radius 3cm like the GetNormals service of the
+    feature_extractor node. Returns an (n, 3) array of normal_x, normal_y, normal_z
+    that compute_normal_histograms() accepts in place of the service response."""
+    return cloud.compute_normals(searchRadius=search_radius)[:, :3]
+
+
+def compute_cluster_normals(cloud, cluster_indices, search_radius=0.03):
+    """Batch version of compute_normals() for the clusters of one scene. The normals of
+    the whole cloud are estimated once against a single KdTree, so points near a cluster
+    border keep their neighbors from the scene, and each cluster gets its slice of them.
+    Returns one (n, 3) normals array per entry of cluster_indices."""
+    normals = compute_normals(cloud, search_radius)
+    return [normals[np.asarray(indices, dtype=np.intp)] for indices in cluster_indices]
+
+
+def normals_to_array(normal_cloud):
+    """normal_cloud is either the PointCloud2 returned by the GetNormals service
+    or the (n, 3) array returned by compute_normals(). Returns it as an (n, 3) array."""
+    if isinstance(normal_cloud, np.ndarray):
+        return normal_cloud
+    points = ros_to_structured(normal_cloud)
+    return np.column_stack((points['normal_x'], points['normal_y'], points['normal_z']))
+
+
 def compute_normal_histograms(normal_cloud):
-    norm_x_vals = []
-    norm_y_vals = []
-    norm_z_vals = []
 
-    for norm_component in pc2.read_points(normal_cloud,
-                                          field_names = ('normal_x', 'normal_y', 'normal_z'),
-                                          skip_nans=True):
-        norm_x_vals.append(norm_component[0])
-        norm_y_vals.append(norm_component[1])
-        norm_z_vals.append(norm_component[2])
+    """normal_cloud is anything normals_to_array() accepts."""
+    normals = normals_to_array(normal_cloud)
+
+    # Points without enough neighbors get NaN normals, skip them
+    normals = normals[np.isfinite(normals).all(axis=1)]
 
     ##### Compute histograms of normal values (just like with color) #####
 
     """Range is [-1,1] as these are the x,y,z components of normals which are unit vecotors
     so a componenet can have a max magnitude of 1."""
 
-    norm_x_hist = np.histogram(norm_x_vals, bins=20, range=(-1, 1))
-    norm_y_hist = np.histogram(norm_y_vals, bins=20, range=(-1, 1))
-    norm_z_hist = np.histogram(norm_z_vals, bins=20, range=(-1, 1))
+    norm_x_hist = np.histogram(normals[:, 0], bins=NORMAL_BINS, range=(-1, 1))
+    norm_y_hist = np.histogram(normals[:, 1], bins=NORMAL_BINS, range=(-1, 1))
+    norm_z_hist = np.histogram(normals[:, 2], bins=NORMAL_BINS, range=(-1, 1))
 
     ##### Concatenate the histograms into a single feature vector #####
 
@@ -101,3 +151,14 @@ def compute_normal_histograms(normal_cloud):
     normed_features = hist_features / np.sum(hist_features)
 
     return normed_features
+
+
+def compute_features(cluster):
+    """Feature vector of one cluster: its color histograms followed by its normal histograms.
+    cluster is a (points, normals) pair, where points is anything compute_color_histograms()
+    accepts and normals anything compute_normal_histograms() accepts. It takes a single
+    argument so it can be mapped over a thread or process pool."""
+    points, normals = cluster
+    chists = compute_color_histograms(points, using_hsv=True)
+    nhists = compute_normal_histograms(normals)
+    return np.concatenate((chists, nhists))
@@ -0,0 +1,481 @@
+import os
+import pickle
+
+import numpy as np
+import pcl
+
+from pcl_helper import *
+from features import compute_cluster_normals
+from descriptors import DEFAULT_DESCRIPTORS
+from descriptors import DescriptorSet
+from pipeline import Frame
+from plane_tracker import PlaneTracker
+from change_detection import ChangeDetector
+from change_detection import ClusterCache
+from change_detection import RegionClusterer
+from feature_cache import cluster_fingerprint
+from svm_predictor import LinearSVMPredictor
+from svm_predictor import PickledModelPredictor
+from timing import StageTimer
+
+
+# Exercise-2 Code (from segmentation.py in Exercise 2) marked by #####:
+
+class Perception(object):
+    """ The perception chain of object_recognition.py without the ROS graph around it.
+
+        The work done for every point cloud is split into stages (filtering,
+        segmentation, clustering and classification) that each take the Frame
+        from the stage before them, add their results to it and pass it on.
+        A stage returns None when the frame has nothing left to work on.
+        The stages only touch ROS through the optional normals function, so
+        they can be run by the PipelineExecutor of the node as well as by
+        process() on clouds replayed from disk.
+
+        Args:
+            model: The model saved by train_svm.py, either the dict of the
+                classifier, classes and scaler or the LinearSVMPredictor
+                exported from it, or None to stop after extracting the features
+            normals (function): Takes the objects cloud and the cluster indices
+                and returns the normals of every cluster. Defaults to
+                compute_cluster_normals(), which needs no service.
+            feature_pool (Pool): Thread or process pool the features of the
+                clusters are extracted on, or None to extract them in-line
+            timer (StageTimer): Records the latency of the heavy steps
+            color_tolerance (float): Largest RGB distance between neighboring
+                points of one cluster, or negative to cluster on position only
+            fused_front_end (bool): Crop, downsample and segment the cloud in a
+                single native call (crop_downsample_segment) instead of the
+                filtering and segmentation stages
+            track_plane (bool): Reuse the table plane of the previous frame while
+                it still fits (PlaneTracker) instead of running RANSAC on every
+                frame. Only used by the segmentation stage.
+            incremental (bool): Track the object cloud with an octree change
+                detector. Only the points around changed voxels and the clusters
+                they touch are clustered again (RegionClusterer), and clusters
+                without changed points reuse their cached features and label
+                (ClusterCache).
+            change_resolution (float): Voxel size of the change detector in meters
+            change_min_points (int): Voxels that appear or are vacated with fewer
+                points are sensor noise to the change detector
+            feature_cache (FeatureCache): Looks up the features and label of
+                clusters by their fingerprint before extracting them, or None
+            descriptors (list): Names of the descriptors to extract (see
+                DescriptorSet), or None for the ones the model was trained on
+    """
+
+    # Voxel size, region of interest and plane fit tolerance shared by both
+    # front ends. They are explained in filtering() and segmentation().
+    LEAF_SIZE = 0.01
+    FILTER_AXIS = 'z'
+    AXIS_MIN = 0.77
+    AXIS_MAX = 1.1
+    MAX_DISTANCE = 0.01
+    CLUSTER_TOLERANCE = 0.02
+
+    def __init__(self, model=None, normals=None, feature_pool=None, timer=None, color_tolerance=-1.0,
+                 fused_front_end=False, track_plane=False, incremental=False, change_resolution=0.02,
+                 change_min_points=3, feature_cache=None, descriptors=None):
+        self.feature_cache = feature_cache
+        self.descriptors = descriptors
+        self.model_path = None
+        self.model_mtime = None
+        self.set_model(model)
+        self.normals = normals if normals is not None else compute_cluster_normals
+        self.feature_pool = feature_pool
+        self.timer = timer if timer is not None else StageTimer()
+        self.color_tolerance = color_tolerance
+        self.fused_front_end = fused_front_end
+        self.plane_tracker = PlaneTracker(self.MAX_DISTANCE) if track_plane else None
+        self.change_detector = None
+        self.region_clusterer = None
+        self.cluster_cache = None
+        if incremental:
+            self.change_detector = ChangeDetector(change_resolution, change_min_points)
+            self.region_clusterer = RegionClusterer(change_resolution, self.CLUSTER_TOLERANCE)
+            self.cluster_cache = ClusterCache(change_resolution)
+
+        # Initialize color_list
+        if not hasattr(get_color_list, 'color_list'):
+            get_color_list.color_list = []
+
+    def set_model(self, model):
+        """ Classifies with a new model (or stops classifying for None), dropping the cached labels. """
+        if isinstance(model, dict):
+            model = PickledModelPredictor(model)
+        trained_on = DescriptorSet(getattr(model, 'descriptors', DEFAULT_DESCRIPTORS))
+        describe = DescriptorSet(self.descriptors) if self.descriptors else trained_on
+        if model is not None and describe.names != trained_on.names:
+            raise ValueError('The model was trained on {}, not {}'.format(list(trained_on.names), list(describe.names)))
+        self.describe = describe
+        self.clf = model
+        if self.feature_cache is not None:
+            self.feature_cache.clear()
+
+    def watch_model(self, path):
+        """ Loads the model from a file (model.npy exported by train_svm.py, or model.sav)
+            and reloads it whenever the file changes. """
+        self.model_path = path
+        self.model_mtime = None
+        self.reload_model()
+
+    def reload_model(self):
+        """ Reloads the watched model file if it changed since it was loaded.
+
+            Returns:
+                bool: Whether the model was reloaded
+        """
+        mtime = os.path.getmtime(self.model_path)
+        if mtime == self.model_mtime:
+            return False
+        if self.model_path.endswith('.npy'):
+            model = LinearSVMPredictor.load(self.model_path)
+        else:
+            with open(self.model_path, 'rb') as model_file:
+                model = pickle.load(model_file)
+        self.model_mtime = mtime
+        self.set_model(model)
+        return True
+
+    def stages(self):
+        """ Returns the (name, function) pairs of the stages, in order. """
+        if self.fused_front_end:
+            front_end = [('crop_downsample_segment', self.crop_downsample_segment)]
+        else:
+            front_end = [('filtering', self.filtering),
+                         ('segmentation', self.segmentation)]
+        return front_end + [('clustering', self.clustering),
+                            ('classification', self.classification)]
+
+    def process(self, cloud):
+        """ Runs every stage on one cloud in the calling thread.
+
+            Args:
+                cloud: A PointCloud2, an (n, 4) XYZRGB array or a pcl XYZRGB cloud
+
+            Returns:
+                Frame: The results of every stage that ran. detected_objects_labels
+                    is empty when a stage ended the frame early.
+        """
+        frame = Frame(cloud)
+        frame.detected_objects_labels = []
+        for name, stage in self.stages():
+            with self.timer.time(name):
+                if stage(frame) is None:
+                    break
+        return frame
+
+    def to_pcl(self, frame):
+
+        ##### Convert ROS msg to PCL data #####
+
+        """Convert ROS msg (type PointCloud2) to PCL data (PointXYZRGB format)
+        with helper function from pcl_helper. Clouds replayed from disk arrive
+        as an XYZRGB array or already as PCL data."""
+        with self.timer.time('conversion'):
+            if isinstance(frame.msg, np.ndarray):
+                cloud = pcl.PointCloud_PointXYZRGB()
+                cloud.from_array(frame.msg.astype(np.float32))
+            elif isinstance(frame.msg, pcl.PointCloud_PointXYZRGB):
+                cloud = frame.msg
+            else:
+                cloud = ros_to_pcl(frame.msg)
+        return cloud
+
+    def filtering(self, frame):
+
+        cloud = self.to_pcl(frame)
+
+        ##### Voxel Grid Downsampling #####
+
+        """The point clouds from RGB-D cameras are too dense, hence computationally expensive. Downsampling
+        the point cloud data to reduce density but preserve important information is ideal.
+
+        Using a Voxel Grid Filter where a grid of volumetric elements (voxels; as pixel is to picture element)
+        is made and each voxel is averaged to a point cloud element; downsampled."""
+
+        # Create a VoxelGrid filter object for our input point cloud
+        vox = cloud.make_voxel_grid_filter()
+
+        """Choose a voxel (also known as leaf) size (units in meters).
+        Should start small and keep going large till loss of important information starts."""
+
+        """A good way to choose leaf size is knowing the important information data forehand
+        such as smallest (or target) object size."""
+        LEAF_SIZE = self.LEAF_SIZE
+        """A voxel (leaf) size of 0.01 results in a voxel of 1e-6 cubic meters that retains
+        most of the important information, while significantly reducing the number of points in the cloud."""
+
+        # Set the voxel (or leaf) size.
+        vox.set_leaf_size(LEAF_SIZE, LEAF_SIZE, LEAF_SIZE)
+
+        # Call the filter function to obtain the resultant downsampled point cloud.
+        with self.timer.time('voxel_grid'):
+            cloud_filtered = vox.filter()
+
+        ##### PassThrough filter #####
+
+        """More points in cloud = more coumputation; so if the target object location is known,
+        the rest of the point cloud is not needed."""
+
+        """A pass through filter is like a cropping tool. We specify an axis along which we know the limits
+        within which the target objects lie, known as the region of interest. The pass through filter passes
+        through the cloud leaving only the region of interest."""
+
+        # Create a PassThrough filter object.
+        passthrough = cloud_filtered.make_passthrough_filter()
+
+        # Assign axis and range to the passthrough filter object.
+        # Applying the filter along z axis (the height with respect to the ground) to our tabletop scene.
+        filter_axis = self.FILTER_AXIS
+        passthrough.set_filter_field_name (filter_axis)
+        axis_min = self.AXIS_MIN
+        axis_max = self.AXIS_MAX
+        # The axis min and max sets the region of interest that the filter leaves out as a window as it passes.
+        passthrough.set_filter_limits (axis_min, axis_max)
+
+        # Finally use the filter function to obtain the resultant point cloud.
+        with self.timer.time('passthrough'):
+            cloud_filtered = passthrough.filter()
+
+        # Nothing is left in the region of interest, so skip the rest of the pipeline for this frame.
+        if cloud_filtered.size == 0:
+            return None
+
+        frame.cloud_filtered = cloud_filtered
+        return frame
+
+    def segmentation(self, frame):
+
+        cloud_filtered = frame.cloud_filtered
+
+        ##### RANSAC plane segmentation #####
+
+        """RANSAC (Random Sample Consensus) is a two step (hypothesis and verification) iterative method
+        which identifies data points belonging to a mathematical model (inliners) and those that dont (outliners)."""
+
+        """First, the model is constructed using a min. no. of data pts. (eg. two for a line) and then the rest of
+        pts. are verfied against its parameters (eg. slope and y-cutoff for a line) with certain error thresholds.
+        The set of inliers obtained for that fitting model (random sample) is called a consensus set.
+        The two steps are repeated until the obtained consensus set in certain iteration has enough inliers
+        and that sample (mathematical model parameters) forms the solution as it had the most inliners in consensus."""
+
+        # The points chosen are random so the solution is probalistic, increasing with the number of iterations.
+
+        # The table does not move, so a tracked plane from the previous frame is tested first
+        # and RANSAC only runs again when it no longer fits.
+        if self.plane_tracker is not None:
+            with self.timer.time('plane_tracking'):
+                inliers, coefficients = self.plane_tracker.segment(cloud_filtered)
+            return self.extract_table(frame, cloud_filtered, inliers)
+
+        # Create the segmentation object
+        seg = cloud_filtered.make_segmenter()
+
+        # Set the model you wish to fit.
+        # RANSAC plane fitting algorithm (calculate plane parameters and verfiy) already exists in the PCL library.
+        seg.set_model_type(pcl.SACMODEL_PLANE)
+        seg.set_method_type(pcl.SAC_RANSAC)
+
+        # Max distance for a point to be considered fitting the model.
+        # This is the error threshold for the model fit and influences (increases) the consensus set.
+        max_distance = self.MAX_DISTANCE
+        seg.set_distance_threshold(max_distance)
+
+        # Call the segment function to obtain set of inliner indices and model coefficients
+        with self.timer.time('ransac'):
+            inliers, coefficients = seg.segment()
+
+        return self.extract_table(frame, cloud_filtered, inliers)
+
+    def extract_table(self, frame, cloud_filtered, inliers):
+
+        ##### Extract inliers and outliers #####
+
+        # Extract inliers
+        extracted_inliers = cloud_filtered.extract(inliers, negative=False)
+        cloud_table = extracted_inliers
+
+        # Extract outliers using the negative flag to True.
+        extracted_outliers = cloud_filtered.extract(inliers, negative=True)
+        cloud_objects = extracted_outliers
+
+        frame.cloud_table = cloud_table
+        frame.cloud_objects = cloud_objects
+        return frame
+
+    def crop_downsample_segment(self, frame):
+
+        cloud = self.to_pcl(frame)
+
+        ##### PassThrough filter, Voxel Grid Downsampling and RANSAC plane segmentation in one pass #####
+
+        """The same work as filtering() and segmentation(), done by a single python-pcl call
+        without handing intermediate clouds back to Python. The region of interest is cropped
+        before the cloud is downsampled, so the voxel grid only visits the points that are kept.
+        Voxels cut by the crop bounds average fewer points, so points near the bounds move slightly."""
+        with self.timer.time('crop_downsample_segment'):
+            inliers, cloud_table, cloud_objects, coefficients = cloud.crop_downsample_segment(
+                self.LEAF_SIZE, self.FILTER_AXIS, self.AXIS_MIN, self.AXIS_MAX, self.MAX_DISTANCE)
+
+        # Nothing is left in the region of interest, so skip the rest of the pipeline for this frame.
+        if cloud_table.size == 0 and cloud_objects.size == 0:
+            return None
+
+        frame.cloud_table = cloud_table
+        frame.cloud_objects = cloud_objects
+        return frame
+
+    def clustering(self, frame):
+
+        cloud_objects = frame.cloud_objects
+
+        # In incremental mode only the points around changed voxels are clustered again,
+        # the clusters away from them keep the points of the new cloud in their voxels.
+        if self.change_detector is not None:
+            with self.timer.time('change_detection'):
+                frame.changed_points, vacated = self.change_detector.update(cloud_objects)
+            cluster_indices = self.region_clusterer.update(
+                cloud_objects.to_array(), frame.changed_points, vacated,
+                lambda region: self.cluster_region(cloud_objects, region))
+        else:
+            cluster_indices = self.cluster_region(cloud_objects)
+
+        ##### Create Cluster-Mask Point Cloud to visualize each cluster separately. #####
+
+        # Assign a color corresponding to each segmented object in scene.
+        cluster_color = get_color_list(len(cluster_indices))
+
+        """Create new cloud containing all clusters, each with unique color. clusters_to_array()
+        gathers the points of all clusters at once and gives every cluster its packed color,
+        so the cloud goes straight to pcl_to_ros() as an XYZRGB array."""
+        cluster_cloud = clusters_to_array(cloud_objects, cluster_indices, cluster_color)
+
+        frame.cluster_indices = cluster_indices
+        frame.cluster_cloud = cluster_cloud
+        return frame
+
+    def cluster_region(self, cloud_objects, region=None):
+        """ Returns the indices of the points of every cluster in the cloud, or among the
+            points of the region (an array of indices) of it. """
+        cloud = cloud_objects if region is None else cloud_objects.extract(region)
+
+        ##### Euclidean Clustering #####
+
+        """Euclidean Clustering is the DBSCAN algorithm as it uses the Euclidean Distance to identfy nearest neighbours,
+        if the distance b/w is < min. distance specified, then point is added to the cluster (inliners), else outliner.
+        If the point has > (min. members of a cluster - 1) neigbours, it becomes a core member, else an edge member.
+        Each point that can be in a cluster is identified and then the algorithm moves to the next random point."""
+
+        """Using k-d trees for nearest neighbor search for PCL's Euclidian Clustering (DBSCAN)
+        algorithm to decrease the computational burden.
+        k-d trees segment the Euclidian Space into partitions by divinding each dimension sequentially (at each root)
+        into two each time (forming a tree) using the median for each dimension, same as in the Quick Sort partion method.
+        Each point is then located in a partition and the seach is focussed there instead of the whole space."""
+
+        """PCL's Euclidean Clustering algorithm only uses the spatial information of the points,
+        so it runs on the XYZRGB cloud directly instead of on a copy stripped of color."""
+
+        # Create a cluster extraction object
+        ec = cloud.make_EuclideanClusterExtraction()
+        # Set tolerances for distance threshold (max. Euclidean Distance b/w points)
+        # as well as minimum and maximum cluster size (in points).
+        # Experiment and find values that work for segmenting objects.
+        ec.set_ClusterTolerance(self.CLUSTER_TOLERANCE)
+        ec.set_MinClusterSize(10)
+        ec.set_MaxClusterSize(2000)
+        # Optionally split touching objects of different colors. The color-aware
+        # clustering builds its own search tree, otherwise search a k-d tree for clusters.
+        if self.color_tolerance >= 0:
+            ec.set_ColorTolerance(self.color_tolerance)
+        else:
+            ec.set_SearchMethod(cloud.make_kdtree())
+        # Extract indices for each of the discovered clusters
+        with self.timer.time('euclidean_clustering'):
+            cluster_indices = ec.Extract()
+
+        # The clusters of a region index its sub-cloud, so map them back to the whole cloud.
+        if region is not None:
+            cluster_indices = [region[pts_list].tolist() for pts_list in cluster_indices]
+        return cluster_indices
+
+    # Exercise-3 Code (from capture_features.py and features.py) marked by #####:
+
+    def classification(self, frame):
+
+        cloud_objects = frame.cloud_objects
+        cluster_indices = frame.cluster_indices
+
+        # A retrained model replaces the running one, and the labels cached for the old one, between frames.
+        if self.model_path is not None:
+            self.reload_model()
+
+        # Classify the clusters!
+        detected_objects_labels = []
+
+        # Grab the points for each cluster from the extracted outliers (cloud_objects)
+        cloud_objects_arr = cloud_objects.to_array()
+        cluster_points = [cloud_objects_arr[pts_list] for pts_list in cluster_indices]
+
+        # In incremental mode, clusters without changed points reuse their cached features and label.
+        cached = [None] * len(cluster_indices)
+        if self.cluster_cache is not None:
+            changed = np.zeros(len(cloud_objects_arr), dtype=bool)
+            changed[frame.changed_points] = True
+            for index, pts_list in enumerate(cluster_indices):
+                if not changed[pts_list].any():
+                    cached[index] = self.cluster_cache.lookup(cluster_points[index])
+
+        # The same object seen again has the same fingerprint, so its features and label are looked up.
+        fingerprints = {}
+        if self.feature_cache is not None:
+            for index, hit in enumerate(cached):
+                if hit is None:
+                    fingerprints[index] = cluster_fingerprint(cluster_points[index])
+                    cached[index] = self.feature_cache.get(fingerprints[index])
+        new_clusters = [index for index, hit in enumerate(cached) if hit is None]
+
+        ##### Extract features as in capture_features.py #####
+
+        """The descriptors are from descriptors.py, the histograms among them are explained
+        in features.py. The rest are in capture_features.py"""
+
+        # By default the normals for all objects are estimated at once against a single KdTree.
+        cluster_normals = []
+        if new_clusters:
+            with self.timer.time('normals'):
+                cluster_normals = self.normals(cloud_objects, [cluster_indices[index] for index in new_clusters])
+        new_points = [cluster_points[index] for index in new_clusters]
+
+        """describe() concatenates the descriptors of one cluster into its feature vector, all of
+        them from the same normals. The clusters are independent, so they are spread over the
+        feature worker pool."""
+        with self.timer.time('histogram_features'):
+            if self.feature_pool is not None:
+                new_features = self.feature_pool.map(self.describe, zip(new_points, cluster_normals))
+            else:
+                new_features = [self.describe(cluster) for cluster in zip(new_points, cluster_normals)]
+
+        # Make the predictions for all clusters in a single batch
+        # and retrieve the labels for the results.
+        new_labels = [None] * len(new_features)
+        if new_features and self.clf is not None:
+            with self.timer.time('prediction'):
+                new_labels = list(self.clf.predict(np.array(new_features)))
+
+        # Merge the new results with the cached ones, in cluster order.
+        for index, result in zip(new_clusters, zip(new_features, new_labels)):
+            cached[index] = result
+            if self.feature_cache is not None:
+                self.feature_cache.put(fingerprints[index], *result)
+        features = [result[0] for result in cached]
+        if self.clf is not None:
+            detected_objects_labels = [result[1] for result in cached]
+
+        if self.cluster_cache is not None:
+            self.cluster_cache.store(cluster_points, features, [result[1] for result in cached])
+            self.cluster_cache.count(len(cached) - len(new_clusters), len(new_clusters))
+
+        frame.features = features
+        frame.detected_objects_labels = detected_objects_labels
+        return frame
@@ -0,0 +1,121 @@
+import threading
+import traceback
+
+try:
+    import Queue as queue
+except ImportError:
+    import queue
+
+import rospy
+
+
+class Frame(object):
+    """ Carries one point cloud message through the stages of a pipeline.
+
+        Stages read the attributes set by the stages before them and add
+        their own results as new attributes.
+
+        Args:
+            msg (PointCloud2): The incoming point cloud message
+    """
+    def __init__(self, msg):
+        self.msg = msg
+
+
+class PipelineExecutor(object):
+    """ Runs a chain of stages on consecutive frames, one worker thread per stage.
+
+        Stages are connected by bounded queues, so while a slow stage works on
+        one frame the stages before it can already work on the next ones.
+        submit() never blocks: when the first queue is full, the oldest
+        waiting frame is replaced by the new one and counted as dropped.
+        A stage that returns None ends the frame early and it is counted as
+        skipped, e.g. when a scene has nothing to classify. Frames submitted
+        after stop() are counted as dropped.
+
+        Args:
+            stages (list): (name, function) pairs; each function takes the
+                value returned by the previous stage (a Frame for the first)
+            queue_size (int): Capacity of the queue in front of each stage
+    """
+    def __init__(self, stages, queue_size=1):
+        self.stages = stages
+        self.queues = [queue.Queue(maxsize=queue_size) for _ in stages]
+        self.threads = []
+        self.lock = threading.Lock()
+        self.stopped = False
+        self.counters = {'submitted': 0, 'dropped': 0, 'skipped': 0, 'failed': 0, 'completed': 0}
+
+    def start(self):
+        """ Starts one daemon worker thread per stage. """
+        with self.lock:
+            self.stopped = False
+        for index, (name, _) in enumerate(self.stages):
+            thread = threading.Thread(target=self._run_stage, args=(index,), name=name)
+            thread.daemon = True
+            thread.start()
+            self.threads.append(thread)
+
+    def stop(self):
+        """ Lets the frames already queued drain through, then stops the workers. """
+        # Once stopped, submit() no longer empties the queue, so the shutdown marker cannot be dropped
+        with self.lock:
+            self.stopped = True
+        self.queues[0].put(None)
+        for thread in self.threads:
+            thread.join()
+        self.threads = []
+
+    def submit(self, frame):
+        """ Queues a frame for the first stage, dropping the oldest waiting frame if needed. """
+        with self.lock:
+            self.counters['submitted'] += 1
+            if self.stopped:
+                self.counters['dropped'] += 1
+                return
+            while True:
+                try:
+                    self.queues[0].put_nowait(frame)
+                    return
+                except queue.Full:
+                    try:
+                        self.queues[0].get_nowait()
+                        self.counters['dropped'] += 1
+                    except queue.Empty:
+                        pass
+
+    def stats(self):
+        """ Returns a copy of the frame counters. """
+        with self.lock:
+            return dict(self.counters)
+
+    def _count(self, name):
+        with self.lock:
+            self.counters[name] += 1
+
+    def _run_stage(self, index):
+        name, function = self.stages[index]
+        inbox = self.queues[index]
+        outbox = self.queues[index + 1] if index + 1 < len(self.queues) else None
+
+        while True:
+            item = inbox.get()
+            if item is None:
+                # Shutdown marker, pass it down the chain
+                if outbox is not None:
+                    outbox.put(None)
+                return
+
+            try:
+                result = function(item)
+            except Exception:
+                rospy.logerr('Pipeline stage {} failed:\n{}'.format(name, traceback.format_exc()))
+                self._count('failed')
+                continue
+
+            if result is None:
+                self._count('skipped')
+            elif outbox is None:
+                self._count('completed')
+            else:
+                outbox.put(result)
@@ -0,0 +1,81 @@
+import threading
+
+import numpy as np
+import pcl
+
+
+class PlaneTracker(object):
+    """ Tracks the table plane across frames instead of fitting it from scratch.
+
+        The camera and the table do not move, so the plane found in one frame
+        still fits the next. Each frame is first tested against the previous
+        coefficients with a single vectorized point-to-plane distance test.
+        The previous plane is kept (a hit) while its inlier ratio stays close
+        to the ratio RANSAC found when the plane was fitted; otherwise full
+        RANSAC runs again (a miss) and its result seeds the following frames.
+
+        Args:
+            max_distance (float): Largest distance of an inlier from the plane
+            min_inlier_fraction (float): Fraction of the fitted inlier ratio the
+                tracked plane must keep to be reused
+    """
+    def __init__(self, max_distance=0.01, min_inlier_fraction=0.9):
+        self.max_distance = max_distance
+        self.min_inlier_fraction = min_inlier_fraction
+        self.coefficients = None
+        self.fitted_ratio = 0.0
+        self.lock = threading.Lock()
+        self.counters = {'hits': 0, 'misses': 0}
+
+    def segment(self, cloud):
+        """ Finds the table plane in a cloud.
+
+            Args:
+                cloud (PointCloud_PointXYZRGB): The filtered cloud
+
+            Returns:
+                tuple: The inlier indices and the plane coefficients [a, b, c, d],
+                    like Segmentation.segment()
+        """
+        if self.coefficients is not None and cloud.size > 0:
+            inliers = self.inliers(cloud.to_array(), self.coefficients)
+            if len(inliers) >= self.min_inlier_fraction * self.fitted_ratio * cloud.size:
+                self._count('hits')
+                return inliers, self.coefficients
+
+        self._count('misses')
+        seg = cloud.make_segmenter()
+        seg.set_model_type(pcl.SACMODEL_PLANE)
+        seg.set_method_type(pcl.SAC_RANSAC)
+        seg.set_distance_threshold(self.max_distance)
+        inliers, coefficients = seg.segment()
+
+        if len(coefficients) == 4 and cloud.size > 0:
+            self.coefficients = list(coefficients)
+            self.fitted_ratio = len(inliers) / float(cloud.size)
+        else:
+            self.coefficients = None
+        return inliers, coefficients
+
+    def inliers(self, points, coefficients):
+        """ Returns the indices of the points within max_distance of the plane. """
+        normal = np.asarray(coefficients[:3], dtype=np.float64)
+        scale = np.linalg.norm(normal)
+        distances = np.abs(points[:, :3].dot(normal / scale) + coefficients[3] / scale)
+        return np.flatnonzero(distances <= self.max_distance).tolist()
+
+    def reset(self):
+        """ Forgets the tracked plane, so the next frame runs full RANSAC. """
+        self.coefficients = None
+
+    def stats(self):
+        """ Returns the hit and miss counts and the hit rate. """
+        with self.lock:
+            stats = dict(self.counters)
+        total = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / float(total) if total else 0.0
+        return stats
+
+    def _count(self, name):
+        with self.lock:
+            self.counters[name] += 1
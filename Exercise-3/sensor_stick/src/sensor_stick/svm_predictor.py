@@ -0,0 +1,105 @@
+import json
+import os
+
+import numpy as np
+
+from descriptors import DEFAULT_DESCRIPTORS
+
+
+class LinearSVMPredictor(object):
+    """ Predicts with a linear one-vs-one SVM exported to plain NumPy arrays.
+
+        For a linear kernel, every pairwise decision function of a
+        scikit-learn SVC is w . z + b, and the scaler in front of it is
+        affine, z = A x + c. Folding the scaler into the weights gives
+        (w A) . x + (w . c + b), so prediction is one matrix product over
+        the raw feature vectors of all clusters followed by the one-vs-one
+        vote, without scikit-learn's input validation or even importing it.
+
+        The decision functions are ordered like scikit-learn's, one for every
+        class pair (i, j) with i < j, and a positive decision is a vote for i.
+
+        Args:
+            weights (ndarray): (pairs, features) folded weights
+            intercepts (ndarray): (pairs,) folded intercepts
+            classes (ndarray): Label string of every class index
+            descriptors (list): Names of the descriptors the features are made of
+    """
+    def __init__(self, weights, intercepts, classes, descriptors=DEFAULT_DESCRIPTORS):
+        self.weights = weights
+        self.intercepts = intercepts
+        self.classes = np.asarray(classes)
+        self.descriptors = tuple(descriptors)
+        n_classes = len(self.classes)
+        self.pairs = np.array([(i, j) for i in range(n_classes) for j in range(i + 1, n_classes)],
+                              dtype=np.intp).reshape(-1, 2)
+
+    @classmethod
+    def from_sklearn(cls, clf, scaler, classes, n_features, descriptors=DEFAULT_DESCRIPTORS):
+        """ Folds a fitted scaler (any affine transform) into a fitted linear SVC. """
+        offset = scaler.transform(np.zeros((1, n_features)))[0]
+        linear = scaler.transform(np.eye(n_features)) - offset
+
+        coef = np.asarray(clf.coef_)
+        intercept = np.asarray(clf.intercept_)
+        if len(clf.classes_) == 2:
+            # scikit-learn flips the sign of binary SVCs, so that positive decisions vote for class 1
+            coef, intercept = -coef, -intercept
+
+        weights = coef.dot(linear.T)
+        intercepts = coef.dot(offset) + intercept
+        return cls(weights, intercepts, np.asarray(classes)[clf.classes_], descriptors)
+
+    @classmethod
+    def load(cls, path):
+        """ Loads a predictor written by save(), memory-mapping its weights. """
+        with open(os.path.splitext(path)[0] + '.json') as meta_file:
+            meta = json.load(meta_file)
+        matrix = np.load(path, mmap_mode='r')
+        return cls(matrix[:, :-1], matrix[:, -1], meta['classes'], meta.get('descriptors', DEFAULT_DESCRIPTORS))
+
+    def save(self, path):
+        """ Writes the weights, with the intercepts as last column, to an .npy file
+            and the class and descriptor names to a .json file of the same name. """
+        with open(os.path.splitext(path)[0] + '.json', 'w') as meta_file:
+            json.dump({'classes': [str(label) for label in self.classes],
+                       'descriptors': list(self.descriptors)}, meta_file)
+
+        # The .npy file is replaced last, so a reader watching it sees the new names too
+        with open(path + '.tmp', 'wb') as npy_file:
+            np.save(npy_file, np.column_stack((self.weights, self.intercepts)))
+        os.rename(path + '.tmp', path)
+
+    def decision_function(self, X):
+        """ Returns the (samples, pairs) one-vs-one decision values. """
+        return np.asarray(X, dtype=np.float64).dot(self.weights.T) + self.intercepts
+
+    def predict(self, X):
+        """ Returns the label of every row of X, breaking tied votes toward the lower class index. """
+        decisions = self.decision_function(X)
+        winners = np.where(decisions > 0, self.pairs[:, 0], self.pairs[:, 1])
+        votes = np.zeros((len(decisions), len(self.classes)), dtype=np.intp)
+        np.add.at(votes, (np.arange(len(decisions))[:, np.newaxis], winners), 1)
+        return self.classes[np.argmax(votes, axis=1)]
+
+
+class PickledModelPredictor(object):
+    """ Predicts with the scikit-learn model dict saved by train_svm.py.
+
+        Args:
+            model (dict): The classifier, the class names, the scaler and the
+                names of the descriptors, which older models leave out
+    """
+    def __init__(self, model):
+        from sklearn.preprocessing import LabelEncoder
+
+        self.clf = model['classifier']
+        self.scaler = model['scaler']
+        self.encoder = LabelEncoder()
+        self.encoder.classes_ = model['classes']
+        self.descriptors = tuple(model.get('descriptors', DEFAULT_DESCRIPTORS))
+
+    def predict(self, X):
+        """ Returns the label of every row of X. """
+        predictions = self.clf.predict(self.scaler.transform(X))
+        return self.encoder.inverse_transform(predictions)
@@ -0,0 +1,145 @@
+import collections
+import contextlib
+import cProfile
+import functools
+import os
+import threading
+import time
+
+import numpy as np
+
+from diagnostic_msgs.msg import DiagnosticArray
+from diagnostic_msgs.msg import DiagnosticStatus
+from diagnostic_msgs.msg import KeyValue
+
+
+class StageTimer(object):
+    """ Collects the latency of named pipeline stages over a rolling window.
+
+        Stages are timed with the time() context manager or the timed()
+        decorator. While profiling is enabled, timed() functions also run
+        under a cProfile profiler, one per stage, since every stage of the
+        pipeline runs on its own thread and a profiler only sees the thread
+        it runs on.
+
+        Args:
+            window (int): Number of most recent samples kept per stage
+    """
+    def __init__(self, window=500):
+        self.window = window
+        self.samples = collections.OrderedDict()
+        self.profiles = {}
+        self.profiling = False
+        self.lock = threading.Lock()
+
+    def add(self, name, seconds):
+        """ Records one latency sample (in seconds) for a stage. """
+        with self.lock:
+            if name not in self.samples:
+                self.samples[name] = collections.deque(maxlen=self.window)
+            self.samples[name].append(seconds)
+
+    @contextlib.contextmanager
+    def time(self, name):
+        """ Context manager that records how long its block takes. """
+        start = time.time()
+        try:
+            yield
+        finally:
+            self.add(name, time.time() - start)
+
+    def timed(self, name):
+        """ Decorator that records how long each call takes, and profiles it if enabled. """
+        def decorator(function):
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                with self.time(name):
+                    if not self.profiling:
+                        return function(*args, **kwargs)
+                    return self._profile(name).runcall(function, *args, **kwargs)
+            return wrapper
+        return decorator
+
+    def percentiles(self):
+        """ Returns {stage: (samples, p50, p95, p99)} with latencies in milliseconds. """
+        with self.lock:
+            samples = [(name, np.array(values)) for name, values in self.samples.items()]
+
+        result = collections.OrderedDict()
+        for name, values in samples:
+            if len(values) == 0:
+                continue
+            p50, p95, p99 = 1000.0 * np.percentile(values, [50, 95, 99])
+            result[name] = (len(values), p50, p95, p99)
+        return result
+
+    def write_csv(self, path, stamp=None):
+        """ Appends the current percentiles to a CSV file, writing a header for a new file. """
+        stamp = time.time() if stamp is None else stamp
+        new_file = not os.path.exists(path)
+        with open(path, 'a') as csv_file:
+            if new_file:
+                csv_file.write('stamp,stage,samples,p50_ms,p95_ms,p99_ms\n')
+            for name, (count, p50, p95, p99) in self.percentiles().items():
+                csv_file.write('{:.3f},{},{},{:.3f},{:.3f},{:.3f}\n'.format(stamp, name, count, p50, p95, p99))
+
+    def start_profiling(self):
+        """ Starts profiling every timed() stage from its next call on. """
+        with self.lock:
+            self.profiles = {}
+            self.profiling = True
+
+    def stop_profiling(self, directory):
+        """ Stops profiling and dumps one <stage>.prof file per stage into directory.
+
+            The files can be inspected with pstats or snakeviz.
+
+            Returns:
+                list: Paths of the written profile files
+        """
+        with self.lock:
+            self.profiling = False
+            profiles = self.profiles
+            self.profiles = {}
+
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+        paths = []
+        for name, profile in profiles.items():
+            path = os.path.join(directory, name + '.prof')
+            profile.dump_stats(path)
+            paths.append(path)
+        return paths
+
+    def _profile(self, name):
+        with self.lock:
+            if name not in self.profiles:
+                self.profiles[name] = cProfile.Profile()
+            return self.profiles[name]
+
+
+def make_diagnostics(timer, stamp, prefix='object_recognition'):
+    """ Converts the percentiles of a StageTimer to a DiagnosticArray message.
+
+        Args:
+            timer (StageTimer): Timer holding the stage latencies
+            stamp (rospy.Time): Header time stamp of the message
+            prefix (str): Prepended to every stage name
+
+        Returns:
+            DiagnosticArray: One DiagnosticStatus per stage with its sample count and percentiles
+    """
+    diagnostics = DiagnosticArray()
+    diagnostics.header.stamp = stamp
+    for name, (count, p50, p95, p99) in timer.percentiles().items():
+        status = DiagnosticStatus()
+        status.level = DiagnosticStatus.OK
+        status.name = '{}: {}'.format(prefix, name)
+        status.message = 'p50 {:.1f} ms, p95 {:.1f} ms, p99 {:.1f} ms'.format(p50, p95, p99)
+        status.values = [KeyValue('samples', str(count)),
+                         KeyValue('p50_ms', '{:.3f}'.format(p50)),
+                         KeyValue('p95_ms', '{:.3f}'.format(p95)),
+                         KeyValue('p99_ms', '{:.3f}'.format(p99))]
+        diagnostics.status.append(status)
+    return diagnostics
@@ -11,6 +11,8 @@
 
 import math
 import random
+import threading
+import numpy as np
 import rospy
 import rospkg
 import tf
@@ -121,3 +123,140 @@ def delete_model():
     delete_model_prox = rospy.ServiceProxy('gazebo/delete_model', DeleteModel)
     delete_model_prox('training_model')
 
+
+def random_orientations(count):
+    """ Draws random orientations for count poses at once
+
+        Vectorized tf.transformations.quaternion_from_euler() (static xyz axes)
+        of uniformly drawn roll, pitch and yaw angles.
+
+        Args:
+            count (int): Number of orientations
+
+        Returns:
+            numpy.ndarray: (count, 4) array of x, y, z, w quaternions
+    """
+    half_angles = np.random.uniform(0, 2*math.pi, (count, 3)) / 2.0
+    ci, cj, ck = np.cos(half_angles).T
+    si, sj, sk = np.sin(half_angles).T
+    cc, cs = ci*ck, ci*sk
+    sc, ss = si*ck, si*sk
+    return np.column_stack((cj*sc - sj*cs,
+                            cj*ss + sj*cc,
+                            cj*cs - sj*sc,
+                            cj*cc + sj*ss))
+
+
+class TrainingSession(object):
+    """ Captures training samples over persistent connections to Gazebo
+
+        The functions above create a new service proxy, and the subscriber of
+        wait_for_message(), on every call. A session creates them once and
+        keeps them open, reads the SDF of every model from disk only once,
+        and draws the random orientations of the poses in batches.
+
+        Args:
+            pose_batch (int): Number of random orientations drawn at once
+            topic (str): Point cloud topic of the RGBD camera
+    """
+    def __init__(self, pose_batch=100, topic='/sensor_stick/point_cloud'):
+        self.pose_batch = pose_batch
+        self.model_path = rospkg.RosPack().get_path('sensor_stick')+'/models/'
+        self.model_xml = {}
+        self.model_state = None
+        self.orientations = np.empty((0, 4))
+
+        self.proxies = {}
+        self.services = {'get_model_state': ('gazebo/get_model_state', GetModelState),
+                         'set_model_state': ('gazebo/set_model_state', SetModelState),
+                         'spawn_model': ('gazebo/spawn_sdf_model', SpawnModel),
+                         'delete_model': ('gazebo/delete_model', DeleteModel)}
+
+        self.cloud = None
+        self.cloud_condition = threading.Condition()
+        self.cloud_sub = rospy.Subscriber(topic, PointCloud2, self._cloud_callback, queue_size=1)
+
+    def initial_setup(self):
+        """ Turns off gravity and deletes the ground plane, see initial_setup() """
+        initial_setup()
+
+    def spawn_model(self, model_name):
+        """ Spawns a model in front of the RGBD camera, see spawn_model()
+
+            Args:
+                model_name (str): Name of the model directory in sensor_stick/models
+        """
+        if model_name not in self.model_xml:
+            with open (self.model_path + model_name + '/model.sdf', 'r') as xml_file:
+                self.model_xml[model_name] = xml_file.read().replace('\n', '')
+
+        initial_pose = Pose()
+        initial_pose.position.x = 0
+        initial_pose.position.y = 1
+        initial_pose.position.z = 1
+
+        self._call('spawn_model', 'training_model', self.model_xml[model_name], '', initial_pose, 'world')
+        self.model_state = None
+
+    def delete_model(self):
+        """ Deletes the spawned model """
+        self._call('delete_model', 'training_model')
+        self.model_state = None
+
+    def capture_sample(self):
+        """ Turns the spawned model to a random orientation and captures it
+
+            Returns:
+                PointCloud2: the first point cloud stamped after the model was turned
+        """
+        # Gravity is off, so the model stays where it was spawned
+        if self.model_state is None:
+            self.model_state = self._call('get_model_state', 'training_model', 'world')
+
+        if len(self.orientations) == 0:
+            self.orientations = random_orientations(self.pose_batch)
+        quaternion, self.orientations = self.orientations[0], self.orientations[1:]
+
+        sms_req = SetModelStateRequest()
+        sms_req.model_state.pose = self.model_state.pose
+        sms_req.model_state.pose.orientation.x = quaternion[0]
+        sms_req.model_state.pose.orientation.y = quaternion[1]
+        sms_req.model_state.pose.orientation.z = quaternion[2]
+        sms_req.model_state.pose.orientation.w = quaternion[3]
+        sms_req.model_state.twist = self.model_state.twist
+        sms_req.model_state.model_name = 'training_model'
+        sms_req.model_state.reference_frame = 'world'
+        self._call('set_model_state', sms_req)
+
+        # Wait for a cloud rendered after the pose was set
+        posed = rospy.Time.now()
+        with self.cloud_condition:
+            while (self.cloud is None or self.cloud.header.stamp < posed) and not rospy.is_shutdown():
+                self.cloud_condition.wait(0.1)
+            return self.cloud
+
+    def close(self):
+        """ Closes the persistent connections """
+        self.cloud_sub.unregister()
+        for proxy in self.proxies.values():
+            proxy.close()
+        self.proxies = {}
+
+    def _call(self, service, *args):
+        # A persistent connection that dropped is opened again once
+        for attempt in range(2):
+            if service not in self.proxies:
+                name, service_class = self.services[service]
+                rospy.wait_for_service(name)
+                self.proxies[service] = rospy.ServiceProxy(name, service_class, persistent=True)
+            try:
+                return self.proxies[service](*args)
+            except rospy.ServiceException:
+                self.proxies.pop(service).close()
+                if attempt == 1:
+                    raise
+
+    def _cloud_callback(self, cloud):
+        with self.cloud_condition:
+            self.cloud = cloud
+            self.cloud_condition.notify_all()
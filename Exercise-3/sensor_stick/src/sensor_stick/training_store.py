@@ -0,0 +1,150 @@
+import json
+import os
+import struct
+
+import numpy as np
+
+from descriptors import DEFAULT_DESCRIPTORS
+from descriptors import DescriptorSet
+
+
+# Every .npy file of a training set gets a header of this fixed size, so the
+# shape in it can be rewritten in place when rows are appended.
+HEADER_SIZE = 128
+
+
+def npy_header(shape, dtype):
+    """ Returns a version 1.0 .npy header padded to HEADER_SIZE bytes. """
+    header = "{'descr': %r, 'fortran_order': False, 'shape': %r, }" % (
+        str(np.lib.format.dtype_to_descr(np.dtype(dtype))), tuple(shape))
+    header = header.ljust(HEADER_SIZE - 11) + '\n'
+    return np.lib.format.magic(1, 0) + struct.pack('<H', len(header)) + header.encode('latin1')
+
+
+class TrainingSet(object):
+    """ Columnar training set on disk that can be appended to and memory-mapped.
+
+        The directory holds features.npy, a float64 (samples, features)
+        matrix, labels.npy, an int32 index into the class names, and
+        meta.json with the class names, the names of the descriptors the
+        features are made of, the number of committed samples and the
+        models that were captured completely. Both .npy files are plain
+        NumPy arrays, so load() maps them without reading or copying them.
+
+        Samples are appended to the end of the files as they come in, and
+        commit() records how many of them are complete. Opening the set
+        again drops the samples appended after the last commit, e.g. the
+        model that was being captured when a capture run crashed.
+
+        Args:
+            directory (str): Directory of the training set, created if needed
+            descriptors (list): Names of the descriptors of the samples to
+                append, which must match those of the samples already there,
+                or None to keep the ones of the set
+    """
+    def __init__(self, directory, descriptors=None):
+        self.directory = directory
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+        self.meta = {'classes': [], 'n_features': None, 'samples': 0, 'complete': []}
+        if os.path.exists(self.path('meta.json')):
+            with open(self.path('meta.json')) as meta_file:
+                self.meta = json.load(meta_file)
+        self.samples = self.meta['samples']
+        self._truncate()
+
+        # Sets captured before the descriptors could be selected hold the default ones
+        self.meta.setdefault('descriptors', list(DEFAULT_DESCRIPTORS))
+        if descriptors is not None:
+            names = list(DescriptorSet(descriptors).names)
+            if names != self.meta['descriptors'] and self.samples > 0:
+                raise ValueError('{} holds {} features, not {}'.format(directory, self.meta['descriptors'], names))
+            if names != self.meta['descriptors']:
+                self.meta['descriptors'] = names
+                self.meta['n_features'] = None
+
+    @property
+    def descriptors(self):
+        return tuple(self.meta['descriptors'])
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def is_complete(self, model_name):
+        """ Returns True if all samples of the model were captured and committed. """
+        return model_name in self.meta['complete']
+
+    def append(self, feature, label):
+        """ Appends one sample to the end of the files. """
+        self.extend([feature], [label])
+
+    def extend(self, features, labels):
+        """ Appends many samples at once, e.g. when converting a pickled training set. """
+        if len(labels) == 0:
+            return
+        features = np.asarray(features, dtype=np.float64).reshape(len(labels), -1)
+        if self.meta['n_features'] is None:
+            self.meta['n_features'] = features.shape[1]
+        elif features.shape[1] != self.meta['n_features']:
+            raise ValueError('Expected {} features, got {}'.format(self.meta['n_features'], features.shape[1]))
+
+        for label in labels:
+            if label not in self.meta['classes']:
+                self.meta['classes'].append(label)
+        label_index = np.array([self.meta['classes'].index(label) for label in labels], dtype=np.int32)
+
+        self._append_rows('features.npy', features)
+        self._append_rows('labels.npy', label_index)
+        self.samples += len(labels)
+
+    def commit(self, model_name=None):
+        """ Marks the samples appended so far complete, and optionally the model they belong to. """
+        self.meta['samples'] = self.samples
+        if model_name is not None and model_name not in self.meta['complete']:
+            self.meta['complete'].append(model_name)
+
+        # Write the metadata next to the old one and swap them, so it is never half written
+        with open(self.path('meta.json.tmp'), 'w') as meta_file:
+            json.dump(self.meta, meta_file, indent=1)
+        os.rename(self.path('meta.json.tmp'), self.path('meta.json'))
+
+    def load(self):
+        """ Maps the committed samples into memory.
+
+            Returns:
+                tuple: The read-only float64 (samples, features) matrix and
+                    the array of label strings
+        """
+        if self.meta['samples'] == 0:
+            return np.empty((0, self.meta['n_features'] or 0)), np.empty(0, dtype=str)
+        X = np.load(self.path('features.npy'), mmap_mode='r')[:self.meta['samples']]
+        label_index = np.load(self.path('labels.npy'), mmap_mode='r')[:self.meta['samples']]
+        return X, np.asarray(self.meta['classes'])[label_index]
+
+    def _row_shapes(self):
+        return {'features.npy': ((self.meta['n_features'],), np.float64),
+                'labels.npy': ((), np.int32)}
+
+    def _append_rows(self, name, rows):
+        path = self.path(name)
+        row_shape, dtype = self._row_shapes()[name]
+        with open(path, 'r+b' if os.path.exists(path) else 'w+b') as npy_file:
+            # Write the data first, so the header never counts rows that are not there
+            npy_file.seek(HEADER_SIZE + self.samples * rows.nbytes // len(rows))
+            npy_file.write(np.ascontiguousarray(rows, dtype=dtype).tobytes())
+            npy_file.seek(0)
+            npy_file.write(npy_header((self.samples + len(rows),) + row_shape, dtype))
+
+    def _truncate(self):
+        for name, (row_shape, dtype) in self._row_shapes().items():
+            path = self.path(name)
+            if not os.path.exists(path):
+                continue
+            if self.samples == 0:
+                os.remove(path)
+                continue
+            row_bytes = int(np.prod(row_shape)) * np.dtype(dtype).itemsize
+            with open(path, 'r+b') as npy_file:
+                npy_file.truncate(HEADER_SIZE + self.samples * row_bytes)
+                npy_file.write(npy_header((self.samples,) + row_shape, dtype))
@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+
+import unittest
+
+from sensor_stick import feature_cache
+from sensor_stick.feature_cache import FeatureCache
+
+
+class FakeClock(object):
+    """ Stands in for the time module, so the TTL can be tested without sleeping. """
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+
+class TestFeatureCache(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.time_module = feature_cache.time
+        feature_cache.time = self.clock
+
+    def tearDown(self):
+        feature_cache.time = self.time_module
+
+    def test_get_returns_what_was_put(self):
+        cache = FeatureCache(max_size=4, ttl=5.0)
+        cache.put('a', [1.0, 2.0], 'soap')
+        self.assertEqual(cache.get('a'), ([1.0, 2.0], 'soap'))
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.stats()['hits'], 1)
+        self.assertEqual(cache.stats()['misses'], 1)
+
+    def test_evicts_least_recently_used_when_full(self):
+        cache = FeatureCache(max_size=2, ttl=5.0)
+        cache.put('a', [1.0], 'a')
+        cache.put('b', [2.0], 'b')
+        # Reading a makes b the least recently used entry
+        cache.get('a')
+        cache.put('c', [3.0], 'c')
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), ([1.0], 'a'))
+        self.assertEqual(cache.get('c'), ([3.0], 'c'))
+        self.assertEqual(cache.stats()['evicted'], 1)
+        self.assertEqual(cache.stats()['size'], 2)
+
+    def test_put_again_refreshes_entry(self):
+        cache = FeatureCache(max_size=2, ttl=5.0)
+        cache.put('a', [1.0], 'a')
+        cache.put('b', [2.0], 'b')
+        cache.put('a', [1.5], 'a')
+        cache.put('c', [3.0], 'c')
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), ([1.5], 'a'))
+
+    def test_expires_entries_older_than_ttl(self):
+        cache = FeatureCache(max_size=4, ttl=5.0)
+        cache.put('a', [1.0], 'a')
+        self.clock.now += 5.0
+        self.assertEqual(cache.get('a'), ([1.0], 'a'))
+        self.clock.now += 0.1
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.stats()['expired'], 1)
+        # An expired entry is dropped, not kept for a later lookup
+        self.assertEqual(cache.stats()['size'], 0)
+
+    def test_clear_drops_every_entry(self):
+        cache = FeatureCache(max_size=4, ttl=5.0)
+        cache.put('a', [1.0], 'a')
+        cache.clear()
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.stats()['size'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
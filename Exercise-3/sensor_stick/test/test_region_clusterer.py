@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+
+import unittest
+
+import numpy as np
+
+from sensor_stick.change_detection import RegionClusterer, contains, voxel_keys
+
+RESOLUTION = 0.02
+TOLERANCE = 0.02
+
+
+def make_box(center, n_points=60, seed=0):
+    """ Returns an (n, 4) XYZRGB array of points in a 4cm box around center. """
+    rng = np.random.RandomState(seed)
+    box = np.zeros((n_points, 4), dtype=np.float32)
+    box[:, :3] = center + rng.uniform(-0.02, 0.02, (n_points, 3))
+    return box
+
+
+class Changes(object):
+    """ Finds the new and the vacated voxels of every cloud, like ChangeDetector does with an octree. """
+    def __init__(self):
+        self.voxels = np.empty(0, dtype=np.int64)
+
+    def update(self, points):
+        keys = voxel_keys(points, RESOLUTION)
+        changed = np.flatnonzero(~contains(self.voxels, keys))
+        vacated = np.setdiff1d(self.voxels, keys)
+        self.voxels = np.unique(keys)
+        return changed, vacated
+
+
+class SingleLink(object):
+    """ Stands in for the Euclidean clustering of PCL and records the points it was given. """
+    def __init__(self, points):
+        self.points = points
+        self.regions = []
+
+    def __call__(self, region):
+        self.regions.append(region)
+        xyz = self.points[region, :3]
+        near = np.linalg.norm(xyz[:, np.newaxis] - xyz, axis=2) <= TOLERANCE
+        labels = -np.ones(len(region), dtype=int)
+        for seed in range(len(region)):
+            if labels[seed] >= 0:
+                continue
+            labels[seed] = seed
+            stack = [seed]
+            while stack:
+                for neighbor in np.flatnonzero(near[stack.pop()] & (labels < 0)):
+                    labels[neighbor] = seed
+                    stack.append(neighbor)
+        return [region[labels == label].tolist() for label in np.unique(labels)]
+
+
+def as_sets(clusters):
+    return sorted(sorted(cluster) for cluster in clusters)
+
+
+class TestRegionClusterer(unittest.TestCase):
+
+    def setUp(self):
+        self.changes = Changes()
+        self.clusterer = RegionClusterer(RESOLUTION, TOLERANCE)
+
+    def update(self, points):
+        cluster = SingleLink(points)
+        changed, vacated = self.changes.update(points)
+        clusters = self.clusterer.update(points, changed, vacated, cluster)
+        return clusters, cluster.regions
+
+    def test_first_cloud_is_clustered_whole(self):
+        points = np.vstack((make_box([0.0, 0.0, 0.9]), make_box([0.3, 0.0, 0.9], seed=1)))
+        clusters, regions = self.update(points)
+        self.assertEqual(len(regions), 1)
+        self.assertEqual(len(regions[0]), len(points))
+        self.assertEqual(as_sets(clusters), as_sets(SingleLink(points)(np.arange(len(points)))))
+
+    def test_unchanged_cloud_is_not_clustered(self):
+        points = np.vstack((make_box([0.0, 0.0, 0.9]), make_box([0.3, 0.0, 0.9], seed=1)))
+        first, _ = self.update(points)
+        clusters, regions = self.update(points)
+        self.assertEqual(regions, [])
+        self.assertEqual(as_sets(clusters), as_sets(first))
+
+    def test_only_moved_object_is_clustered_again(self):
+        still = make_box([0.0, 0.0, 0.9])
+        self.update(np.vstack((still, make_box([0.3, 0.0, 0.9], seed=1))))
+        points = np.vstack((still, make_box([0.4, 0.1, 0.9], seed=2)))
+        clusters, regions = self.update(points)
+
+        self.assertEqual(len(regions), 1)
+        self.assertTrue((regions[0] >= len(still)).all())
+        self.assertEqual(as_sets(clusters), as_sets(SingleLink(points)(np.arange(len(points)))))
+        self.assertEqual(self.clusterer.stats()['kept'], 1)
+
+    def test_object_placed_next_to_another_merges_with_it(self):
+        self.update(make_box([0.0, 0.0, 0.9]))
+        # The new box is within the cluster tolerance of the old one, so both are clustered again
+        points = np.vstack((make_box([0.0, 0.0, 0.9]), make_box([0.05, 0.0, 0.9], seed=1)))
+        clusters, regions = self.update(points)
+
+        self.assertEqual(len(regions[0]), len(points))
+        self.assertEqual(as_sets(clusters), as_sets(SingleLink(points)(np.arange(len(points)))))
+        self.assertEqual(self.clusterer.stats()['kept'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
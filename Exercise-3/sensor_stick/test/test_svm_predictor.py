@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+from sklearn import svm
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import LabelEncoder, StandardScaler
+
+from sensor_stick.classifier import HistogramRebinner
+from sensor_stick.features import COLOR_BINS, NORMAL_BINS
+from sensor_stick.svm_predictor import LinearSVMPredictor
+
+N_FEATURES = 3 * COLOR_BINS + 3 * NORMAL_BINS
+
+
+def make_samples(names, n_per_class=30, seed=0):
+    """ Returns overlapping random feature vectors of the default descriptors and their label strings. """
+    rng = np.random.RandomState(seed)
+    X = np.vstack([rng.rand(n_per_class, N_FEATURES) + 0.15 * index * rng.rand(N_FEATURES)
+                   for index in range(len(names))])
+    y = np.repeat(names, n_per_class)
+    return X, y
+
+
+class TestLinearSVMPredictor(unittest.TestCase):
+
+    def fit(self, names):
+        """ Fits a linear SVC behind the rebinning and scaling steps, like train_svm.py does. """
+        X, y = make_samples(names)
+        encoder = LabelEncoder()
+        pipeline = Pipeline([('rebin', HistogramRebinner(color_bins=8, normal_bins=10)),
+                             ('scaler', StandardScaler()),
+                             ('svc', svm.SVC(kernel='linear', C=1.0))])
+        pipeline.fit(X, encoder.fit_transform(y))
+        predictor = LinearSVMPredictor.from_sklearn(pipeline.named_steps['svc'], Pipeline(pipeline.steps[:2]),
+                                                    encoder.classes_, N_FEATURES)
+        return pipeline, encoder, predictor
+
+    def assert_same_predictions(self, names):
+        pipeline, encoder, predictor = self.fit(names)
+        X_test, _ = make_samples(names, seed=1)
+        expected = encoder.inverse_transform(pipeline.predict(X_test))
+        np.testing.assert_array_equal(predictor.predict(X_test), expected)
+        # The held out samples must land in more than one class to exercise the vote
+        self.assertGreater(len(set(expected)), 1)
+
+    def test_two_classes_match_svc(self):
+        self.assert_same_predictions(['biscuits', 'soap'])
+
+    def test_three_classes_match_svc(self):
+        self.assert_same_predictions(['biscuits', 'soap', 'soap2'])
+
+    def test_five_classes_match_svc(self):
+        self.assert_same_predictions(['biscuits', 'glue', 'snacks', 'soap', 'soap2'])
+
+    def test_save_and_load(self):
+        _, _, predictor = self.fit(['biscuits', 'glue', 'soap'])
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, 'model.npy')
+            predictor.save(path)
+            loaded = LinearSVMPredictor.load(path)
+            self.assertIsInstance(loaded.weights, np.memmap)
+            self.assertEqual(list(loaded.classes), ['biscuits', 'glue', 'soap'])
+            self.assertEqual(loaded.descriptors, predictor.descriptors)
+            X_test, _ = make_samples(['biscuits', 'glue', 'soap'], seed=2)
+            np.testing.assert_array_equal(loaded.predict(X_test), predictor.predict(X_test))
+        finally:
+            shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    unittest.main()
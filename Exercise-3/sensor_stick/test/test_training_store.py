@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from sensor_stick.training_store import TrainingSet
+
+
+class TestTrainingSet(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = os.path.join(tempfile.mkdtemp(), 'training_set')
+
+    def tearDown(self):
+        shutil.rmtree(os.path.dirname(self.directory))
+
+    def test_reopen_loads_committed_samples(self):
+        training_set = TrainingSet(self.directory)
+        training_set.extend(np.arange(10.0).reshape(2, 5), ['soap', 'glue'])
+        training_set.append(np.ones(5), 'soap')
+        training_set.commit('soap')
+
+        features, labels = TrainingSet(self.directory).load()
+        np.testing.assert_array_equal(features, np.vstack((np.arange(10.0).reshape(2, 5), np.ones(5))))
+        self.assertEqual(list(labels), ['soap', 'glue', 'soap'])
+        self.assertTrue(TrainingSet(self.directory).is_complete('soap'))
+        self.assertFalse(os.path.exists(os.path.join(self.directory, 'meta.json.tmp')))
+
+    def test_reopen_drops_uncommitted_samples(self):
+        training_set = TrainingSet(self.directory)
+        training_set.extend(np.zeros((2, 5)), ['soap', 'soap'])
+        training_set.commit('soap')
+        # A capture run that crashes while capturing glue never commits it
+        training_set.extend(np.ones((3, 5)), ['glue'] * 3)
+
+        reopened = TrainingSet(self.directory)
+        features, labels = reopened.load()
+        self.assertEqual(features.shape, (2, 5))
+        self.assertEqual(list(labels), ['soap', 'soap'])
+        self.assertFalse(reopened.is_complete('glue'))
+        # The files are truncated too, so they load on their own as plain .npy files
+        self.assertEqual(np.load(os.path.join(self.directory, 'features.npy')).shape, (2, 5))
+        self.assertEqual(np.load(os.path.join(self.directory, 'labels.npy')).shape, (2,))
+
+        # Samples appended after reopening follow the committed ones
+        reopened.extend(np.full((1, 5), 2.0), ['glue'])
+        reopened.commit('glue')
+        features, labels = TrainingSet(self.directory).load()
+        np.testing.assert_array_equal(features, np.vstack((np.zeros((2, 5)), np.full((1, 5), 2.0))))
+        self.assertEqual(list(labels), ['soap', 'soap', 'glue'])
+
+    def test_reopen_without_commit_is_empty(self):
+        training_set = TrainingSet(self.directory)
+        training_set.extend(np.ones((2, 5)), ['soap', 'soap'])
+
+        features, labels = TrainingSet(self.directory).load()
+        self.assertEqual(len(features), 0)
+        self.assertEqual(len(labels), 0)
+        self.assertFalse(os.path.exists(os.path.join(self.directory, 'features.npy')))
+
+    def test_rejects_feature_length_change(self):
+        training_set = TrainingSet(self.directory)
+        training_set.append(np.zeros(5), 'soap')
+        self.assertRaises(ValueError, training_set.append, np.zeros(4), 'soap')
+
+    def test_rejects_other_descriptors_once_captured(self):
+        training_set = TrainingSet(self.directory, descriptors=['color-hist'])
+        training_set.append(np.zeros(5), 'soap')
+        training_set.commit()
+
+        self.assertEqual(TrainingSet(self.directory).descriptors, ('color-hist',))
+        self.assertRaises(ValueError, TrainingSet, self.directory, ['color-hist', 'normal-hist'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -137,6 +137,7 @@ include "pxi/PointCloud_PointXYZRGBA_172.pxi"
 include "pxi/PointCloud_PointWithViewpoint.pxi"
 # include "pxi/PointCloud_Normal.pxi"
 include "pxi/PointCloud_PointNormal.pxi"
+include "pxi/PointCloud_Conversion.pxi"
 # Add PointCloud2
 include "pxi/PointCloud_PCLPointCloud2.pxi"
 
@@ -115,6 +115,13 @@ cdef class KdTree:
         # Shortcut to get raw pointer to underlying KdTree<PointXYZ>.
         return self.thisptr_shared.get()
 
+cdef class KdTree_PointXYZRGB:
+    cdef pclkdt.KdTree_PointXYZRGB_Ptr_t thisptr_shared   # KdTree
+
+    cdef inline pclkdt.KdTree[cpp.PointXYZRGB] *thisptr(self) nogil:
+        # Shortcut to get raw pointer to underlying KdTree<PointXYZRGB>.
+        return self.thisptr_shared.get()
+
 # cdef class KdTreeFLANN:
 #     cdef pclkdt.KdTreeFLANNPtr_t thisptr_shared   # KdTreeFLANN
 #     
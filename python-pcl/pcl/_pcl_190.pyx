@@ -140,6 +140,7 @@ include "pxi/PointCloud_PointXYZRGBA_190.pxi"
 include "pxi/PointCloud_PointWithViewpoint.pxi"
 # include "pxi/PointCloud_Normal.pxi"
 include "pxi/PointCloud_PointNormal.pxi"
+include "pxi/PointCloud_Conversion.pxi"
 
 
 ### common ###
@@ -2,14 +2,24 @@
 #include <pcl/features/normal_3d.h>
 #include <pcl/search/kdtree.h>
 #include <pcl/filters/extract_indices.h>
+#include <pcl/filters/passthrough.h>
+#include <pcl/filters/voxel_grid.h>
+#include <pcl/sample_consensus/method_types.h>
+#include <pcl/sample_consensus/model_types.h>
 #include <pcl/octree/octree_pointcloud.h>
 
 #include <pcl/features/vfh.h>
+#include <pcl/features/fpfh.h>
 #include <pcl/io/pcd_io.h>
 
 #include <Eigen/Dense>
 
 #include <pcl/features/integral_image_normal.h>
+#include <pcl/segmentation/conditional_euclidean_clustering.h>
+
+#include <boost/thread/tss.hpp>
+
+#include <stdexcept>
 
 #include "minipcl.h"
 
@@ -165,7 +175,94 @@ void mpcl_extract_PointXYZRGBA(pcl::PointCloud<pcl::PointXYZRGBA>::Ptr &incloud,
     ext.filter(*outcloud);
 }
 
+void mpcl_crop_downsample_segment_PointXYZRGB(const pcl::PointCloud<pcl::PointXYZRGB>::Ptr &incloud,
+                   const std::string &field_name,
+                   float axis_min,
+                   float axis_max,
+                   float leaf_size,
+                   double distance_threshold,
+                   int max_iterations,
+                   pcl::PointIndices &table_indices,
+                   pcl::PointCloud<pcl::PointXYZRGB> &table,
+                   pcl::PointCloud<pcl::PointXYZRGB> &objects,
+                   pcl::ModelCoefficients &coefficients)
+{
+    table_indices.indices.clear();
+    coefficients.values.clear();
+    table.clear();
+    objects.clear();
+
+    // Crop first, so the voxel grid only visits the region of interest
+    pcl::PointCloud<pcl::PointXYZRGB>::Ptr cropped (new pcl::PointCloud<pcl::PointXYZRGB>);
+    pcl::PassThrough<pcl::PointXYZRGB> pass;
+    pass.setInputCloud(incloud);
+    pass.setFilterFieldName(field_name);
+    pass.setFilterLimits(axis_min, axis_max);
+    pass.filter(*cropped);
+
+    pcl::PointCloud<pcl::PointXYZRGB>::Ptr downsampled (new pcl::PointCloud<pcl::PointXYZRGB>);
+    pcl::VoxelGrid<pcl::PointXYZRGB> vox;
+    vox.setInputCloud(cropped);
+    vox.setLeafSize(leaf_size, leaf_size, leaf_size);
+    vox.filter(*downsampled);
+    if (downsampled->empty())
+        return;
+
+    pcl::SACSegmentation<pcl::PointXYZRGB> seg;
+    seg.setInputCloud(downsampled);
+    seg.setModelType(pcl::SACMODEL_PLANE);
+    seg.setMethodType(pcl::SAC_RANSAC);
+    seg.setDistanceThreshold(distance_threshold);
+    seg.setMaxIterations(max_iterations);
+    seg.segment(table_indices, coefficients);
+
+    pcl::PointIndices::Ptr inliers (new pcl::PointIndices(table_indices));
+    pcl::ExtractIndices<pcl::PointXYZRGB> ext;
+    ext.setInputCloud(downsampled);
+    ext.setIndices(inliers);
+    ext.setNegative(false);
+    ext.filter(table);
+    ext.setNegative(true);
+    ext.filter(objects);
+}
+
 // EuclideanClusterExtraction
+// ConditionalEuclideanClustering only takes a plain function pointer as its
+// condition before PCL 1.10, so the color tolerance is handed over in a
+// thread-local static. The condition runs on the thread calling segment(),
+// so clusterings on different threads neither share nor wait for it.
+static boost::thread_specific_ptr<float> color_cluster_sqr_tolerance;
+
+static bool mpcl_color_condition_PointXYZRGB(const pcl::PointXYZRGB &a,
+                                             const pcl::PointXYZRGB &b,
+                                             float squared_distance)
+{
+    float dr = float(a.r) - float(b.r);
+    float dg = float(a.g) - float(b.g);
+    float db = float(a.b) - float(b.b);
+    return dr * dr + dg * dg + db * db <= *color_cluster_sqr_tolerance;
+}
+
+void mpcl_extract_color_clusters_PointXYZRGB(const pcl::PointCloud<pcl::PointXYZRGB>::Ptr &incloud,
+                   float cluster_tolerance,
+                   float color_tolerance,
+                   int min_cluster_size,
+                   int max_cluster_size,
+                   std::vector<pcl::PointIndices> &clusters)
+{
+    pcl::ConditionalEuclideanClustering<pcl::PointXYZRGB> cec;
+    cec.setInputCloud(incloud);
+    cec.setClusterTolerance(cluster_tolerance);
+    cec.setMinClusterSize(min_cluster_size);
+    cec.setMaxClusterSize(max_cluster_size);
+    cec.setConditionFunction(&mpcl_color_condition_PointXYZRGB);
+
+    if (color_cluster_sqr_tolerance.get() == NULL)
+        color_cluster_sqr_tolerance.reset(new float);
+    *color_cluster_sqr_tolerance = color_tolerance * color_tolerance;
+    cec.segment(clusters);
+}
+
 // Octree
 // void mpcl_deleteVoxelAtPoint(pcl::octree::OctreePointCloud<pcl::PointXYZ>& inOctree, pcl::PointXYZ incloud)
 // {
@@ -228,6 +325,60 @@ void mpcl_extract_VFH(pcl::PointCloud<pcl::PointXYZ>::Ptr cloud)
     // return vfhs;
 }
 
+// Global descriptors
+// normals holds the normal of every point of cloud, e.g. from mpcl_compute_normals_PointXYZRGB.
+void mpcl_compute_vfh_PointXYZRGB(const pcl::PointCloud<pcl::PointXYZRGB>::Ptr &cloud,
+                  const pcl::PointCloud<pcl::Normal>::Ptr &normals,
+                  std::vector<float> &histogram)
+{
+    pcl::VFHEstimation<pcl::PointXYZRGB, pcl::Normal, pcl::VFHSignature308> vfh;
+    pcl::search::KdTree<pcl::PointXYZRGB>::Ptr tree (new pcl::search::KdTree<pcl::PointXYZRGB> ());
+    pcl::PointCloud<pcl::VFHSignature308> signature;
+
+    vfh.setInputCloud (cloud);
+    vfh.setInputNormals (normals);
+    vfh.setSearchMethod (tree);
+    vfh.compute (signature);
+
+    // compute() clears the output when the input is rejected, e.g. an empty cloud
+    if (signature.points.empty ())
+        throw std::runtime_error ("VFH estimation failed, the cloud is empty or its normals do not match");
+
+    const float *bins = signature.points[0].histogram;
+    histogram.assign (bins, bins + 308);
+}
+
+void mpcl_compute_fpfh_mean_PointXYZRGB(const pcl::PointCloud<pcl::PointXYZRGB>::Ptr &cloud,
+                  const pcl::PointCloud<pcl::Normal>::Ptr &normals,
+                  double searchRadius,
+                  std::vector<float> &histogram)
+{
+    pcl::FPFHEstimation<pcl::PointXYZRGB, pcl::Normal, pcl::FPFHSignature33> fpfh;
+    pcl::search::KdTree<pcl::PointXYZRGB>::Ptr tree (new pcl::search::KdTree<pcl::PointXYZRGB> ());
+    pcl::PointCloud<pcl::FPFHSignature33> signatures;
+
+    fpfh.setInputCloud (cloud);
+    fpfh.setInputNormals (normals);
+    fpfh.setSearchMethod (tree);
+    fpfh.setRadiusSearch (searchRadius);
+    fpfh.compute (signatures);
+
+    // Points without enough neighbors get NaN histograms, leave them out of the mean
+    histogram.assign (33, 0.0f);
+    size_t count = 0;
+    for (size_t i = 0; i < signatures.points.size(); ++i)
+    {
+        const float *bins = signatures.points[i].histogram;
+        if (!pcl_isfinite (bins[0]))
+            continue;
+        for (int j = 0; j < 33; ++j)
+            histogram[j] += bins[j];
+        ++count;
+    }
+    for (int j = 0; count > 0 && j < 33; ++j)
+        histogram[j] /= count;
+}
+
 /*
 // pcl1.6 
 #include <pcl/keypoints/harris_keypoint3D.h>
@@ -4,7 +4,11 @@
 #include <pcl/point_types.h>
 #include <pcl/segmentation/sac_segmentation.h>
 #include <pcl/octree/octree_pointcloud.h>
+#include <pcl/kdtree/kdtree_flann.h>
+#include <pcl/common/point_tests.h>
 
+#include <stdint.h>
+#include <string>
 #include <vector>
 //
 void mpcl_compute_normals(const pcl::PointCloud<pcl::PointXYZ> &cloud,
@@ -62,6 +66,32 @@ void mpcl_extract_PointXYZRGBA(pcl::PointCloud<pcl::PointXYZRGBA>::Ptr &incloud,
                   pcl::PointIndices *indices,
                   bool negative);
 
+// Crop, downsample and fit the dominant plane in one pass: a passthrough
+// filter on field_name, a voxel grid of leaf_size and a RANSAC plane fit.
+// table_indices index the cropped and downsampled cloud, which is split
+// into the plane inliers (table) and the rest (objects).
+void mpcl_crop_downsample_segment_PointXYZRGB(const pcl::PointCloud<pcl::PointXYZRGB>::Ptr &incloud,
+                  const std::string &field_name,
+                  float axis_min,
+                  float axis_max,
+                  float leaf_size,
+                  double distance_threshold,
+                  int max_iterations,
+                  pcl::PointIndices &table_indices,
+                  pcl::PointCloud<pcl::PointXYZRGB> &table,
+                  pcl::PointCloud<pcl::PointXYZRGB> &objects,
+                  pcl::ModelCoefficients &coefficients);
+
+// EuclideanClusterExtraction
+// Euclidean clustering that only joins neighboring points whose colors are
+// within color_tolerance of each other, through ConditionalEuclideanClustering.
+void mpcl_extract_color_clusters_PointXYZRGB(const pcl::PointCloud<pcl::PointXYZRGB>::Ptr &incloud,
+                  float cluster_tolerance,
+                  float color_tolerance,
+                  int min_cluster_size,
+                  int max_cluster_size,
+                  std::vector<pcl::PointIndices> &clusters);
+
 // Octree(OctreePointCloud)
 // void mpcl_deleteVoxelAtPoint(pcl::octree::OctreePointCloud<pcl::PointXYZ>& inOctree, pcl::PointXYZ incloud);
 // void mpcl_deleteVoxelAtPoint_PointXYZI(pcl::octree::OctreePointCloud<pcl::PointXYZI>& inOctree, pcl::PointXYZI incloud);
@@ -73,9 +103,131 @@ void mpcl_extract_PointXYZRGBA(pcl::PointCloud<pcl::PointXYZRGBA>::Ptr &incloud,
 // int mpcl_getOccupiedVoxelCenters_PointXYZRGB(pcl::octree::OctreePointCloud<pcl::PointXYZRGB>& inOctree, std::vector<pcl::PointXYZRGB, Eigen::aligned_allocator<pcl::PointXYZRGB> > alignPoint);
 // int mpcl_getOccupiedVoxelCenters_PointXYZRGBA(pcl::octree::OctreePointCloud<pcl::PointXYZRGBA>& inOctree, std::vector<pcl::PointXYZRGBA, Eigen::aligned_allocator<pcl::PointXYZRGBA> > alignPoint);
 
+// Point type conversions
+// Copy the x, y, z fields of every point into a cloud of another point type.
+template <typename PointInT, typename PointOutT>
+void mpcl_copy_xyz(const pcl::PointCloud<PointInT> &in, pcl::PointCloud<PointOutT> &out)
+{
+    out.header = in.header;
+    out.points.resize(in.points.size());
+    out.width = in.width;
+    out.height = in.height;
+    out.is_dense = in.is_dense;
+    for (size_t i = 0; i < in.points.size(); ++i)
+    {
+        out.points[i].x = in.points[i].x;
+        out.points[i].y = in.points[i].y;
+        out.points[i].z = in.points[i].z;
+    }
+}
+
+// Copy x, y, z and the packed color between the XYZRGB and XYZRGBA point types.
+template <typename PointInT, typename PointOutT>
+void mpcl_copy_xyz_rgba(const pcl::PointCloud<PointInT> &in, pcl::PointCloud<PointOutT> &out)
+{
+    mpcl_copy_xyz(in, out);
+    for (size_t i = 0; i < in.points.size(); ++i)
+        out.points[i].rgba = in.points[i].rgba;
+}
+
+// Copy x, y, z and give every point the same packed color, in a single pass.
+template <typename PointInT, typename PointOutT>
+void mpcl_copy_xyz_fill_rgba(const pcl::PointCloud<PointInT> &in, uint32_t rgba, pcl::PointCloud<PointOutT> &out)
+{
+    out.header = in.header;
+    out.points.resize(in.points.size());
+    out.width = in.width;
+    out.height = in.height;
+    out.is_dense = in.is_dense;
+    for (size_t i = 0; i < in.points.size(); ++i)
+    {
+        out.points[i].x = in.points[i].x;
+        out.points[i].y = in.points[i].y;
+        out.points[i].z = in.points[i].z;
+        out.points[i].rgba = rgba;
+    }
+}
+
+// KdTreeFLANN
+// Batch searches around every point of query, in a single call that needs no
+// Python objects, so it can run without the GIL. The results are in the CSR
+// layout: the neighbors of query point i are indices[offsets[i]] up to
+// indices[offsets[i + 1]], with their squared distances at the same positions
+// of sqr_distances. Non-finite query points have no neighbors.
+template <typename PointT>
+void mpcl_radius_search_batch(const pcl::KdTreeFLANN<PointT> &tree,
+                  const pcl::PointCloud<PointT> &query,
+                  double radius,
+                  unsigned int max_nn,
+                  std::vector<int64_t> &offsets,
+                  std::vector<int> &indices,
+                  std::vector<float> &sqr_distances)
+{
+    std::vector<int> k_indices;
+    std::vector<float> k_sqr_distances;
+
+    offsets.resize(query.points.size() + 1);
+    offsets[0] = 0;
+    indices.clear();
+    sqr_distances.clear();
+    for (size_t i = 0; i < query.points.size(); ++i)
+    {
+        if (pcl::isFinite(query.points[i]))
+        {
+            tree.radiusSearch(query.points[i], radius, k_indices, k_sqr_distances, max_nn);
+            indices.insert(indices.end(), k_indices.begin(), k_indices.end());
+            sqr_distances.insert(sqr_distances.end(), k_sqr_distances.begin(), k_sqr_distances.end());
+        }
+        offsets[i + 1] = indices.size();
+    }
+}
+
+// Same for the k nearest neighbors, fewer if the searched cloud is smaller than k.
+template <typename PointT>
+void mpcl_nearest_k_search_batch(const pcl::KdTreeFLANN<PointT> &tree,
+                  const pcl::PointCloud<PointT> &query,
+                  int k,
+                  std::vector<int64_t> &offsets,
+                  std::vector<int> &indices,
+                  std::vector<float> &sqr_distances)
+{
+    std::vector<int> k_indices (k);
+    std::vector<float> k_sqr_distances (k);
+
+    offsets.resize(query.points.size() + 1);
+    offsets[0] = 0;
+    indices.clear();
+    sqr_distances.clear();
+    indices.reserve(query.points.size() * k);
+    sqr_distances.reserve(query.points.size() * k);
+    for (size_t i = 0; i < query.points.size(); ++i)
+    {
+        if (pcl::isFinite(query.points[i]))
+        {
+            int found = tree.nearestKSearch(query.points[i], k, k_indices, k_sqr_distances);
+            indices.insert(indices.end(), k_indices.begin(), k_indices.begin() + found);
+            sqr_distances.insert(sqr_distances.end(), k_sqr_distances.begin(), k_sqr_distances.begin() + found);
+        }
+        offsets[i + 1] = indices.size();
+    }
+}
+
 // VFH
 void mpcl_extract_VFH(pcl::PointCloud<pcl::PointXYZ>::Ptr cloud);
 
+// Global descriptors of a whole cloud, from the normal of every point.
+// The Viewpoint Feature Histogram has 308 bins.
+void mpcl_compute_vfh_PointXYZRGB(const pcl::PointCloud<pcl::PointXYZRGB>::Ptr &cloud,
+                  const pcl::PointCloud<pcl::Normal>::Ptr &normals,
+                  std::vector<float> &histogram);
+
+// Mean of the 33 bin Fast Point Feature Histograms of all points, each one
+// over the neighbors within searchRadius.
+void mpcl_compute_fpfh_mean_PointXYZRGB(const pcl::PointCloud<pcl::PointXYZRGB>::Ptr &cloud,
+                  const pcl::PointCloud<pcl::Normal>::Ptr &normals,
+                  double searchRadius,
+                  std::vector<float> &histogram);
+
 // // HarrisKeypoint3D
 // // NG(outcloud pcl::PointXYZI)
 // void mpcl_extract_HarrisKeypoint3D(pcl::PointCloud<pcl::PointXYZ>::Ptr &incloud, pcl::PointCloud<pcl::PointXYZ> *outcloud);
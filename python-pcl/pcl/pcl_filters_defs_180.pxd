@@ -104,7 +104,7 @@ cdef extern from "pcl/filters/filter.h" namespace "pcl":
         
         # \brief Calls the filtering method and returns the filtered dataset in output.
         # \param[out] output the resultant filtered point cloud dataset
-        void filter (cpp.PointCloud[T] &output)
+        void filter (cpp.PointCloud[T] &output) nogil
 
 
 ctypedef shared_ptr[Filter[cpp.PointXYZ]] FilterPtr_t
@@ -184,7 +184,7 @@ cdef extern from "pcl/filters/filter_indices.h" namespace "pcl":
         # Interfacing with External C Code
         # http://cython-docs2.readthedocs.io/en/latest/src/userguide/external_C_code.html
         # void filter (cpp.PointCloud[T] &output)
-        void c_filter "filter" (cpp.PointCloud[T] &output)
+        void c_filter "filter" (cpp.PointCloud[T] &output) nogil
         
         # brief Calls the filtering method and returns the filtered point cloud indices.
         # param[out] indices the resultant filtered point cloud indices
@@ -1285,6 +1285,8 @@ cdef extern from "pcl/octree/octree_pointcloud_changedetector.h" namespace "pcl:
         # \return number of point indices
         # int getPointIndicesFromNewVoxels (std::vector<int> &indicesVector_arg, const int minPointsPerLeaf_arg = 0)
         int getPointIndicesFromNewVoxels (vector[int] &indicesVector_arg, const int minPointsPerLeaf_arg)
+        # \brief Switch buffers and reset current octree structure (Octree2BufBase).
+        void switchBuffers ()
 
 
 ctypedef OctreePointCloudChangeDetector[cpp.PointXYZ] OctreePointCloudChangeDetector_t
@@ -126,7 +126,7 @@ cdef extern from "pcl/segmentation/sac_segmentation.h" namespace "pcl":
         # inline double getEpsAngle () const { return (eps_angle_); }
         double getEpsAngle ()
 
-        void segment (PointIndices, ModelCoefficients)
+        void segment (PointIndices, ModelCoefficients) nogil
 
 
 ctypedef SACSegmentation[PointXYZ] SACSegmentation_t
@@ -152,7 +152,7 @@ cdef extern from "pcl/segmentation/sac_segmentation.h" namespace "pcl":
         void setInputCloud (shared_ptr[PointCloud[T]])
         void setInputNormals (shared_ptr[PointCloud[N]])
         void setEpsAngle (double ea)
-        void segment (PointIndices, ModelCoefficients)
+        void segment (PointIndices, ModelCoefficients) nogil
         void setMinMaxOpeningAngle(double, double)
         void getMinMaxOpeningAngle(double, double)
         # Add
@@ -591,13 +591,26 @@ cdef extern from "pcl/segmentation/extract_clusters.h" namespace "pcl":
         # brief Cluster extraction in a PointCloud given by <setInputCloud (), setIndices ()>
         # param[out] clusters the resultant point clusters
         # void extract (std::vector<PointIndices> &clusters);
-        void extract (vector[PointIndices] &clusters)
+        void extract (vector[PointIndices] &clusters) nogil
 
 
 ctypedef EuclideanClusterExtraction[PointXYZ] EuclideanClusterExtraction_t
 ctypedef EuclideanClusterExtraction[PointXYZI] EuclideanClusterExtraction_PointXYZI_t
-ctypedef EuclideanClusterExtraction[PointXYZRGB] EuclideanClusterExtraction_PointXYZRGB_t
 ctypedef EuclideanClusterExtraction[PointXYZRGBA] EuclideanClusterExtraction_PointXYZRGBA_t
+
+# The XYZRGB specialization searches a KdTree of XYZRGB points, so only it takes one
+cdef extern from "pcl/segmentation/extract_clusters.h":
+    cdef cppclass EuclideanClusterExtraction_PointXYZRGB_t "pcl::EuclideanClusterExtraction<pcl::PointXYZRGB>"(PCLBase[PointXYZRGB]):
+        EuclideanClusterExtraction_PointXYZRGB_t()
+        void setSearchMethod (const pclkdt.KdTree_PointXYZRGB_Ptr_t &tree)
+        void setClusterTolerance (double tolerance)
+        double getClusterTolerance ()
+        void setMinClusterSize (int min_cluster_size)
+        int getMinClusterSize ()
+        void setMaxClusterSize (int max_cluster_size)
+        int getMaxClusterSize ()
+        void extract (vector[PointIndices] &clusters) nogil
+
 ###
 
 
@@ -35,7 +35,8 @@ cdef class PassThroughFilter:
         # cdef cpp.PointCloud_t *cCondAnd = <cpp.PointCloud_t *>pc.thisptr()[0]
         # self.me.filter(<cpp.PointCloud_t*> pc.thisptr()[0])
         # self.me.filter (<cpp.PointCloud_t*> pc.thisptr())
-        self.me.c_filter(pc.thisptr()[0])
+        with nogil:
+            self.me.c_filter(pc.thisptr()[0])
         return pc
 
 
@@ -69,7 +70,8 @@ cdef class PassThroughFilter_PointXYZI:
         a new PointCloud_PointXYZI
         """
         cdef PointCloud_PointXYZI pc = PointCloud_PointXYZI()
-        self.me.c_filter(pc.thisptr()[0])
+        with nogil:
+            self.me.c_filter(pc.thisptr()[0])
         return pc
 
 
@@ -103,7 +105,8 @@ cdef class PassThroughFilter_PointXYZRGB:
         a new PointCloud_PointXYZRGB
         """
         cdef PointCloud_PointXYZRGB pc = PointCloud_PointXYZRGB()
-        self.me.c_filter(pc.thisptr()[0])
+        with nogil:
+            self.me.c_filter(pc.thisptr()[0])
         return pc
 
 
@@ -137,5 +140,6 @@ cdef class PassThroughFilter_PointXYZRGBA:
         a new PointCloud_PointXYZRGBA
         """
         cdef PointCloud_PointXYZRGBA pc = PointCloud_PointXYZRGBA()
-        self.me.c_filter(pc.thisptr()[0])
+        with nogil:
+            self.me.c_filter(pc.thisptr()[0])
         return pc
@@ -24,7 +24,8 @@ cdef class VoxelGridFilter:
         a new pointcloud
         """
         cdef PointCloud pc = PointCloud()
-        self.me.filter(pc.thisptr()[0])
+        with nogil:
+            self.me.filter(pc.thisptr()[0])
         return pc
 
 cdef class VoxelGridFilter_PointXYZI:
@@ -49,7 +50,8 @@ cdef class VoxelGridFilter_PointXYZI:
         a new pointcloud
         """
         cdef PointCloud_PointXYZI pc = PointCloud_PointXYZI()
-        self.me.filter(pc.thisptr()[0])
+        with nogil:
+            self.me.filter(pc.thisptr()[0])
         return pc
 
 cdef class VoxelGridFilter_PointXYZRGB:
@@ -74,7 +76,8 @@ cdef class VoxelGridFilter_PointXYZRGB:
         a new pointcloud
         """
         cdef PointCloud_PointXYZRGB pc = PointCloud_PointXYZRGB()
-        self.me.filter(pc.thisptr()[0])
+        with nogil:
+            self.me.filter(pc.thisptr()[0])
         return pc
 
 cdef class VoxelGridFilter_PointXYZRGBA:
@@ -99,5 +102,6 @@ cdef class VoxelGridFilter_PointXYZRGBA:
         a new pointcloud
         """
         cdef PointCloud_PointXYZRGBA pc = PointCloud_PointXYZRGBA()
-        self.me.filter(pc.thisptr()[0])
+        with nogil:
+            self.me.filter(pc.thisptr()[0])
         return pc
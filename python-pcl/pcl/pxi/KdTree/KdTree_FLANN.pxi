@@ -1,6 +1,29 @@
 # -*- coding: utf-8 -*-
 cimport pcl_defs as cpp
 cimport pcl_kdtree_defs as pclkdt
+from libc.stdint cimport int64_t
+from libc.string cimport memcpy
+
+cdef extern from "minipcl.h":
+    void mpcl_radius_search_batch[T](pclkdt.KdTreeFLANN[T] &, cpp.PointCloud[T] &, double, unsigned int,
+                              vector[int64_t] &, vector[int] &, vector[float] &) nogil except +
+    void mpcl_nearest_k_search_batch[T](pclkdt.KdTreeFLANN[T] &, cpp.PointCloud[T] &, int,
+                              vector[int64_t] &, vector[int] &, vector[float] &) nogil except +
+
+
+cdef _csr_arrays(vector[int64_t] &offsets, vector[int] &indices, vector[float] &sqr_distances):
+    # Copy the results of a batch search into (offsets, indices, sqr_distances) ndarrays.
+    cdef cnp.ndarray[cnp.int64_t] offsets_arr = np.empty(offsets.size(), dtype=np.int64)
+    cdef cnp.ndarray[cnp.int32_t] indices_arr = np.empty(indices.size(), dtype=np.int32)
+    cdef cnp.ndarray[cnp.float32_t] sqdist_arr = np.empty(sqr_distances.size(), dtype=np.float32)
+
+    if offsets.size() > 0:
+        memcpy(offsets_arr.data, offsets.data(), offsets.size() * sizeof(int64_t))
+    if indices.size() > 0:
+        memcpy(indices_arr.data, indices.data(), indices.size() * sizeof(int))
+        memcpy(sqdist_arr.data, sqr_distances.data(), sqr_distances.size() * sizeof(float))
+    return offsets_arr, indices_arr, sqdist_arr
+
 
 cdef class KdTreeFLANN:
     """
@@ -19,6 +42,44 @@ cdef class KdTreeFLANN:
     def __dealloc__(self):
         del self.me
 
+    def radius_search_batch(self, PointCloud pc not None, double radius, unsigned int max_nn=0):
+        """
+        Find the neighbours within radius, and their squared distances, of
+        all points in the pointcloud, at most max_nn of them per point if
+        max_nn is not 0. The search runs in a single native call that
+        releases the GIL, so several searches can run on threads at once.
+        Non-finite points have no neighbours.
+        Results are in ndarrays in the CSR layout: the neighbours of point i
+        are indices[offsets[i]:offsets[i + 1]], size (pc.size + 1) for offsets.
+        Returns: (offsets, indices, sqr_distances)
+        """
+        cdef vector[int64_t] offsets
+        cdef vector[int] indices
+        cdef vector[float] sqr_distances
+
+        with nogil:
+            mpcl_radius_search_batch[cpp.PointXYZ](self.me[0], pc.thisptr()[0], radius, max_nn,
+                                                   offsets, indices, sqr_distances)
+        return _csr_arrays(offsets, indices, sqr_distances)
+
+    def nearest_k_search_batch(self, PointCloud pc not None, int k=1):
+        """
+        Find the k nearest neighbours and squared distances for all points
+        in the pointcloud, like radius_search_batch(). Points get fewer than
+        k neighbours when the reference pointcloud is smaller than k.
+        Returns: (offsets, indices, sqr_distances)
+        """
+        cdef vector[int64_t] offsets
+        cdef vector[int] indices
+        cdef vector[float] sqr_distances
+
+        if k < 1:
+            raise ValueError("k must be at least 1, got %d" % k)
+        with nogil:
+            mpcl_nearest_k_search_batch[cpp.PointXYZ](self.me[0], pc.thisptr()[0], k,
+                                                      offsets, indices, sqr_distances)
+        return _csr_arrays(offsets, indices, sqr_distances)
+
     def nearest_k_search_for_cloud(self, PointCloud pc not None, int k=1):
         """
         Find the k nearest neighbours and squared distances for all points
@@ -115,6 +176,44 @@ cdef class KdTreeFLANN_PointXYZI:
     def __dealloc__(self):
         del self.me
 
+    def radius_search_batch(self, PointCloud_PointXYZI pc not None, double radius, unsigned int max_nn=0):
+        """
+        Find the neighbours within radius, and their squared distances, of
+        all points in the pointcloud, at most max_nn of them per point if
+        max_nn is not 0. The search runs in a single native call that
+        releases the GIL, so several searches can run on threads at once.
+        Non-finite points have no neighbours.
+        Results are in ndarrays in the CSR layout: the neighbours of point i
+        are indices[offsets[i]:offsets[i + 1]], size (pc.size + 1) for offsets.
+        Returns: (offsets, indices, sqr_distances)
+        """
+        cdef vector[int64_t] offsets
+        cdef vector[int] indices
+        cdef vector[float] sqr_distances
+
+        with nogil:
+            mpcl_radius_search_batch[cpp.PointXYZI](self.me[0], pc.thisptr()[0], radius, max_nn,
+                                                    offsets, indices, sqr_distances)
+        return _csr_arrays(offsets, indices, sqr_distances)
+
+    def nearest_k_search_batch(self, PointCloud_PointXYZI pc not None, int k=1):
+        """
+        Find the k nearest neighbours and squared distances for all points
+        in the pointcloud, like radius_search_batch(). Points get fewer than
+        k neighbours when the reference pointcloud is smaller than k.
+        Returns: (offsets, indices, sqr_distances)
+        """
+        cdef vector[int64_t] offsets
+        cdef vector[int] indices
+        cdef vector[float] sqr_distances
+
+        if k < 1:
+            raise ValueError("k must be at least 1, got %d" % k)
+        with nogil:
+            mpcl_nearest_k_search_batch[cpp.PointXYZI](self.me[0], pc.thisptr()[0], k,
+                                                       offsets, indices, sqr_distances)
+        return _csr_arrays(offsets, indices, sqr_distances)
+
     def nearest_k_search_for_cloud(self, PointCloud_PointXYZI pc not None, int k=1):
         """
         Find the k nearest neighbours and squared distances for all points
@@ -179,6 +278,44 @@ cdef class KdTreeFLANN_PointXYZRGB:
     def __dealloc__(self):
         del self.me
 
+    def radius_search_batch(self, PointCloud_PointXYZRGB pc not None, double radius, unsigned int max_nn=0):
+        """
+        Find the neighbours within radius, and their squared distances, of
+        all points in the pointcloud, at most max_nn of them per point if
+        max_nn is not 0. The search runs in a single native call that
+        releases the GIL, so several searches can run on threads at once.
+        Non-finite points have no neighbours.
+        Results are in ndarrays in the CSR layout: the neighbours of point i
+        are indices[offsets[i]:offsets[i + 1]], size (pc.size + 1) for offsets.
+        Returns: (offsets, indices, sqr_distances)
+        """
+        cdef vector[int64_t] offsets
+        cdef vector[int] indices
+        cdef vector[float] sqr_distances
+
+        with nogil:
+            mpcl_radius_search_batch[cpp.PointXYZRGB](self.me[0], pc.thisptr()[0], radius, max_nn,
+                                                      offsets, indices, sqr_distances)
+        return _csr_arrays(offsets, indices, sqr_distances)
+
+    def nearest_k_search_batch(self, PointCloud_PointXYZRGB pc not None, int k=1):
+        """
+        Find the k nearest neighbours and squared distances for all points
+        in the pointcloud, like radius_search_batch(). Points get fewer than
+        k neighbours when the reference pointcloud is smaller than k.
+        Returns: (offsets, indices, sqr_distances)
+        """
+        cdef vector[int64_t] offsets
+        cdef vector[int] indices
+        cdef vector[float] sqr_distances
+
+        if k < 1:
+            raise ValueError("k must be at least 1, got %d" % k)
+        with nogil:
+            mpcl_nearest_k_search_batch[cpp.PointXYZRGB](self.me[0], pc.thisptr()[0], k,
+                                                         offsets, indices, sqr_distances)
+        return _csr_arrays(offsets, indices, sqr_distances)
+
     def nearest_k_search_for_cloud(self, PointCloud_PointXYZRGB pc not None, int k=1):
         """
         Find the k nearest neighbours and squared distances for all points
@@ -243,6 +380,44 @@ cdef class KdTreeFLANN_PointXYZRGBA:
     def __dealloc__(self):
         del self.me
 
+    def radius_search_batch(self, PointCloud_PointXYZRGBA pc not None, double radius, unsigned int max_nn=0):
+        """
+        Find the neighbours within radius, and their squared distances, of
+        all points in the pointcloud, at most max_nn of them per point if
+        max_nn is not 0. The search runs in a single native call that
+        releases the GIL, so several searches can run on threads at once.
+        Non-finite points have no neighbours.
+        Results are in ndarrays in the CSR layout: the neighbours of point i
+        are indices[offsets[i]:offsets[i + 1]], size (pc.size + 1) for offsets.
+        Returns: (offsets, indices, sqr_distances)
+        """
+        cdef vector[int64_t] offsets
+        cdef vector[int] indices
+        cdef vector[float] sqr_distances
+
+        with nogil:
+            mpcl_radius_search_batch[cpp.PointXYZRGBA](self.me[0], pc.thisptr()[0], radius, max_nn,
+                                                       offsets, indices, sqr_distances)
+        return _csr_arrays(offsets, indices, sqr_distances)
+
+    def nearest_k_search_batch(self, PointCloud_PointXYZRGBA pc not None, int k=1):
+        """
+        Find the k nearest neighbours and squared distances for all points
+        in the pointcloud, like radius_search_batch(). Points get fewer than
+        k neighbours when the reference pointcloud is smaller than k.
+        Returns: (offsets, indices, sqr_distances)
+        """
+        cdef vector[int64_t] offsets
+        cdef vector[int] indices
+        cdef vector[float] sqr_distances
+
+        if k < 1:
+            raise ValueError("k must be at least 1, got %d" % k)
+        with nogil:
+            mpcl_nearest_k_search_batch[cpp.PointXYZRGBA](self.me[0], pc.thisptr()[0], k,
+                                                          offsets, indices, sqr_distances)
+        return _csr_arrays(offsets, indices, sqr_distances)
+
     def nearest_k_search_for_cloud(self, PointCloud_PointXYZRGBA pc not None, int k=1):
         """
         Find the k nearest neighbours and squared distances for all points
@@ -0,0 +1,15 @@
+# -*- coding: utf-8 -*-
+cimport pcl_defs as cpp
+cimport pcl_kdtree_defs as pclkdt
+from boost_shared_ptr cimport sp_assign
+
+cdef class KdTree_PointXYZRGB:
+    """
+    Search tree over the coordinates of a PointXYZRGB cloud, to be used as
+    the search method of EuclideanClusterExtraction_PointXYZRGB.
+
+    Must be constructed from the reference point cloud.
+    """
+    def __cinit__(self, PointCloud_PointXYZRGB pc not None):
+        sp_assign(self.thisptr_shared, new pclkdt.KdTree_PointXYZRGB_t())
+        self.thisptr().setInputCloud(pc.thisptr_shared)
@@ -162,14 +162,21 @@ cdef class OctreePointCloudChangeDetector_PointXYZRGB(OctreePointCloud2Buf_Point
         self.me2 = <pcloct.OctreePointCloudChangeDetector_PointXYZRGB_t*> new pcloct.OctreePointCloudChangeDetector_PointXYZRGB_t(resolution)
         self.me = <pcloct.OctreePointCloud2Buf_PointXYZRGB_t*> self.me2
 
-    def get_PointIndicesFromNewVoxels (self):
+    def get_PointIndicesFromNewVoxels (self, int min_points_per_leaf=0):
+        """
+        Get the indices of the points in voxels that did not exist in the previous buffer.
+        Voxels holding fewer than min_points_per_leaf points are left out.
+        """
         cdef vector[int] newPointIdxVector
-        self.me2.getPointIndicesFromNewVoxels (newPointIdxVector, 0)
+        self.me2.getPointIndicesFromNewVoxels (newPointIdxVector, min_points_per_leaf)
         return newPointIdxVector
 
     # use Octree2BufBase class function
-    # def switchBuffers (self):
-    #     self.me2.switchBuffers()
+    def switchBuffers (self):
+        """
+        Keep the current octree as the previous buffer and start an empty one.
+        """
+        self.me2.switchBuffers()
 
     # base OctreePointCloud2Buf
     def define_bounding_box(self):
@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+cimport pcl_defs as cpp
+from cython.operator cimport dereference as deref
+from libc.stdint cimport uint32_t
+
+cdef extern from "minipcl.h":
+    void mpcl_copy_xyz[PointInT, PointOutT](cpp.PointCloud[PointInT] &, cpp.PointCloud[PointOutT] &) except +
+    void mpcl_copy_xyz_rgba[PointInT, PointOutT](cpp.PointCloud[PointInT] &, cpp.PointCloud[PointOutT] &) except +
+    void mpcl_copy_xyz_fill_rgba[PointInT, PointOutT](cpp.PointCloud[PointInT] &, uint32_t, cpp.PointCloud[PointOutT] &) except +
+
+
+def copy_point_cloud(cloud, point_type, color=None):
+    """
+    Convert a point cloud to another point type in a single C++ pass
+
+    point_type is one of PointCloud, PointCloud_PointXYZI,
+    PointCloud_PointXYZRGB and PointCloud_PointXYZRGBA. x, y and z are
+    always copied and the packed color is kept between the XYZRGB and
+    XYZRGBA types; fields the target type does not share are left at their
+    defaults. When color ([r, g, b] in 0-255) is given, every point of the
+    converted cloud gets that color in the same pass, so point_type must
+    be a colored type.
+    """
+    cdef uint32_t rgba = 0
+    cdef bint fill = color is not None
+
+    if fill:
+        if point_type is not PointCloud_PointXYZRGB and point_type is not PointCloud_PointXYZRGBA:
+            raise ValueError("Can't fill a color into a %s" % point_type.__name__)
+        # Same packing as rgb_to_float() in sensor_stick.pcl_helper
+        rgba = ((color[0] & 0xff) << 16) | ((color[1] & 0xff) << 8) | (color[2] & 0xff)
+    elif type(cloud) is point_type:
+        return point_type(cloud)
+
+    if isinstance(cloud, PointCloud):
+        return _copy_from_xyz(cloud, point_type, fill, rgba)
+    if isinstance(cloud, PointCloud_PointXYZI):
+        return _copy_from_xyzi(cloud, point_type, fill, rgba)
+    if isinstance(cloud, PointCloud_PointXYZRGB):
+        return _copy_from_xyzrgb(cloud, point_type, fill, rgba)
+    if isinstance(cloud, PointCloud_PointXYZRGBA):
+        return _copy_from_xyzrgba(cloud, point_type, fill, rgba)
+    raise TypeError("Can't convert a %s" % type(cloud))
+
+
+cdef _copy_from_xyz(PointCloud cloud, point_type, bint fill, uint32_t rgba):
+    cdef cpp.PointCloud[cpp.PointXYZ] *p = cloud.thisptr()
+    cdef PointCloud xyz
+    cdef PointCloud_PointXYZI xyzi
+    cdef PointCloud_PointXYZRGB xyzrgb
+    cdef PointCloud_PointXYZRGBA xyzrgba
+
+    if point_type is PointCloud:
+        xyz = PointCloud()
+        mpcl_copy_xyz[cpp.PointXYZ, cpp.PointXYZ](deref(p), deref(xyz.thisptr()))
+        return xyz
+
+    if point_type is PointCloud_PointXYZI:
+        xyzi = PointCloud_PointXYZI()
+        mpcl_copy_xyz[cpp.PointXYZ, cpp.PointXYZI](deref(p), deref(xyzi.thisptr()))
+        return xyzi
+
+    if point_type is PointCloud_PointXYZRGB:
+        xyzrgb = PointCloud_PointXYZRGB()
+        if fill:
+            mpcl_copy_xyz_fill_rgba[cpp.PointXYZ, cpp.PointXYZRGB](deref(p), rgba, deref(xyzrgb.thisptr()))
+        else:
+            mpcl_copy_xyz[cpp.PointXYZ, cpp.PointXYZRGB](deref(p), deref(xyzrgb.thisptr()))
+        return xyzrgb
+
+    if point_type is PointCloud_PointXYZRGBA:
+        xyzrgba = PointCloud_PointXYZRGBA()
+        if fill:
+            mpcl_copy_xyz_fill_rgba[cpp.PointXYZ, cpp.PointXYZRGBA](deref(p), rgba, deref(xyzrgba.thisptr()))
+        else:
+            mpcl_copy_xyz[cpp.PointXYZ, cpp.PointXYZRGBA](deref(p), deref(xyzrgba.thisptr()))
+        return xyzrgba
+
+    raise TypeError("Can't convert to a %s" % point_type)
+
+
+cdef _copy_from_xyzi(PointCloud_PointXYZI cloud, point_type, bint fill, uint32_t rgba):
+    cdef cpp.PointCloud[cpp.PointXYZI] *p = cloud.thisptr()
+    cdef PointCloud xyz
+    cdef PointCloud_PointXYZI xyzi
+    cdef PointCloud_PointXYZRGB xyzrgb
+    cdef PointCloud_PointXYZRGBA xyzrgba
+
+    if point_type is PointCloud:
+        xyz = PointCloud()
+        mpcl_copy_xyz[cpp.PointXYZI, cpp.PointXYZ](deref(p), deref(xyz.thisptr()))
+        return xyz
+
+    if point_type is PointCloud_PointXYZI:
+        xyzi = PointCloud_PointXYZI()
+        mpcl_copy_xyz[cpp.PointXYZI, cpp.PointXYZI](deref(p), deref(xyzi.thisptr()))
+        return xyzi
+
+    if point_type is PointCloud_PointXYZRGB:
+        xyzrgb = PointCloud_PointXYZRGB()
+        if fill:
+            mpcl_copy_xyz_fill_rgba[cpp.PointXYZI, cpp.PointXYZRGB](deref(p), rgba, deref(xyzrgb.thisptr()))
+        else:
+            mpcl_copy_xyz[cpp.PointXYZI, cpp.PointXYZRGB](deref(p), deref(xyzrgb.thisptr()))
+        return xyzrgb
+
+    if point_type is PointCloud_PointXYZRGBA:
+        xyzrgba = PointCloud_PointXYZRGBA()
+        if fill:
+            mpcl_copy_xyz_fill_rgba[cpp.PointXYZI, cpp.PointXYZRGBA](deref(p), rgba, deref(xyzrgba.thisptr()))
+        else:
+            mpcl_copy_xyz[cpp.PointXYZI, cpp.PointXYZRGBA](deref(p), deref(xyzrgba.thisptr()))
+        return xyzrgba
+
+    raise TypeError("Can't convert to a %s" % point_type)
+
+
+cdef _copy_from_xyzrgb(PointCloud_PointXYZRGB cloud, point_type, bint fill, uint32_t rgba):
+    cdef cpp.PointCloud[cpp.PointXYZRGB] *p = cloud.thisptr()
+    cdef PointCloud xyz
+    cdef PointCloud_PointXYZI xyzi
+    cdef PointCloud_PointXYZRGB xyzrgb
+    cdef PointCloud_PointXYZRGBA xyzrgba
+
+    if point_type is PointCloud:
+        xyz = PointCloud()
+        mpcl_copy_xyz[cpp.PointXYZRGB, cpp.PointXYZ](deref(p), deref(xyz.thisptr()))
+        return xyz
+
+    if point_type is PointCloud_PointXYZI:
+        xyzi = PointCloud_PointXYZI()
+        mpcl_copy_xyz[cpp.PointXYZRGB, cpp.PointXYZI](deref(p), deref(xyzi.thisptr()))
+        return xyzi
+
+    if point_type is PointCloud_PointXYZRGB:
+        xyzrgb = PointCloud_PointXYZRGB()
+        if fill:
+            mpcl_copy_xyz_fill_rgba[cpp.PointXYZRGB, cpp.PointXYZRGB](deref(p), rgba, deref(xyzrgb.thisptr()))
+        else:
+            mpcl_copy_xyz_rgba[cpp.PointXYZRGB, cpp.PointXYZRGB](deref(p), deref(xyzrgb.thisptr()))
+        return xyzrgb
+
+    if point_type is PointCloud_PointXYZRGBA:
+        xyzrgba = PointCloud_PointXYZRGBA()
+        if fill:
+            mpcl_copy_xyz_fill_rgba[cpp.PointXYZRGB, cpp.PointXYZRGBA](deref(p), rgba, deref(xyzrgba.thisptr()))
+        else:
+            mpcl_copy_xyz_rgba[cpp.PointXYZRGB, cpp.PointXYZRGBA](deref(p), deref(xyzrgba.thisptr()))
+        return xyzrgba
+
+    raise TypeError("Can't convert to a %s" % point_type)
+
+
+cdef _copy_from_xyzrgba(PointCloud_PointXYZRGBA cloud, point_type, bint fill, uint32_t rgba):
+    cdef cpp.PointCloud[cpp.PointXYZRGBA] *p = cloud.thisptr()
+    cdef PointCloud xyz
+    cdef PointCloud_PointXYZI xyzi
+    cdef PointCloud_PointXYZRGB xyzrgb
+    cdef PointCloud_PointXYZRGBA xyzrgba
+
+    if point_type is PointCloud:
+        xyz = PointCloud()
+        mpcl_copy_xyz[cpp.PointXYZRGBA, cpp.PointXYZ](deref(p), deref(xyz.thisptr()))
+        return xyz
+
+    if point_type is PointCloud_PointXYZI:
+        xyzi = PointCloud_PointXYZI()
+        mpcl_copy_xyz[cpp.PointXYZRGBA, cpp.PointXYZI](deref(p), deref(xyzi.thisptr()))
+        return xyzi
+
+    if point_type is PointCloud_PointXYZRGB:
+        xyzrgb = PointCloud_PointXYZRGB()
+        if fill:
+            mpcl_copy_xyz_fill_rgba[cpp.PointXYZRGBA, cpp.PointXYZRGB](deref(p), rgba, deref(xyzrgb.thisptr()))
+        else:
+            mpcl_copy_xyz_rgba[cpp.PointXYZRGBA, cpp.PointXYZRGB](deref(p), deref(xyzrgb.thisptr()))
+        return xyzrgb
+
+    if point_type is PointCloud_PointXYZRGBA:
+        xyzrgba = PointCloud_PointXYZRGBA()
+        if fill:
+            mpcl_copy_xyz_fill_rgba[cpp.PointXYZRGBA, cpp.PointXYZRGBA](deref(p), rgba, deref(xyzrgba.thisptr()))
+        else:
+            mpcl_copy_xyz_rgba[cpp.PointXYZRGBA, cpp.PointXYZRGBA](deref(p), deref(xyzrgba.thisptr()))
+        return xyzrgba
+
+    raise TypeError("Can't convert to a %s" % point_type)
@@ -28,7 +28,7 @@ cdef extern from "minipcl.h":
     void mpcl_sacnormal_set_axis_PointXYZI(pclseg.SACSegmentationNormal_PointXYZI_t,
                               double ax, double ay, double az) except +
     void mpcl_extract_PointXYZI(cpp.PointCloud_PointXYZI_Ptr_t, cpp.PointCloud_PointXYZI_t *,
-                              cpp.PointIndices_t *, bool) except +
+                              cpp.PointIndices_t *, bool) nogil except +
 
 # Empirically determine strides, for buffer support.
 # XXX Is there a more elegant way to get these?
@@ -370,7 +370,8 @@ cdef class PointCloud_PointXYZI:
         
         result = PointCloud_PointXYZI()
         # (<cpp.PointCloud[cpp.PointXYZI]> deref(self.thisptr())
-        mpcl_extract_PointXYZI(self.thisptr_shared, result.thisptr(), ind, negative)
+        with nogil:
+            mpcl_extract_PointXYZI(self.thisptr_shared, result.thisptr(), ind, negative)
         # XXX are we leaking memory here? del ind causes a double free...
         
         return result
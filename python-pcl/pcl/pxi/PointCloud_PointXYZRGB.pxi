@@ -28,7 +28,7 @@ cdef extern from "minipcl.h":
     void mpcl_sacnormal_set_axis_PointXYZRGB(pclseg.SACSegmentationNormal_PointXYZRGB_t,
                               double ax, double ay, double az) except +
     void mpcl_extract_PointXYZRGB(cpp.PointCloud_PointXYZRGB_Ptr_t, cpp.PointCloud_PointXYZRGB_t *,
-                              cpp.PointIndices_t *, bool) except +
+                              cpp.PointIndices_t *, bool) nogil except +
 
 # Empirically determine strides, for buffer support.
 # XXX Is there a more elegant way to get these?
@@ -346,7 +346,8 @@ cdef class PointCloud_PointXYZRGB:
             ind.indices.push_back(i)
         
         result = PointCloud_PointXYZRGB()
-        mpcl_extract_PointXYZRGB(self.thisptr_shared, result.thisptr(), ind, negative)
+        with nogil:
+            mpcl_extract_PointXYZRGB(self.thisptr_shared, result.thisptr(), ind, negative)
         # XXX are we leaking memory here? del ind causes a double free...
         
         return result
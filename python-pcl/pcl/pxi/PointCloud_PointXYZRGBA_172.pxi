@@ -28,7 +28,7 @@ cdef extern from "minipcl.h":
     void mpcl_sacnormal_set_axis_PointXYZRGBA(pclseg.SACSegmentationFromNormals_PointXYZRGBA_t,
                               double ax, double ay, double az) except +
     void mpcl_extract_PointXYZRGBA(cpp.PointCloud_PointXYZRGBA_Ptr_t, cpp.PointCloud_PointXYZRGBA_t *,
-                              cpp.PointIndices_t *, bool) except +
+                              cpp.PointIndices_t *, bool) nogil except +
 
 # Empirically determine strides, for buffer support.
 # XXX Is there a more elegant way to get these?
@@ -344,7 +344,8 @@ cdef class PointCloud_PointXYZRGBA:
         for i in pyindices:
             ind.indices.push_back(i)
         result = PointCloud_PointXYZRGBA()
-        mpcl_extract_PointXYZRGBA(self.thisptr_shared, result.thisptr(), ind, negative)
+        with nogil:
+            mpcl_extract_PointXYZRGBA(self.thisptr_shared, result.thisptr(), ind, negative)
         # XXX are we leaking memory here? del ind causes a double free...
         return result
 ###
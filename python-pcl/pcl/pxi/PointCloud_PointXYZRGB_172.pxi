@@ -17,6 +17,7 @@ cimport pcl_segmentation_defs as pclseg
 cimport pcl_surface_defs as pclsf
 
 from libcpp cimport bool
+from libc.string cimport memcpy
 cimport indexing as idx
 from boost_shared_ptr cimport sp_assign
 from _pcl cimport PointCloud_PointXYZRGB
@@ -28,7 +29,42 @@ cdef extern from "minipcl.h":
     void mpcl_sacnormal_set_axis_PointXYZRGB(pclseg.SACSegmentationNormal_PointXYZRGB_t,
                               double ax, double ay, double az) except +
     void mpcl_extract_PointXYZRGB(cpp.PointCloud_PointXYZRGB_Ptr_t, cpp.PointCloud_PointXYZRGB_t *,
-                              cpp.PointIndices_t *, bool) except +
+                              cpp.PointIndices_t *, bool) nogil except +
+    void mpcl_crop_downsample_segment_PointXYZRGB(cpp.PointCloud_PointXYZRGB_Ptr_t, string,
+                              float, float, float, double, int,
+                              cpp.PointIndices &, cpp.PointCloud_PointXYZRGB_t &,
+                              cpp.PointCloud_PointXYZRGB_t &, cpp.ModelCoefficients &) nogil except +
+    void mpcl_compute_vfh_PointXYZRGB(cpp.PointCloud_PointXYZRGB_Ptr_t, cpp.PointCloud_Normal_Ptr_t,
+                              vector[float] &) except +
+    void mpcl_compute_fpfh_mean_PointXYZRGB(cpp.PointCloud_PointXYZRGB_Ptr_t, cpp.PointCloud_Normal_Ptr_t,
+                              double, vector[float] &) except +
+
+
+cdef cpp.PointCloud_Normal_Ptr_t _normals_from_array(normals, cnp.npy_intp npts) except *:
+    """
+    Copy an (n_points, 3) or (n_points, 4) array of normals into a new cloud
+    """
+    cdef cnp.ndarray[cnp.float32_t, ndim=2] arr = np.asarray(normals, dtype=np.float32)
+    cdef cpp.PointCloud_Normal_Ptr_t cloud
+    cdef cpp.Normal *p
+    cdef cnp.npy_intp i
+
+    if arr.shape[0] != npts or arr.shape[1] not in (3, 4):
+        raise ValueError("expected an array of shape (%d, 3) or (%d, 4), got %r"
+                         % (npts, npts, (arr.shape[0], arr.shape[1])))
+
+    sp_assign(cloud, new cpp.PointCloud_Normal_t())
+    cloud.get().resize(npts)
+    cloud.get().width = npts
+    cloud.get().height = 1
+    for i in range(npts):
+        p = idx.getptr(cloud.get(), i)
+        p.normal_x = arr[i, 0]
+        p.normal_y = arr[i, 1]
+        p.normal_z = arr[i, 2]
+        p.curvature = arr[i, 3] if arr.shape[1] == 4 else 0
+    return cloud
+
 
 # Empirically determine strides, for buffer support.
 # XXX Is there a more elegant way to get these?
@@ -94,18 +130,20 @@ cdef class PointCloud_PointXYZRGB:
     # resizing, because that can move it around in memory.
     def __getbuffer__(self, Py_buffer *buffer, int flags):
         # TODO parse flags
+        # The view exposes the padded in-memory point layout,
+        # x, y, z, 1, rgb and three unused floats per row.
         cdef Py_ssize_t npoints = self.thisptr().size()
 
         if self._view_count == 0:
-            self._view_count += 1
             self._shape[0] = npoints
-            self._shape[1] = 4
+            self._shape[1] = 8
+        self._view_count += 1
 
         buffer.buf = <char *>&(idx.getptr_at(self.thisptr(), 0).x)
         buffer.format = 'f'
         buffer.internal = NULL
         buffer.itemsize = sizeof(float)
-        buffer.len = npoints * 4 * sizeof(float)
+        buffer.len = npoints * 8 * sizeof(float)
         buffer.ndim = 2
         buffer.obj = self
         buffer.readonly = 0
@@ -139,39 +177,88 @@ cdef class PointCloud_PointXYZRGB:
     def from_array(self, cnp.ndarray[cnp.float32_t, ndim=2] arr not None):
         """
         Fill this object from a 2D numpy array (float32)
-        """
-        assert arr.shape[1] == 4
 
+        The array is either (n_points, 4) holding x, y, z, rgb or
+        (n_points, 8) holding the padded layout returned by
+        to_array(padded=True), which is copied in a single block.
+        """
         cdef cnp.npy_intp npts = arr.shape[0]
+        cdef cnp.npy_intp ncols = arr.shape[1]
+        cdef cnp.npy_intp i
+        cdef cnp.ndarray[cnp.float32_t, ndim=2, mode="c"] src
+        cdef float *s
+        cdef cpp.PointXYZRGB *p
+
+        if ncols != 4 and ncols != 8:
+            raise ValueError("expected an array of shape (n, 4) or (n, 8), got %r"
+                             % (arr.shape,))
+        if ncols == 8 and _strides_xyzrgb_3[0] != 8 * sizeof(float):
+            raise ValueError("padded layout is not available for this PCL build")
+
         self.resize(npts)
         self.thisptr().width = npts
         self.thisptr().height = 1
+        if npts == 0:
+            return
 
-        cdef cpp.PointXYZRGB *p
-        for i in range(npts):
-            p = idx.getptr(self.thisptr(), i)
-            p.x, p.y, p.z, p.rgb = arr[i, 0], arr[i, 1], arr[i, 2], <unsigned long>arr[i, 3]
+        src = np.ascontiguousarray(arr)
+        s = <float *>src.data
+        with nogil:
+            if ncols == 8:
+                memcpy(idx.getptr(self.thisptr(), 0), s, npts * 8 * sizeof(float))
+            else:
+                for i in range(npts):
+                    p = idx.getptr(self.thisptr(), i)
+                    p.x = s[4 * i]
+                    p.y = s[4 * i + 1]
+                    p.z = s[4 * i + 2]
+                    p.rgb = s[4 * i + 3]
 
     @cython.boundscheck(False)
-    def to_array(self):
+    def to_array(self, bool padded=False):
         """
         Return this object as a 2D numpy array (float32)
+
+        By default the array is (n_points, 4) holding x, y, z, rgb. With
+        padded=True it is (n_points, 8) and mirrors the in-memory point
+        layout (x, y, z, 1, rgb and three unused floats), copied in a
+        single block.
         """
-        cdef float x,y,z
         cdef cnp.npy_intp n = self.thisptr().size()
+        cdef cnp.npy_intp i
         cdef cnp.ndarray[cnp.float32_t, ndim=2, mode="c"] result
+        cdef float *d
         cdef cpp.PointXYZRGB *p
 
-        result = np.empty((n, 4), dtype=np.float32)
+        if padded and _strides_xyzrgb_3[0] != 8 * sizeof(float):
+            raise ValueError("padded layout is not available for this PCL build")
 
-        for i in range(n):
-            p = idx.getptr(self.thisptr(), i)
-            result[i, 0] = p.x
-            result[i, 1] = p.y
-            result[i, 2] = p.z
-            result[i, 3] = p.rgb
+        result = np.empty((n, 8 if padded else 4), dtype=np.float32)
+        if n == 0:
+            return result
+
+        d = <float *>result.data
+        with nogil:
+            if padded:
+                memcpy(d, idx.getptr(self.thisptr(), 0), n * 8 * sizeof(float))
+            else:
+                for i in range(n):
+                    p = idx.getptr(self.thisptr(), i)
+                    d[4 * i] = p.x
+                    d[4 * i + 1] = p.y
+                    d[4 * i + 2] = p.z
+                    d[4 * i + 3] = p.rgb
         return result
 
+    def asarray(self):
+        """
+        Return a writable (n_points, 8) float32 view of the points, without copying
+
+        Columns follow the padded point layout: x, y, z, 1, rgb and three
+        unused floats. The cloud cannot be resized while the view is alive.
+        """
+        return np.asarray(self)
+
     @cython.boundscheck(False)
     def from_list(self, _list):
         """
@@ -259,6 +346,42 @@ cdef class PointCloud_PointXYZRGB:
             # error = cpp.savePLYFile(s, p, binary)
         return error
 
+    def crop_downsample_segment(self, float leaf_size, field_name, float axis_min, float axis_max,
+                                double distance_threshold, int max_iterations=50):
+        """
+        Crop, downsample and segment the dominant plane in a single native call
+
+        Runs a passthrough filter on field_name within [axis_min, axis_max],
+        then a voxel grid of leaf_size over the cropped points only, then a
+        RANSAC plane fit with distance_threshold, and splits the result.
+        Returns (table_indices, table, objects, coefficients): the indices
+        of the plane inliers in the cropped and downsampled cloud, the
+        inliers and outliers as clouds, and the plane coefficients.
+        """
+        cdef bytes fname_ascii
+        cdef string field
+        cdef cpp.PointIndices ind
+        cdef cpp.ModelCoefficients coeffs
+        cdef PointCloud_PointXYZRGB table = PointCloud_PointXYZRGB()
+        cdef PointCloud_PointXYZRGB objects = PointCloud_PointXYZRGB()
+
+        if isinstance(field_name, unicode):
+            fname_ascii = field_name.encode("ascii")
+        elif not isinstance(field_name, bytes):
+            raise TypeError("field_name should be a string, got %r"
+                            % field_name)
+        else:
+            fname_ascii = field_name
+
+        field = string(fname_ascii)
+        with nogil:
+            mpcl_crop_downsample_segment_PointXYZRGB(self.thisptr_shared, field,
+                                                     axis_min, axis_max, leaf_size,
+                                                     distance_threshold, max_iterations,
+                                                     ind, table.thisptr()[0], objects.thisptr()[0], coeffs)
+        return [ind.indices[i] for i in range(ind.indices.size())], table, objects, \
+               [coeffs.values[i] for i in range(coeffs.values.size())]
+
     def make_segmenter(self):
         """
         Return a pcl.Segmentation object with this object set as the input-cloud
@@ -282,6 +405,65 @@ cdef class PointCloud_PointXYZRGB:
         cseg.setInputNormals (normals.makeShared());
         return seg
 
+    @cython.boundscheck(False)
+    def compute_normals(self, int ksearch=-1, double searchRadius=-1.0):
+        """
+        Estimate the surface normal at every point of this cloud
+
+        Neighbors are the ksearch nearest points or all points within
+        searchRadius; set the other one to a negative value.
+        Return an (n_points, 4) float32 array of normal_x, normal_y,
+        normal_z and curvature.
+        """
+        cdef cpp.PointCloud_Normal_t normals
+        cdef cnp.npy_intp n, i
+        cdef cnp.ndarray[cnp.float32_t, ndim=2, mode="c"] result
+        cdef float *d
+        cdef cpp.Normal *p
+
+        mpcl_compute_normals_PointXYZRGB(<cpp.PointCloud[cpp.PointXYZRGB]> deref(self.thisptr()), ksearch, searchRadius, normals)
+
+        n = normals.size()
+        result = np.empty((n, 4), dtype=np.float32)
+        d = <float *>result.data
+        for i in range(n):
+            p = idx.getptr(&normals, i)
+            d[4 * i] = p.normal_x
+            d[4 * i + 1] = p.normal_y
+            d[4 * i + 2] = p.normal_z
+            d[4 * i + 3] = p.curvature
+        return result
+
+    def compute_vfh(self, normals):
+        """
+        Compute the Viewpoint Feature Histogram of this cloud as a whole
+
+        normals holds the normal of every point, as an (n_points, 3) or
+        (n_points, 4) array like the one returned by compute_normals().
+        Return a float32 array of the 308 histogram bins. An empty cloud
+        raises a ValueError.
+        """
+        cdef vector[float] histogram
+        if self.size == 0:
+            raise ValueError("cannot compute the VFH of an empty cloud")
+        mpcl_compute_vfh_PointXYZRGB(self.thisptr_shared, _normals_from_array(normals, self.size), histogram)
+        return np.array(histogram, dtype=np.float32)
+
+    def compute_fpfh_mean(self, normals, double searchRadius=0.05):
+        """
+        Compute the Fast Point Feature Histogram of every point and average them
+
+        normals is as in compute_vfh(). The histogram of a point is built
+        from its neighbors within searchRadius, which should be larger than
+        the radius the normals were estimated with. Points without enough
+        neighbors are left out.
+        Return a float32 array of the 33 mean histogram bins.
+        """
+        cdef vector[float] histogram
+        mpcl_compute_fpfh_mean_PointXYZRGB(self.thisptr_shared, _normals_from_array(normals, self.size),
+                                           searchRadius, histogram)
+        return np.array(histogram, dtype=np.float32)
+
     def make_statistical_outlier_filter(self):
         """
         Return a pcl.StatisticalOutlierRemovalFilter object with this object set as the input-cloud
@@ -318,6 +500,18 @@ cdef class PointCloud_PointXYZRGB:
         cmls.setInputCloud(<cpp.shared_ptr[cpp.PointCloud[cpp.PointXYZRGB]]> self.thisptr_shared)
         return mls
 
+    def make_kdtree(self):
+        """
+        Return a pcl.KdTree_PointXYZRGB object with this object set as the input-cloud
+        """
+        return KdTree_PointXYZRGB(self)
+
+    def make_EuclideanClusterExtraction(self):
+        """
+        Return a pcl.EuclideanClusterExtraction_PointXYZRGB object with this object set as the input-cloud
+        """
+        return EuclideanClusterExtraction_PointXYZRGB(self)
+
     def make_kdtree_flann(self):
         """
         Return a pcl.kdTreeFLANN object with this object set as the input-cloud
@@ -346,7 +540,8 @@ cdef class PointCloud_PointXYZRGB:
             ind.indices.push_back(i)
         
         result = PointCloud_PointXYZRGB()
-        mpcl_extract_PointXYZRGB(self.thisptr_shared, result.thisptr(), ind, negative)
+        with nogil:
+            mpcl_extract_PointXYZRGB(self.thisptr_shared, result.thisptr(), ind, negative)
         # XXX are we leaking memory here? del ind causes a double free...
         
         return result
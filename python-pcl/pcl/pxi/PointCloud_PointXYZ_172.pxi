@@ -30,7 +30,7 @@ cdef extern from "minipcl.h":
     void mpcl_sacnormal_set_axis(pclseg.SACSegmentationNormal_t,
                               double ax, double ay, double az) except +
     void mpcl_extract(cpp.PointCloudPtr_t, cpp.PointCloud_t *,
-                              cpp.PointIndices_t *, bool) except +
+                              cpp.PointIndices_t *, bool) nogil except +
     ## void mpcl_extract_HarrisKeypoint3D(cpp.PointCloudPtr_t, cpp.PointCloud_PointXYZ *) except +
     # void mpcl_extract_HarrisKeypoint3D(cpp.PointCloudPtr_t, cpp.PointCloud_t *) except +
 
@@ -426,7 +426,8 @@ cdef class PointCloud:
         result = PointCloud()
         # result = ExtractIndices()
         # (<cpp.PointCloud[cpp.PointXYZ]> deref(self.thisptr())
-        mpcl_extract(self.thisptr_shared, result.thisptr(), ind, negative)
+        with nogil:
+            mpcl_extract(self.thisptr_shared, result.thisptr(), ind, negative)
         # XXX are we leaking memory here? del ind causes a double free...
         
         return result
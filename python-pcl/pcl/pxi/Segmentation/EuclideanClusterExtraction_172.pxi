@@ -34,7 +34,8 @@ cdef class EuclideanClusterExtraction:
     #   self.me.setInputCloud (cloud_filtered)
     def Extract(self):
         cdef vector[cpp.PointIndices] inds
-        self.me.extract (inds)
+        with nogil:
+            self.me.extract (inds)
         # NG(not use Python)
         # return inds
         # return 2-dimension Array?
@@ -69,3 +70,77 @@ cdef class EuclideanClusterExtraction:
         
         return result
 
+
+cdef extern from "minipcl.h":
+    void mpcl_extract_color_clusters_PointXYZRGB(cpp.PointCloud_PointXYZRGB_Ptr_t, float, float,
+                              int, int, vector[cpp.PointIndices] &) nogil except +
+
+
+cdef class EuclideanClusterExtraction_PointXYZRGB:
+    """
+    Segmentation class for EuclideanClusterExtraction on XYZRGB clouds
+
+    Clusters on the coordinates of the points directly, so the cloud does
+    not need to be copied to an XYZ cloud first. After set_ColorTolerance(),
+    neighboring points only join the same cluster when their colors are
+    within that Euclidean RGB distance (ConditionalEuclideanClustering),
+    which separates touching objects of different colors. Color-aware
+    extractions on different threads run in parallel.
+    """
+    cdef pclseg.EuclideanClusterExtraction_PointXYZRGB_t *me
+    cdef cpp.PointCloud_PointXYZRGB_Ptr_t cloud
+    cdef double color_tolerance
+    cdef bint has_search_method
+
+    def __cinit__(self, _pcl.PointCloud_PointXYZRGB pc not None):
+        self.me = new pclseg.EuclideanClusterExtraction_PointXYZRGB_t()
+        self.me.setInputCloud(pc.thisptr_shared)
+        self.cloud = pc.thisptr_shared
+        self.color_tolerance = -1.0
+        self.has_search_method = False
+    def __dealloc__(self):
+        del self.me
+    
+    def set_ClusterTolerance(self, double b):
+        self.me.setClusterTolerance(b)
+    
+    def set_MinClusterSize(self, int min):
+        self.me.setMinClusterSize(min)
+    
+    def set_MaxClusterSize(self, int max):
+        self.me.setMaxClusterSize(max)
+    
+    def set_SearchMethod(self, _pcl.KdTree_PointXYZRGB kdtree):
+        self.me.setSearchMethod(kdtree.thisptr_shared)
+        self.has_search_method = True
+    
+    def set_ColorTolerance(self, double tolerance):
+        """
+        Set the largest RGB distance (0-255 per channel) between neighbors
+        of one cluster, or a negative value to ignore colors (the default).
+        ConditionalEuclideanClustering builds its own search tree, so
+        Extract() raises a ValueError if set_SearchMethod() was called too.
+        """
+        self.color_tolerance = tolerance
+    
+    def Extract(self):
+        cdef vector[cpp.PointIndices] inds
+        cdef vector[vector[int]] result
+        cdef double tolerance = self.me.getClusterTolerance()
+        cdef int min_size = self.me.getMinClusterSize()
+        cdef int max_size = self.me.getMaxClusterSize()
+        
+        if self.color_tolerance >= 0 and self.has_search_method:
+            raise ValueError("a search method cannot be used with a color tolerance")
+        
+        with nogil:
+            if self.color_tolerance >= 0:
+                mpcl_extract_color_clusters_PointXYZRGB(self.cloud, tolerance, self.color_tolerance,
+                                                        min_size, max_size, inds)
+            else:
+                self.me.extract (inds)
+        
+        for i in range(inds.size()):
+            result.push_back(inds[i].indices)
+        
+        return result
@@ -17,7 +17,8 @@ cdef class Segmentation:
         cdef cpp.PointIndices ind
         cdef cpp.ModelCoefficients coeffs
         
-        self.me.segment (ind, coeffs)
+        with nogil:
+            self.me.segment (ind, coeffs)
         return [ind.indices[i] for i in range(ind.indices.size())], \
                [coeffs.values[i] for i in range(coeffs.values.size())]
 
@@ -46,7 +47,8 @@ cdef class Segmentation_PointXYZI:
         cdef cpp.PointIndices ind
         cdef cpp.ModelCoefficients coeffs
         
-        self.me.segment (ind, coeffs)
+        with nogil:
+            self.me.segment (ind, coeffs)
         return [ind.indices[i] for i in range(ind.indices.size())], \
                [coeffs.values[i] for i in range(coeffs.values.size())]
 
@@ -74,7 +76,8 @@ cdef class Segmentation_PointXYZRGB:
         cdef cpp.PointIndices ind
         cdef cpp.ModelCoefficients coeffs
         
-        self.me.segment (ind, coeffs)
+        with nogil:
+            self.me.segment (ind, coeffs)
         return [ind.indices[i] for i in range(ind.indices.size())], \
                [coeffs.values[i] for i in range(coeffs.values.size())]
 
@@ -102,7 +105,8 @@ cdef class Segmentation_PointXYZRGBA:
         cdef cpp.PointIndices ind
         cdef cpp.ModelCoefficients coeffs
         
-        self.me.segment (ind, coeffs)
+        with nogil:
+            self.me.segment (ind, coeffs)
         return [ind.indices[i] for i in range(ind.indices.size())], \
                [coeffs.values[i] for i in range(coeffs.values.size())]
 
@@ -33,7 +33,8 @@ cdef class SegmentationNormal:
     def segment(self):
         cdef cpp.PointIndices ind
         cdef cpp.ModelCoefficients coeffs
-        self.me.segment (ind, coeffs)
+        with nogil:
+            self.me.segment (ind, coeffs)
         return [ind.indices[i] for i in range(ind.indices.size())],\
                [coeffs.values[i] for i in range(coeffs.values.size())]
 
@@ -86,7 +87,8 @@ cdef class Segmentation_PointXYZI_Normal:
     def segment(self):
         cdef cpp.PointIndices ind
         cdef cpp.ModelCoefficients coeffs
-        self.me.segment (ind, coeffs)
+        with nogil:
+            self.me.segment (ind, coeffs)
         return [ind.indices[i] for i in range(ind.indices.size())],\
                [coeffs.values[i] for i in range(coeffs.values.size())]
 
@@ -139,7 +141,8 @@ cdef class Segmentation_PointXYZRGB_Normal:
     def segment(self):
         cdef cpp.PointIndices ind
         cdef cpp.ModelCoefficients coeffs
-        self.me.segment (ind, coeffs)
+        with nogil:
+            self.me.segment (ind, coeffs)
         return [ind.indices[i] for i in range(ind.indices.size())],\
                [coeffs.values[i] for i in range(coeffs.values.size())]
 
@@ -192,7 +195,8 @@ cdef class Segmentation_PointXYZRGBA_Normal:
     def segment(self):
         cdef cpp.PointIndices ind
         cdef cpp.ModelCoefficients coeffs
-        self.me.segment (ind, coeffs)
+        with nogil:
+            self.me.segment (ind, coeffs)
         return [ind.indices[i] for i in range(ind.indices.size())],\
                [coeffs.values[i] for i in range(coeffs.values.size())]
 
@@ -15,6 +15,7 @@ include "Filters/ApproximateVoxelGrid_172.pxi"
 include "Surface/MovingLeastSquares_172.pxi"
 # include "KdTree/KdTree.pxi"
 include "KdTree/KdTree_FLANN.pxi"
+include "KdTree/KdTree_PointXYZRGB.pxi"
 # Octree
 include "Octree/OctreePointCloud_172.pxi"
 include "Octree/OctreePointCloud2Buf_172.pxi"
@@ -15,6 +15,7 @@ include "Filters/ApproximateVoxelGrid.pxi"
 include "Surface/MovingLeastSquares.pxi"
 # include "KdTree/KdTree.pxi"
 include "KdTree/KdTree_FLANN.pxi"
+include "KdTree/KdTree_PointXYZRGB.pxi"
 # Octree
 include "Octree/OctreePointCloud_190.pxi"
 include "Octree/OctreePointCloud2Buf_190.pxi"